@@ -0,0 +1,64 @@
+import networkx as nx
+import numpy as np
+
+from argparse import ArgumentParser
+from benchmarks.primitives import COMMUNITY_SIZE, P_IN, generate_graph
+from evaluation.temporal_wrapper import TemporalLouvainIterator
+from louvain_variant import louvain_variant
+from typing import List
+
+CHURNS = [0.01, 0.05, 0.2, 0.6]
+
+def churn_snapshots(num_nodes: int, steps: int, churn: float, seed: int=42) -> List[nx.Graph]:
+    """
+    Snapshots of a generated graph (see benchmarks.primitives.generate_graph) in which, every step, a fraction churn of
+    the edges is replaced by new ones with the same planted communities. Every snapshot carries its changes in
+    graph.graph["delta"], as those replayed by evaluation.delta_format, so the incremental mode does not compare them
+    """
+    graph, _ = generate_graph(num_nodes, seed)
+    rng = np.random.default_rng(seed)
+    graph.graph.update(time_step=0, delta_from=None, delta=([], [], []))
+    snapshots = [graph]
+    for step in range(1, steps):
+        graph = snapshots[-1].copy()
+        edges = list(graph.edges(data="weight"))
+        removed_edges = [edges[i] for i in rng.choice(len(edges), int(churn * len(edges)), replace=False).tolist()]
+        graph.remove_edges_from(removed_edges)
+        added_edges = []
+        while len(added_edges) < len(removed_edges):
+            src = int(rng.integers(num_nodes))
+            dst = src // COMMUNITY_SIZE * COMMUNITY_SIZE + int(rng.integers(COMMUNITY_SIZE)) if rng.random() < P_IN \
+                else int(rng.integers(num_nodes))
+            if dst >= num_nodes or src == dst or graph.has_edge(src, dst):
+                continue
+            graph.add_edge(src, dst, weight=float(rng.integers(1, 5)))
+            added_edges.append((src, dst, graph[src][dst]["weight"]))
+        graph.graph.update(time_step=step, delta_from=step - 1, delta=(added_edges, removed_edges, []))
+        snapshots.append(graph)
+    return snapshots
+
+def time_modes(snapshots: List[nx.Graph], seed: int=42) -> dict:
+    """
+    Seconds the variant takes on every snapshot after the first, with a Status initialised for every snapshot and with
+    one Status kept up to date with the changes
+    """
+    times = {}
+    for mode, incremental in (("init", False), ("incremental", True)):
+        iterator = TemporalLouvainIterator(louvain_variant.best_partition, prev_partition=True, incremental=incremental,
+                                           random_state=seed)
+        _, measured = iterator.process_temporal_graph(snapshots, measure_time=True)
+        times[mode] = sum(measured[1:])
+    return times
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser(description="Time the incremental mode of the variant against a new Status per snapshot")
+    arg_parser.add_argument("--nodes", type=int, default=100000)
+    arg_parser.add_argument("--steps", type=int, default=6)
+    arg_parser.add_argument("--churn", type=float, nargs="+", default=CHURNS) # fractions of the edges replaced per step
+    arg_parser.add_argument("--seed", type=int, default=42)
+
+    args = arg_parser.parse_args()
+    print(f"{'churn':>8}{'init (s)':>12}{'incremental (s)':>18}{'speedup':>10}")
+    for churn in args.churn:
+        times = time_modes(churn_snapshots(args.nodes, args.steps, churn, args.seed), args.seed)
+        print(f"{churn:8.2f}{times['init']:12.2f}{times['incremental']:18.2f}{times['init'] / times['incremental']:10.2f}", flush=True)
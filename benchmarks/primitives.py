@@ -0,0 +1,196 @@
+import json
+import networkx as nx
+import numpy as np
+import platform
+import sys
+import timeit
+
+from argparse import ArgumentParser
+from louvain_variant.community_status import Status
+from louvain_variant.utils import __full_modularity, __neighcom, __modularity, __renumber
+from louvain_variant.utils import engine_graph, induced_graph, partition_at_level
+from typing import Callable, Dict, List, Tuple
+
+SIZES = [10**3, 10**4, 10**5, 10**6]
+COMMUNITY_SIZE = 50
+DEGREE = 10
+P_IN = 0.8 # fraction of the edges of a node that stay inside its community
+DENDROGRAM_FANOUT = 10 # communities merged into one per level of the generated dendrogram
+TOLERANCE = 0.25 # relative slowdown of the median time above which a primitive counts as a regression
+
+def generate_graph(num_nodes: int, seed: int=42) -> Tuple[nx.Graph, dict]:
+    """
+    Weighted graph with planted communities of COMMUNITY_SIZE nodes and a mean degree of about DEGREE, with its communities
+    """
+    rng = np.random.default_rng(seed)
+    num_edges = num_nodes * DEGREE // 2
+    src = rng.integers(0, num_nodes, num_edges)
+    inside = rng.random(num_edges) < P_IN
+    dst = np.where(inside,
+                   src // COMMUNITY_SIZE * COMMUNITY_SIZE + rng.integers(0, COMMUNITY_SIZE, num_edges),
+                   rng.integers(0, num_nodes, num_edges))
+    dst = np.minimum(dst, num_nodes - 1) # the last community can be smaller
+    keep = src != dst
+    weights = rng.integers(1, 5, num_edges).astype(np.float64)
+
+    graph = nx.Graph()
+    graph.add_nodes_from(range(num_nodes))
+    graph.add_weighted_edges_from(zip(src[keep].tolist(), dst[keep].tolist(), weights[keep].tolist()))
+    return graph, {node: node // COMMUNITY_SIZE for node in range(num_nodes)}
+
+def generate_dendrogram(partition: dict) -> List[dict]:
+    """
+    Dendrogram on top of partition, where every level merges DENDROGRAM_FANOUT communities of the level below into one
+    """
+    dendrogram = [partition]
+    num_communities = max(partition.values()) + 1
+    while num_communities > 1:
+        dendrogram.append({com: com // DENDROGRAM_FANOUT for com in range(num_communities)})
+        num_communities = (num_communities - 1) // DENDROGRAM_FANOUT + 1
+    return dendrogram
+
+def primitives(graph: nx.Graph, partition: dict, engine: str) -> Dict[str, Callable]:
+    """
+    The primitives to time on one graph, each as a call without arguments that leaves its inputs unchanged
+    Nodes are the positions of the nodes of graph for the csr engine, which they already are for generated graphs
+    """
+    current_graph, partition = engine_graph(graph, partition, engine=engine)
+    status = Status()
+    status.init(current_graph, "weight", partition)
+    # labels that are not 0..n-1, so that __renumber has to relabel
+    scattered = {node: 3 * com + 1 for node, com in partition.items()}
+    dendrogram = generate_dendrogram(partition)
+    nodes = list(current_graph.nodes())
+
+    def neighcom():
+        for node in nodes:
+            __neighcom(node, current_graph, status, "weight")
+
+    def status_init():
+        Status().init(current_graph, "weight")
+
+    def status_init_partition():
+        Status().init(current_graph, "weight", partition)
+
+    return {
+        "__neighcom (all nodes)": neighcom,
+        # the running sums of the status against the pass over all communities they replace
+        "__modularity": lambda: __modularity(status, 1.),
+        "__full_modularity": lambda: __full_modularity(status, 1.),
+        "induced_graph": lambda: induced_graph(partition, current_graph),
+        "__renumber": lambda: __renumber(scattered),
+        "partition_at_level (top)": lambda: partition_at_level(dendrogram, len(dendrogram) - 1),
+        "Status.init": status_init,
+        "Status.init (partition)": status_init_partition
+    }
+
+def time_call(call: Callable, warmup: int, repeats: int, min_time: float) -> dict:
+    """
+    Seconds per call of call, in loops of as many calls as take min_time, after warmup calls that are not measured
+    """
+    for _ in range(warmup):
+        call()
+    timer = timeit.Timer(call)
+    number, _ = timer.autorange() if min_time > 0 else (1, None)
+    number = max(1, int(number * min_time / 0.2)) # autorange aims at 0.2 seconds
+    times = np.array(timer.repeat(repeat=repeats, number=number)) / number
+    return {"number": number, "min": float(times.min()), "median": float(np.median(times)), "max": float(times.max())}
+
+def scaling_exponent(sizes: List[int], times: List[float]) -> float:
+    """
+    Slope of the least squares line through log time against log size, 1 for linear scaling, None for a single size
+    """
+    if len(sizes) < 2:
+        return None
+    return float(np.polyfit(np.log(sizes), np.log(times), 1)[0])
+
+def run_benchmarks(sizes: List[int], engine: str="networkx", warmup: int=1, repeats: int=5, min_time: float=0.2, only: List[str]=None, seed: int=42) -> dict:
+    """
+    Time every primitive on generated graphs of the given sizes, with the scaling exponent of its median time
+    """
+    results = {}
+    for num_nodes in sizes:
+        graph, partition = generate_graph(num_nodes, seed)
+        for name, call in primitives(graph, partition, engine).items():
+            if only is not None and name not in only:
+                continue
+            timing = time_call(call, warmup, repeats, min_time)
+            print(f"{name:<28}{num_nodes:>10}{timing['median'] * 1000:14.4f} ms", flush=True)
+            result = results.setdefault(name, {"sizes": [], "median": [], "min": [], "max": [], "number": []})
+            result["sizes"].append(num_nodes)
+            for key in ("median", "min", "max", "number"):
+                result[key].append(timing[key])
+        del graph, partition
+
+    for result in results.values():
+        result["exponent"] = scaling_exponent(result["sizes"], result["median"])
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "networkx": nx.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform()
+        },
+        "settings": {"engine": engine, "warmup": warmup, "repeats": repeats, "min_time": min_time, "seed": seed,
+                     "community_size": COMMUNITY_SIZE, "degree": DEGREE, "p_in": P_IN},
+        "results": results
+    }
+
+def compare(results: dict, baseline: dict, tolerance: float=TOLERANCE) -> List[str]:
+    """
+    Regressions of results against a baseline of the same benchmarks, one line per primitive and size whose median time
+    grew by more than tolerance. Sizes or primitives missing from either are skipped
+    """
+    if results["settings"]["engine"] != baseline["settings"]["engine"]:
+        raise ValueError(f"The baseline was run with the {baseline['settings']['engine']} engine, not {results['settings']['engine']}")
+    regressions = []
+    for name, result in results["results"].items():
+        if name not in baseline["results"]:
+            continue
+        base = baseline["results"][name]
+        base_times = dict(zip(base["sizes"], base["median"]))
+        for num_nodes, median in zip(result["sizes"], result["median"]):
+            if num_nodes in base_times and median > base_times[num_nodes] * (1 + tolerance):
+                regressions.append(f"{name} at {num_nodes} nodes: {base_times[num_nodes] * 1000:.4f} ms -> {median * 1000:.4f} ms "
+                                   f"({median / base_times[num_nodes]:.2f}x)")
+    return regressions
+
+def print_exponents(results: dict, baseline: dict=None):
+    for name, result in results["results"].items():
+        if result["exponent"] is None:
+            continue
+        line = f"{name:<28}exponent {result['exponent']:6.2f}"
+        if baseline is not None and baseline["results"].get(name, {}).get("exponent") is not None:
+            line += f" (baseline {baseline['results'][name]['exponent']:.2f})"
+        print(line)
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser(description="Time the louvain_variant primitives on generated graphs of increasing size")
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=SIZES) # numbers of nodes of the generated graphs
+    arg_parser.add_argument("--engine", type=str, default="networkx", choices=["networkx", "csr"])
+    arg_parser.add_argument("--warmup", type=int, default=1) # unmeasured calls before timing
+    arg_parser.add_argument("--repeats", type=int, default=5) # measured loops, the median is reported
+    arg_parser.add_argument("--min_time", type=float, default=0.2) # seconds a measured loop takes at least
+    arg_parser.add_argument("--only", type=str, nargs="+", default=None) # names of the primitives to time
+    arg_parser.add_argument("--output", type=str, default=None) # JSON file to write the results to
+    arg_parser.add_argument("--baseline", type=str, default=None) # JSON file of an earlier run to compare against
+    arg_parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+
+    args = arg_parser.parse_args()
+    results = run_benchmarks(sorted(args.sizes), args.engine, args.warmup, args.repeats, args.min_time, args.only)
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    print_exponents(results, baseline)
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,374 @@
+import json
+import numpy as np
+import os
+import shutil
+
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
+
+EVENTS = ["switch", "birthdeath", "expand", "mergesplit"]
+MIN_CLUSTER_SIZE = 3 # as in src/settings.h
+CHUNK_NODES = 1 << 16 # nodes whose edges are generated and written at once
+PARTIAL_DIR = ".partial" # time steps are written here and moved into place when complete
+
+def _integral(low: float, high: float, power: float) -> float:
+    """
+    Integral of x^power from low to high
+    """
+    if power == -1:
+        return np.log(high / low)
+    return (high ** (power + 1) - low ** (power + 1)) / (power + 1)
+
+def _power_law(rng: np.random.Generator, size: int, exponent: float, low: float, high: float) -> np.ndarray:
+    """
+    Samples of the density x^-exponent on [low, high], by inverting its distribution function
+    """
+    u = rng.random(size)
+    if exponent == 1:
+        return low * (high / low) ** u
+    power = 1. - exponent
+    return (low ** power + u * (high ** power - low ** power)) ** (1. / power)
+
+def min_degree(average_k: float, max_degree: float, tau: float) -> float:
+    """
+    Lower bound of the power law of exponent tau up to max_degree whose mean is average_k, found by bisection
+    """
+    if not 1 <= average_k < max_degree:
+        raise ValueError(f"The average degree ({average_k}) has to be at least 1 and below the maximum degree ({max_degree})")
+    low, high = 1., float(average_k)
+    for _ in range(100):
+        middle = (low + high) / 2
+        mean = _integral(middle, max_degree, 1. - tau) / _integral(middle, max_degree, -tau)
+        low, high = (middle, high) if mean < average_k else (low, middle)
+    return low
+
+def community_sizes(rng: np.random.Generator, num_nodes: int, minc: int, maxc: int, tau2: float) -> np.ndarray:
+    """
+    Power law community sizes of exponent tau2 in [minc, maxc] that add up to num_nodes, the last one is cut to fit and
+    merged into the one before if that leaves it below minc
+    """
+    sizes = []
+    total = 0
+    while total < num_nodes:
+        batch = np.floor(_power_law(rng, max(16, (num_nodes - total) // max(minc, 1)), tau2, minc, maxc + 1)).astype(np.int64)
+        sizes += [batch]
+        total += int(batch.sum())
+    sizes = np.concatenate(sizes)
+    sizes = sizes[:np.searchsorted(np.cumsum(sizes), num_nodes) + 1]
+    sizes[-1] -= sizes.sum() - num_nodes
+    if len(sizes) > 1 and sizes[-1] < minc:
+        sizes[-2] += sizes[-1]
+        sizes = sizes[:-1]
+    return sizes
+
+class DynamicCommunities:
+    """
+    Community membership of every node over the time steps, evolved by the events of the C++ generators of Greene et al.
+
+    labels holds the community id of every node, -1 for nodes that are not in the graph at the current time step (as
+    left behind by a death or contraction). Ids are not reused, new communities get the next free one. The events are
+    vectorised versions of those of bench_switch, bench_birthdeath, bench_expand and bench_mergesplit, which pick the
+    same kind of communities and nodes but not with the same random draws.
+    """
+    def __init__(self, rng: np.random.Generator, num_nodes: int, minc: int, maxc: int, tau2: float=1.):
+        self.rng = rng
+        sizes = community_sizes(rng, num_nodes, minc, maxc, tau2)
+        self.labels = rng.permutation(np.repeat(np.arange(len(sizes), dtype=np.int32), sizes))
+        self.next_id = len(sizes)
+
+    def communities(self) -> tuple:
+        """
+        Ids and sizes of the current communities
+        """
+        present = self.labels[self.labels >= 0]
+        ids, sizes = np.unique(present, return_counts=True)
+        return ids, sizes
+
+    def _new_ids(self, count: int) -> np.ndarray:
+        ids = np.arange(self.next_id, self.next_id + count, dtype=np.int32)
+        self.next_id += count
+        return ids
+
+    def _take(self, count: int, exclude: np.ndarray=None) -> np.ndarray:
+        """
+        count nodes to move into another community: unassigned nodes first, then random members of communities outside
+        exclude that keep at least MIN_CLUSTER_SIZE members
+        """
+        unassigned = np.flatnonzero(self.labels < 0)
+        taken = self.rng.permutation(unassigned)[:count]
+        if len(taken) == count:
+            return taken
+
+        ids, sizes = self.communities()
+        candidates = self.rng.permutation(np.flatnonzero(self.labels >= 0))
+        community = np.searchsorted(ids, self.labels[candidates])
+        allowed = sizes - MIN_CLUSTER_SIZE
+        if exclude is not None:
+            allowed[np.isin(ids, exclude)] = 0
+        # rank of every candidate among the candidates of its community, in permutation order
+        order = np.argsort(community, kind="stable")
+        starts = np.searchsorted(community[order], np.arange(len(ids)))
+        rank = np.empty(len(candidates), dtype=np.int64)
+        rank[order] = np.arange(len(candidates)) - starts[community[order]]
+        available = candidates[rank < allowed[community]]
+        return np.concatenate([taken, available[:count - len(taken)]])
+
+    def switch(self, prob_switch: float):
+        """
+        Every node moves to another, random community with probability prob_switch
+        """
+        ids, _ = self.communities()
+        if len(ids) < 2:
+            return
+        movers = np.flatnonzero((self.labels >= 0) & (self.rng.random(len(self.labels)) < prob_switch))
+        current = np.searchsorted(ids, self.labels[movers])
+        # a random community other than the current one
+        target = (current + self.rng.integers(1, len(ids), len(movers))) % len(ids)
+        self.labels[movers] = ids[target]
+
+    def birth_death(self, num_birth: int, num_death: int):
+        """
+        num_death random communities die, leaving their nodes unassigned, and num_birth communities of the median size
+        are born from unassigned nodes and members of other communities
+        """
+        ids, sizes = self.communities()
+        dead = self.rng.choice(ids, size=min(num_death, len(ids)), replace=False)
+        self.labels[np.isin(self.labels, dead)] = -1
+        median_size = int(np.median(sizes)) if len(sizes) else MIN_CLUSTER_SIZE
+        for community in self._new_ids(num_birth):
+            self.labels[self._take(max(median_size, MIN_CLUSTER_SIZE))] = community
+
+    def expand_contract(self, num_expansion: int, num_contraction: int, rate: float):
+        """
+        num_expansion random communities grow by rate times their size and num_contraction others shrink by as much,
+        never below MIN_CLUSTER_SIZE, leaving the removed nodes unassigned
+        """
+        ids, sizes = self.communities()
+        chosen = self.rng.permutation(len(ids))[:num_expansion + num_contraction]
+        for position in chosen[:num_expansion]:
+            grow = max(1, int(round(sizes[position] * rate)))
+            self.labels[self._take(grow, exclude=ids[position:position + 1])] = ids[position]
+        for position in chosen[num_expansion:]:
+            shrink = min(max(1, int(round(sizes[position] * rate))), sizes[position] - MIN_CLUSTER_SIZE)
+            members = np.flatnonzero(self.labels == ids[position])
+            self.labels[self.rng.permutation(members)[:max(shrink, 0)]] = -1
+
+    def merge_split(self, num_merge: int, num_split: int):
+        """
+        num_split random communities of at least twice MIN_CLUSTER_SIZE split into two random halves, one of which is
+        a new community, and num_merge pairs of other communities merge into the first of the pair
+        """
+        ids, sizes = self.communities()
+        order = self.rng.permutation(len(ids))
+        splittable = order[sizes[order] >= 2 * MIN_CLUSTER_SIZE][:num_split]
+        for position, community in zip(splittable, self._new_ids(len(splittable))):
+            members = self.rng.permutation(np.flatnonzero(self.labels == ids[position]))
+            self.labels[members[:len(members) // 2]] = community
+        rest = order[~np.isin(order, splittable)][:2 * num_merge]
+        for first, second in zip(rest[0::2], rest[1::2]):
+            self.labels[self.labels == ids[second]] = ids[first]
+
+    def step(self, event: str, params: dict):
+        if event == "switch":
+            self.switch(params["p"])
+        elif event == "birthdeath":
+            self.birth_death(params["birth"], params["death"])
+        elif event == "expand":
+            self.expand_contract(params["expand"], params["contract"], params["r"])
+        elif event == "mergesplit":
+            self.merge_split(params["merge"], params["split"])
+        else:
+            raise ValueError(f"Unknown event type ({event}), use one of {EVENTS}")
+
+def _snapshot_name(time_step: int) -> str:
+    """
+    File name prefix of a time step, as written by the C++ generators and read by evaluation.load_graphs
+    """
+    return f"switch.t{time_step:02d}"
+
+def _pick(rng: np.random.Generator, cumulative: np.ndarray, base: np.ndarray, weight: np.ndarray, last: np.ndarray) -> np.ndarray:
+    """
+    Random positions of cumulative, chosen with probability proportional to their increments, within the ranges that
+    start at cumulative value base, hold weight and end at position last
+    """
+    picks = base + rng.random(len(base)) * weight
+    return np.minimum(np.searchsorted(cumulative, picks, side="right"), last)
+
+def _resample_duplicates(rng: np.random.Generator, edges: np.ndarray, resample: callable, num_nodes: int, rounds: int) -> np.ndarray:
+    """
+    Draw the second endpoint of self-loops and repeated edges again, up to `rounds` times, and drop those that remain
+    """
+    for attempt in range(rounds + 1):
+        keys = np.minimum(edges[:, 0], edges[:, 1]) * num_nodes + np.maximum(edges[:, 0], edges[:, 1])
+        _, first = np.unique(keys, return_index=True)
+        bad = np.ones(len(edges), dtype=bool)
+        bad[first] = False
+        bad |= edges[:, 0] == edges[:, 1]
+        if not bad.any():
+            break
+        if attempt == rounds:
+            edges = edges[~bad]
+            break
+        edges[bad, 1] = resample(np.flatnonzero(bad))
+    return edges
+
+def _write_edges(file, edges: np.ndarray):
+    file.write("".join(f"{source} {target}\n" for source, target in (edges + 1).tolist()))
+
+def write_snapshot(out_path: str, time_step: int, labels: np.ndarray, params: dict):
+    """
+    Generate the edges of one time step for the given memberships and write its .edges and .comm files
+
+    Every present node draws a degree from the power law of the parameters, of which a fraction muw is external. The
+    internal edges of every community and the external edges of the whole graph are drawn with both endpoints chosen
+    with probability proportional to their internal or external degree (Chung-Lu), so the expected degree of a node is
+    the drawn one. The internal edges are generated, and repeated ones drawn again, for the communities of CHUNK_NODES
+    nodes at a time and the external edges CHUNK_NODES at a time, so memory stays linear in the number of nodes
+    whatever the number of edges. External edges that land inside a community are kept, as are the rare repeated ones
+    (networkx collapses those when loading). A node without any edge gets one into its community, so that every present
+    node appears in the edge file. Nodes are numbered from 1
+    """
+    rng = np.random.default_rng([params["seed"], time_step])
+    num_nodes = len(labels)
+    present = np.flatnonzero(labels >= 0)
+    degrees = np.zeros(num_nodes)
+    degrees[present] = _power_law(rng, len(present), params["tau"], params["kmin"], params["maxk"])
+    internal_degrees = degrees * (1. - params["muw"])
+    seen = np.zeros(num_nodes, dtype=bool)
+
+    # members sorted by community, with their cumulative internal degree
+    members = present[np.argsort(labels[present], kind="stable")]
+    ids, starts, sizes = np.unique(labels[members], return_index=True, return_counts=True)
+    cumulative = np.cumsum(internal_degrees[members])
+    base = np.concatenate([[0.], cumulative])[starts]
+    weight = np.concatenate([[0.], cumulative])[starts + sizes] - base
+    prefix = _snapshot_name(time_step)
+    partial_path = os.path.join(out_path, PARTIAL_DIR)
+    with open(os.path.join(partial_path, prefix + ".edges"), "w") as file:
+        first = 0
+        while first < len(ids):
+            last = int(np.searchsorted(starts, starts[first] + CHUNK_NODES, side="left")) # communities of this chunk
+            last = max(last, first + 1)
+            counts = np.floor(weight[first:last] / 2. + rng.random(last - first)).astype(np.int64)
+            community = np.repeat(np.arange(first, last), counts)
+            ends = starts[community] + sizes[community] - 1
+
+            def pick(rows):
+                return _pick(rng, cumulative, base[community[rows]], weight[community[rows]], ends[rows])
+
+            edges = np.stack([pick(slice(None)), pick(slice(None))], axis=1)
+            edges = _resample_duplicates(rng, edges, pick, num_nodes, rounds=3)
+            edges = members[edges]
+            seen[edges.ravel()] = True
+            _write_edges(file, edges)
+            first = last
+
+        external = np.cumsum(degrees[present] * params["muw"])
+        num_external = int(np.floor(external[-1] / 2. + rng.random())) if len(present) else 0
+        for start in range(0, num_external, CHUNK_NODES):
+            count = min(CHUNK_NODES, num_external - start)
+            ends = np.full(count, len(present) - 1)
+            edges = present[np.stack([_pick(rng, external, np.zeros(count), np.full(count, external[-1]), ends) for _ in range(2)], axis=1)]
+            edges = edges[edges[:, 0] != edges[:, 1]]
+            seen[edges.ravel()] = True
+            _write_edges(file, edges)
+
+        lonely = present[~seen[present]]
+        community = np.searchsorted(ids, labels[lonely])
+        targets = members[starts[community] + rng.integers(0, sizes[community])]
+        # a node alone in its community connects to any other node
+        alone = targets == lonely
+        targets[alone] = present[(np.searchsorted(present, lonely[alone]) + rng.integers(1, max(len(present), 2), np.count_nonzero(alone))) % len(present)]
+        _write_edges(file, np.stack([lonely, targets], axis=1)[targets != lonely])
+
+    with open(os.path.join(partial_path, prefix + ".comm"), "w") as file:
+        for start in range(0, len(ids), CHUNK_NODES):
+            stop = min(start + CHUNK_NODES, len(ids))
+            nodes = (members[starts[start]:starts[stop - 1] + sizes[stop - 1]] + 1).tolist()
+            offsets = (starts[start:stop] - starts[start]).tolist() + [len(nodes)]
+            file.write("".join(" ".join(map(str, nodes[begin:end])) + " \n" for begin, end in zip(offsets, offsets[1:])))
+
+    for extension in (".edges", ".comm"):
+        os.replace(os.path.join(partial_path, prefix + extension), os.path.join(out_path, prefix + extension))
+    return time_step
+
+def generate(out_path: str, event: str, num_nodes: int, steps: int, average_k: float, max_degree: int, muw: float, minc: int=None,
+             maxc: int=None, tau: float=2., tau2: float=1., seed: int=21111983, workers: int=None, **event_params) -> str:
+    """
+    Write a dynamic graph with planted communities in the layout of the C++ generators (switch.tNN.edges and .comm)
+
+    The memberships of the time steps are evolved one after the other in this process, by the given event type with its
+    parameters (p for switch, birth and death for birthdeath, expand, contract and r for expand, merge and split for
+    mergesplit). The edges of the time steps are generated independently of each other by `workers` processes. At most
+    two time steps per worker are waiting at once, so memory is bounded by the number of nodes and not by the number of
+    time steps or edges. A time step only appears under its final name when both its files are complete. The output
+    only depends on the parameters and the seed, not on the number of workers. Returns out_path
+    Communities that are smaller than the internal degree of their members cannot hold all of it, so the mean degree and
+    mixing only match k and muw when minc is well above (1 - muw) * k
+    """
+    if event not in EVENTS:
+        raise ValueError(f"Unknown event type ({event}), use one of {EVENTS}")
+    if not 0 <= muw <= 1:
+        raise ValueError(f"The mixing parameter ({muw}) has to be between 0 and 1")
+    kmin = min_degree(average_k, max_degree, tau)
+    # as the C++ generators, the community sizes default to the extremes of the degree sequence
+    minc = max(int(np.ceil(kmin)), MIN_CLUSTER_SIZE) if minc is None else minc
+    maxc = max_degree if maxc is None else maxc
+    if not MIN_CLUSTER_SIZE <= minc <= maxc <= num_nodes:
+        raise ValueError(f"The community sizes have to satisfy {MIN_CLUSTER_SIZE} <= minc ({minc}) <= maxc ({maxc}) <= N ({num_nodes})")
+
+    params = {"event": event, "N": num_nodes, "s": steps, "k": average_k, "maxk": max_degree, "muw": muw, "minc": minc, "maxc": maxc,
+              "tau": tau, "tau2": tau2, "seed": seed, "kmin": kmin, **event_params}
+    os.makedirs(os.path.join(out_path, PARTIAL_DIR), exist_ok=True)
+    with open(os.path.join(out_path, "parameters.json"), "w") as file:
+        json.dump(params, file, indent=2)
+
+    communities = DynamicCommunities(np.random.default_rng(seed), num_nodes, minc, maxc, tau2)
+    workers = workers if workers is not None else os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as pool, tqdm(total=steps, desc="generating") as progress:
+        pending = deque()
+        for time_step in range(1, steps + 1):
+            if time_step > 1:
+                communities.step(event, params)
+            pending.append(pool.submit(write_snapshot, out_path, time_step, communities.labels.copy(), params))
+            while len(pending) >= 2 * workers:
+                pending.popleft().result()
+                progress.update()
+        while pending:
+            pending.popleft().result()
+            progress.update()
+    shutil.rmtree(os.path.join(out_path, PARTIAL_DIR))
+
+    return out_path
+
+if __name__ == "__main__":
+    # the flags follow those of the C++ generators
+    arg_parser = ArgumentParser(description="Generate a dynamic graph with planted communities in the layout of the C++ generators")
+    arg_parser.add_argument("--out_path", type=str, required=True)
+    arg_parser.add_argument("--event", type=str, default="switch", choices=EVENTS)
+    arg_parser.add_argument("-N", type=int, required=True) # number of nodes
+    arg_parser.add_argument("-s", type=int, required=True) # number of time steps
+    arg_parser.add_argument("-k", type=float, required=True) # average degree
+    arg_parser.add_argument("-maxk", type=int, required=True) # maximum degree
+    arg_parser.add_argument("-muw", type=float, required=True) # mixing parameter
+    arg_parser.add_argument("-minc", type=int, default=None) # minimum community size
+    arg_parser.add_argument("-maxc", type=int, default=None) # maximum community size
+    arg_parser.add_argument("-t1", type=float, default=2.) # exponent of the degree distribution
+    arg_parser.add_argument("-t2", type=float, default=1.) # exponent of the community size distribution
+    arg_parser.add_argument("-seed", type=int, default=21111983)
+    arg_parser.add_argument("-p", type=float, default=0.1) # switch: probability of a node switching community
+    arg_parser.add_argument("-birth", type=int, default=1) # birthdeath: community births per time step
+    arg_parser.add_argument("-death", type=int, default=1) # birthdeath: community deaths per time step
+    arg_parser.add_argument("-expand", type=int, default=1) # expand: expansions per time step
+    arg_parser.add_argument("-contract", type=int, default=1) # expand: contractions per time step
+    arg_parser.add_argument("-r", type=float, default=0.1) # expand: rate of expansion and contraction
+    arg_parser.add_argument("-merge", type=int, default=1) # mergesplit: merges per time step
+    arg_parser.add_argument("-split", type=int, default=1) # mergesplit: splits per time step
+    arg_parser.add_argument("--workers", type=int, default=None) # processes generating the time steps
+
+    args = arg_parser.parse_args()
+    generate(args.out_path, args.event, args.N, args.s, args.k, args.maxk, args.muw, args.minc, args.maxc, args.t1, args.t2, args.seed,
+             args.workers, p=args.p, birth=args.birth, death=args.death, expand=args.expand, contract=args.contract, r=args.r,
+             merge=args.merge, split=args.split)
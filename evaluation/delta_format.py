@@ -0,0 +1,243 @@
+import copy
+import gc
+import json
+import networkx as nx
+import numpy as np
+import os
+import sys
+
+from evaluation.load_graphs import CACHE_ARRAYS, _build_graph, _prepare_snapshots, _read_cache, _write_cache
+from itertools import chain
+from tqdm import tqdm
+from typing import Iterable, Iterator, List
+
+DELTA_DIR = "delta"
+DELTA_VERSION = 1
+DELTA_ARRAYS = ["new_nodes", "added", "removed", "relabel"]
+
+def _edge_keys(edges: np.ndarray, num_nodes: int) -> np.ndarray:
+    """
+    One integer per undirected edge, independent of the direction it is listed in
+    """
+    edges = edges.astype(np.int64)
+    return np.minimum(edges[:, 0], edges[:, 1]) * num_nodes + np.maximum(edges[:, 0], edges[:, 1])
+
+def _unique_edges(edges: np.ndarray, num_nodes: int) -> np.ndarray:
+    """
+    Drop repeated edges, keeping the first occurrence of each in file order
+    """
+    _, first = np.unique(_edge_keys(edges, num_nodes), return_index=True)
+    return edges[np.sort(first)]
+
+def convert_to_delta(data_path: str, out_path: str=None, workers: int=None) -> str:
+    """
+    Convert a dataset of Greene et al. (2010) into a base snapshot plus the changes of every following time step
+
+    Every step stores the nodes seen for the first time, the added and removed edges as int32 pairs of node indices and
+    the nodes whose community id changed (to -1 when they left the snapshot), so that its size follows the churn
+    rather than the size of the graph. Returns the folder the delta files were written to, by default `delta` inside
+    the dataset
+    """
+    out_path = out_path if out_path is not None else os.path.join(data_path, DELTA_DIR)
+    temporal_ids, parsed, cache_path = _prepare_snapshots(data_path, True, workers)
+    os.makedirs(out_path, exist_ok=True)
+
+    base_step = temporal_ids[0]
+    base = parsed[base_step] if base_step in parsed else _read_cache(cache_path, base_step)
+    _write_cache(out_path, base_step, base)
+
+    index = {node: i for i, node in enumerate(base["nodes"].tolist())}
+    prev_edges = _unique_edges(np.asarray(base["edges"]), len(index))
+    prev_labels = np.asarray(base["labels"])
+    for time_step in tqdm(temporal_ids[1:], desc="delta"):
+        arrays = parsed[time_step] if time_step in parsed else _read_cache(cache_path, time_step)
+        nodes = arrays["nodes"].tolist()
+        new_nodes = [node for node in nodes if node not in index]
+        for node in new_nodes:
+            index[node] = len(index)
+        to_global = np.array([index[node] for node in nodes], dtype=np.int32)
+
+        num_nodes = len(index)
+        edges = _unique_edges(to_global[np.asarray(arrays["edges"])].reshape(-1, 2), num_nodes)
+        keys = _edge_keys(edges, num_nodes)
+        prev_keys = _edge_keys(prev_edges, num_nodes)
+        added = edges[~np.isin(keys, prev_keys)]
+        removed = prev_edges[~np.isin(prev_keys, keys)]
+
+        labels = np.full(num_nodes, -1, dtype=np.int32)
+        labels[to_global] = arrays["labels"]
+        previous = np.full(num_nodes, -1, dtype=np.int32)
+        previous[:len(prev_labels)] = prev_labels
+        changed = np.flatnonzero(labels != previous).astype(np.int32)
+        relabel = np.stack([changed, labels[changed]], axis=1)
+
+        _write_cache(out_path, time_step, {"new_nodes": np.array(new_nodes, dtype=str),
+                                           "added": added.astype(np.int32),
+                                           "removed": removed.astype(np.int32),
+                                           "relabel": relabel})
+        prev_edges = edges
+        prev_labels = labels
+
+    with open(os.path.join(out_path, "manifest.json.tmp"), "w") as file:
+        json.dump({"version": DELTA_VERSION, "time_steps": temporal_ids}, file)
+    os.replace(os.path.join(out_path, "manifest.json.tmp"), os.path.join(out_path, "manifest.json"))
+
+    return out_path
+
+def _copy_on_write(graph: nx.Graph, nodes: Iterable) -> nx.Graph:
+    """
+    Copy of graph that shares the neighbours and attributes of every node but those of nodes with it, so that the copy
+    can be changed around nodes without changing graph. Copying the outer dicts costs far less than graph.copy, which
+    adds every edge again. The attribute dicts of the edges are shared as well
+    """
+    new_graph = graph.__class__()
+    new_graph.graph.update(graph.graph)
+    new_graph._adj = graph._adj.copy()
+    new_graph._node = graph._node.copy()
+    for node in nodes:
+        if node in new_graph._adj:
+            new_graph._adj[node] = new_graph._adj[node].copy()
+            new_graph._node[node] = new_graph._node[node].copy()
+    return new_graph
+
+class DeltaGraphStream:
+    """
+    Snapshots of a delta-encoded dataset, replayed from the base snapshot every time the stream is iterated
+
+    Every snapshot has its time step in graph.graph["time_step"], the one of the snapshot before it in
+    graph.graph["delta_from"] and the changes since then in graph.graph["delta"], in the (added_edges, removed_edges,
+    removed_nodes) form of louvain_variant.utils.snapshot_delta. The snapshots have the same nodes, edges and community
+    ids as the full files, nodes and neighbours are in the order they were added by the replay though, and the members
+    in the "community" attribute in the order they joined.
+
+    By default every snapshot is a new graph that only has its own neighbours and attributes for the nodes a step
+    touched and shares the rest with the snapshot before it, so snapshots stay valid after the next one is produced.
+    With live the stream hands out one graph that is changed in place by every step, which also changes the member
+    list in the "community" attribute of only the nodes that moved: a snapshot is then only valid until the next one
+    is produced, but a step costs about the size of its changes.
+    """
+    def __init__(self, delta_path: str, live: bool=False):
+        self.delta_path = delta_path
+        self.live = live
+        with open(os.path.join(delta_path, "manifest.json"), "r") as file:
+            manifest = json.load(file)
+        if manifest.get("version") != DELTA_VERSION:
+            raise ValueError(f"Unsupported delta format version ({manifest.get('version')})")
+        self.temporal_ids = manifest["time_steps"]
+        self._start = 0 # the time steps handed out, those before start are only replayed
+        self._stop = len(self.temporal_ids)
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __getitem__(self, index: slice) -> "DeltaGraphStream":
+        """
+        Stream of consecutive time steps, which are replayed from the base snapshot as well
+        """
+        start, stop, step = index.indices(len(self))
+        if step != 1:
+            raise ValueError("Only consecutive time steps can be replayed")
+        stream = copy.copy(self)
+        stream._start, stream._stop = self._start + start, self._start + max(start, stop)
+        return stream
+
+    def _read_step(self, time_step: int) -> dict:
+        return {name: np.load(os.path.join(self.delta_path, f"t{time_step}.{name}.npy"), mmap_mode="r")
+                for name in DELTA_ARRAYS}
+
+    def __iter__(self) -> Iterator[nx.Graph]:
+        if not len(self):
+            return
+        base_step = self.temporal_ids[0]
+        base = {name: np.load(os.path.join(self.delta_path, f"t{base_step}.{name}.npy"), mmap_mode="r") for name in CACHE_ARRAYS}
+        graph = _build_graph(base)
+        nodes = base["nodes"].tolist()
+        labels = base["labels"].tolist()
+        communities = {}
+        for node in graph:
+            if "community_id" in graph.nodes[node]:
+                communities.setdefault(graph.nodes[node]["community_id"], graph.nodes[node]["community"])
+        graph.graph["time_step"] = base_step
+        graph.graph["delta_from"] = None
+        graph.graph["delta"] = ([], [], [])
+        if self._start == 0:
+            yield graph
+
+        for position in range(1, self._stop):
+            time_step = self.temporal_ids[position]
+            step = self._read_step(time_step)
+            nodes += step["new_nodes"].tolist()
+            labels += [-1] * len(step["new_nodes"])
+            removed_edges = [(nodes[source], nodes[target], 1) for source, target in step["removed"].tolist()]
+            added_edges = [(nodes[source], nodes[target], 1) for source, target in step["added"].tolist()]
+            relabel = step["relabel"].tolist()
+            moved = [nodes[node_index] for node_index, _ in relabel]
+
+            if not self.live:
+                # every member of a changed community gets the new member list, the snapshots before keep theirs
+                changed_ids = {labels[node_index] for node_index, _ in relabel} | {community_id for _, community_id in relabel}
+                rewritten = [member for community_id in changed_ids if community_id >= 0
+                             for member in communities.get(community_id, [])]
+                touched = set(chain((node for edge in chain(removed_edges, added_edges) for node in edge[:2]), moved, rewritten))
+                graph = _copy_on_write(graph, touched)
+            graph.remove_edges_from(removed_edges)
+            graph.add_edges_from((source, target) for source, target, _ in added_edges)
+            endpoints = dict.fromkeys(node for edge in removed_edges for node in edge[:2])
+            removed_nodes = [node for node, degree in graph.degree(endpoints) if degree == 0]
+            graph.remove_nodes_from(removed_nodes)
+
+            changed = {}
+            for (node_index, community_id), node in zip(relabel, moved):
+                for old_or_new in (labels[node_index], community_id):
+                    if old_or_new >= 0 and old_or_new not in changed:
+                        members = communities.setdefault(old_or_new, [])
+                        changed[old_or_new] = members if self.live else list(members)
+                if labels[node_index] >= 0:
+                    changed[labels[node_index]].remove(node)
+                if community_id >= 0:
+                    changed[community_id].append(node)
+                elif node in graph:
+                    graph.nodes[node].pop("community_id", None)
+                    graph.nodes[node].pop("community", None)
+                labels[node_index] = community_id
+            communities.update(changed)
+            if self.live:
+                for (_, community_id), node in zip(relabel, moved):
+                    if community_id >= 0 and node in graph:
+                        graph.nodes[node]["community_id"] = community_id
+                        graph.nodes[node]["community"] = communities[community_id]
+            else:
+                for community_id, members in changed.items():
+                    for member in members:
+                        graph.nodes[member]["community_id"] = community_id
+                        graph.nodes[member]["community"] = members
+
+            graph.graph["delta_from"] = graph.graph["time_step"]
+            graph.graph["time_step"] = time_step
+            graph.graph["delta"] = (added_edges, removed_edges, removed_nodes)
+            if position >= self._start:
+                yield graph
+
+def load_delta_data(data_path: str, lazy: bool=False) -> List[nx.Graph]|DeltaGraphStream:
+    """
+    Replay the delta files of a dataset, written by convert_to_delta, into its snapshots
+
+    With lazy the DeltaGraphStream is returned instead of the list of graphs. It hands out one graph that every step
+    changes in place (see DeltaGraphStream), so a snapshot is only valid until the next one is produced
+    """
+    if lazy:
+        return DeltaGraphStream(os.path.join(data_path, DELTA_DIR), live=True)
+    stream = DeltaGraphStream(os.path.join(data_path, DELTA_DIR))
+
+    # as in load_dyn_data, collection passes over the growing list of graphs are wasted time
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return list(tqdm(stream, total=len(stream)))
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+if __name__ == "__main__":
+    for data_path in sys.argv[1:]:
+        print(convert_to_delta(data_path))
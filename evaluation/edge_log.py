@@ -0,0 +1,126 @@
+import numpy as np
+
+from typing import Dict, Iterator, List, Tuple
+
+class EdgeLog:
+    """
+    Temporal edges as src, dst and ts columns sorted by timestamp
+
+    Time ranges are found by binary search on ts and returned as EdgeLogs over views of the same arrays, so slicing
+    costs O(log n) and copies nothing, memory-mapped columns stay on disk. For the code written against the
+    {timestamp: [(src, dst), ...]} dicts it replaces, an EdgeLog also reads as one: its keys are the distinct
+    timestamps in order, len is their number and items groups the edges per timestamp.
+    """
+    def __init__(self, src: np.ndarray, dst: np.ndarray, ts: np.ndarray):
+        if not len(src) == len(dst) == len(ts):
+            raise ValueError("The src, dst and ts columns have to be of the same length")
+        self.src = src
+        self.dst = dst
+        self.ts = ts
+        self._starts = None
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray]) -> "EdgeLog":
+        """
+        Edge log of src, dst and ts columns, used as they are when already sorted by time, otherwise sorted stably
+        """
+        ts = columns["ts"]
+        if len(ts) < 2 or np.all(ts[1:] >= ts[:-1]):
+            return cls(columns["src"], columns["dst"], ts)
+        order = np.argsort(ts, kind="stable")
+        return cls(columns["src"][order], columns["dst"][order], ts[order])
+
+    @classmethod
+    def from_dict(cls, dict_graph: Dict[int, List[Tuple[int, int]]]) -> "EdgeLog":
+        """
+        Edge log of temporal edges given as {timestamp: [(src, dst), ...]}
+        """
+        counts = [len(node_pairs) for node_pairs in dict_graph.values()]
+        pairs = np.array([pair for node_pairs in dict_graph.values() for pair in node_pairs], dtype=np.int64).reshape(-1, 2)
+        ts = np.repeat(np.array(list(dict_graph.keys()), dtype=np.int64), counts)
+        return cls.from_columns({"src": pairs[:, 0], "dst": pairs[:, 1], "ts": ts})
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.ts)
+
+    @property
+    def starts(self) -> np.ndarray:
+        """
+        Position of the first edge of every distinct timestamp, followed by the number of edges
+        """
+        if self._starts is None and not len(self.ts):
+            self._starts = np.zeros(1, dtype=np.int64)
+        elif self._starts is None:
+            self._starts = np.concatenate([[0], np.flatnonzero(self.ts[1:] != self.ts[:-1]) + 1, [len(self.ts)]])
+        return self._starts
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.ts[self.starts[:-1]]
+
+    def __len__(self) -> int:
+        return len(self.starts) - 1
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.timestamps.tolist())
+
+    def keys(self) -> List[int]:
+        return self.timestamps.tolist()
+
+    def values(self) -> Iterator[List[Tuple[int, int]]]:
+        return (node_pairs for _, node_pairs in self.items())
+
+    def items(self) -> Iterator[Tuple[int, List[Tuple[int, int]]]]:
+        pairs = list(zip(self.src.tolist(), self.dst.tolist()))
+        starts = self.starts.tolist()
+        for timestamp, start, stop in zip(self.timestamps.tolist(), starts, starts[1:]):
+            yield timestamp, pairs[start:stop]
+
+    def _view(self, start: int, stop: int) -> "EdgeLog":
+        return EdgeLog(self.src[start:stop], self.dst[start:stop], self.ts[start:stop])
+
+    def between(self, start_time: int=None, stop_time: int=None) -> "EdgeLog":
+        """
+        The edges with start_time <= ts < stop_time, an open end when None
+        """
+        start = 0 if start_time is None else int(np.searchsorted(self.ts, start_time, side="left"))
+        stop = len(self.ts) if stop_time is None else int(np.searchsorted(self.ts, stop_time, side="left"))
+        return self._view(start, max(start, stop))
+
+    def steps(self, start: int=None, stop: int=None) -> "EdgeLog":
+        """
+        The edges of the distinct timestamps start to stop (by position, as a slice), as islice over the items of a dict
+        """
+        start, stop, _ = slice(start, stop).indices(len(self))
+        return self._view(int(self.starts[start]), int(self.starts[max(start, stop)]))
+
+    def batches(self, size: int=None, duration: int=None) -> Iterator["EdgeLog"]:
+        """
+        Consecutive batches of size edges, the last one can be smaller, or of the edges of every duration time units
+        from the first timestamp on, empty for a span without edges. A timestamp can be split over batches of a size
+        """
+        if (size is None) == (duration is None):
+            raise ValueError("Give either a size or a duration")
+        if (size is not None and size <= 0) or (duration is not None and duration <= 0):
+            raise ValueError("The size and duration of a batch have to be positive")
+        if size is not None:
+            for start in range(0, len(self.ts), size):
+                yield self._view(start, start + size)
+            return
+        if not len(self.ts):
+            return
+        num_batches = int((self.ts[-1] - self.ts[0]) // duration) + 1
+        bounds = self.ts[0] + duration * np.arange(num_batches + 1)
+        positions = np.searchsorted(self.ts, bounds, side="left").tolist()
+        for start, stop in zip(positions, positions[1:]):
+            yield self._view(start, stop)
+
+    def nodes(self) -> np.ndarray:
+        """
+        The distinct nodes of the edges, sorted
+        """
+        return np.unique(np.concatenate([self.src, self.dst]))
+
+    def to_dict(self) -> Dict[int, List[Tuple[int, int]]]:
+        return dict(self.items())
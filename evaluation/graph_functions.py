@@ -1,7 +1,17 @@
 import networkx as nx
+import numpy as np
+import random
 
-def build_graph(dict, G = nx.Graph()): ### Build the graph from a dictionary
+from evaluation.edge_log import EdgeLog
+from scipy.sparse import coo_matrix
+
+def build_graph(dict, G = nx.Graph()): ### Build the graph from a dictionary or an EdgeLog
     print("Building Graph...")
+    if isinstance(dict, EdgeLog): # all edges at once from the columns
+        keep = dict.src != dict.dst
+        G.add_edges_from(zip(dict.src[keep].tolist(), dict.dst[keep].tolist()))
+        print(f"Building progress: {100}%")
+        return G
     time_length = len(dict.keys())
     i = 0
     for key, node_pairs in dict.items():
@@ -51,3 +61,76 @@ def count_edges_within_community(G, partition):
             community_edges[community_u] += 1
     
     return community_edges
+
+def community_adjacency(G, partition): ### Sparse community x community edge counts, in one pass over the edges
+    # Returns the labels of the communities (sorted, a community is its position in them), the community of every node
+    # of partition, the edges inside every community with the position in G.edges() of the first of them (-1 without),
+    # and the edges between communities as a scipy.sparse csr_matrix. The neighbours in every row are not sorted but in
+    # the order count_edges_between_communities first meets them, which keeps the draws of merge_weak_communities
+    index = {node: i for i, node in enumerate(partition)}
+    labels, node_com = np.unique(np.array(list(partition.values())), return_inverse=True)
+    num_coms = len(labels)
+    edges = np.fromiter((index[node] for edge in G.edges() for node in edge), dtype=np.int64,
+                        count=2 * G.number_of_edges()).reshape(-1, 2)
+    com_u = node_com[edges[:, 0]]
+    com_v = node_com[edges[:, 1]]
+    inside = com_u == com_v
+
+    within = np.bincount(com_u[inside], minlength=num_coms)
+    within_first = np.full(num_coms, -1, dtype=np.int64)
+    coms, first = np.unique(com_u[inside], return_index=True)
+    within_first[coms] = np.flatnonzero(inside)[first]
+
+    # every edge between communities in both directions, tocsr sums those of a pair into its count
+    low = np.minimum(com_u, com_v)[~inside]
+    high = np.maximum(com_u, com_v)[~inside]
+    between = coo_matrix((np.ones(2 * len(low), dtype=np.int64), (np.concatenate([low, high]), np.concatenate([high, low]))),
+                         shape=(num_coms, num_coms)).tocsr()
+    # tocsr sorts the neighbours of every row, the first edge of every pair (lowest, highest) puts them back in order
+    pairs, first = np.unique(low * num_coms + high, return_index=True)
+    row = np.repeat(np.arange(num_coms), np.diff(between.indptr))
+    keys = np.minimum(row, between.indices) * num_coms + np.maximum(row, between.indices)
+    order = np.lexsort((first[np.searchsorted(pairs, keys)], row))
+    between.indices = between.indices[order]
+    between.data = between.data[order]
+    between.has_sorted_indices = False
+    return labels, node_com, within, within_first, between
+
+def merge_weak_communities(G, partition, threshold, seed=None):
+    if seed is not None:
+        random.seed(seed)
+
+    # Edge counts within and between communities, as a sparse community x community matrix
+    labels, node_com, within, within_first, between = community_adjacency(G, partition)
+    indptr, neighbours, counts = between.indptr, between.indices, between.data
+
+    # Communities to be merged, in the order count_edges_within_community finds them (those without inner edges are not)
+    weak = np.flatnonzero((within_first >= 0) & (within < threshold))
+    weak = weak[np.argsort(within_first[weak])]
+
+    # The neighbouring communities with the max edge count of every community, in the order of the between counts
+    row = np.repeat(np.arange(len(labels)), np.diff(indptr))
+    max_edges = np.zeros(len(labels), dtype=counts.dtype)
+    starts = indptr[:-1][np.diff(indptr) > 0]
+    if len(starts):
+        max_edges[row[starts]] = np.maximum.reduceat(counts, starts)
+    top = counts == max_edges[row]
+    top_ptr = np.concatenate([[0], np.cumsum(np.bincount(row[top], minlength=len(labels)))]).tolist()
+    top_targets = neighbours[top].tolist()
+
+    # Randomly select a merge target from top targets, one draw per weak community that has neighbours
+    target = np.arange(len(labels))
+    for comm in weak.tolist():
+        if top_ptr[comm] < top_ptr[comm + 1]:
+            target[comm] = random.choice(top_targets[top_ptr[comm]:top_ptr[comm + 1]])
+
+    # Nodes that ended up in a community to be merged (whose target was weak too, or that had none) go to 0, and
+    # are dropped if 0 is itself one of those communities
+    merged = np.zeros(len(labels), dtype=bool)
+    merged[weak] = True
+    new_com = target[node_com]
+    values = np.where(merged[new_com], 0, labels[new_com]).tolist()
+    dropped = merged[new_com] & bool(np.any(labels[weak] == 0))
+    new_partition = {node: value for node, value, drop in zip(partition, values, dropped.tolist()) if not drop}
+
+    return new_partition
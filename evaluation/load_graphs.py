@@ -1,39 +1,206 @@
+import gc
+import json
 import networkx as nx
+import numpy as np
 import os
 
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from tqdm import tqdm
-from typing import List
+from typing import Iterator, List, Tuple
 
-def load_dyn_data(data_path: str) -> List[nx.Graph]:
+CACHE_DIR = ".cache"
+CACHE_VERSION = 1
+CACHE_ARRAYS = ["nodes", "edges", "labels", "members", "offsets"]
+
+def _snapshot_files(data_path: str, time_step: int) -> List[str]:
     """
-    Load data generated by Greene et al. (2010)
-    Each time step is a separate file with its own communitites and edges 
+    Paths of the edge and community file of one time step
+    """
+    prefix = f"switch.t{time_step}" if time_step >= 10 else f"switch.t0{time_step}"
+    return [os.path.join(data_path, prefix + ".edges"), os.path.join(data_path, prefix + ".comm")]
+
+def _file_key(path: str) -> list:
+    """
+    Modification time and size of a file, the cache of a snapshot is rebuilt when they change
+    """
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+def _parse_snapshot(files: List[str]) -> dict:
+    """
+    Parse the edge and community file of one time step into arrays
+
+    Nodes are numbered in order of first appearance in the edge file, which is the order in which networkx would add
+    them. The members of every community are kept in file order, flattened with offsets, next to the community id of
+    every node (-1 if it is in none, the last community if it is in several).
+    """
+    file_name_edges, file_name_coms = files
+    with open(file_name_edges, "r") as file:
+        tokens = np.array(file.read().split(), dtype=str)
+    nodes, first, inverse = np.unique(tokens, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind="stable")
+    rank = np.empty(len(order), dtype=np.int32)
+    rank[order] = np.arange(len(order), dtype=np.int32)
+    edges = rank[inverse].reshape(-1, 2)
+    nodes = nodes[order]
+
+    index = {node: i for i, node in enumerate(nodes.tolist())}
+    members = []
+    offsets = [0]
+    with open(file_name_coms, "r") as file:
+        while community := file.readline():
+            members += [index[member] for member in community.strip().split(" ")]
+            offsets += [len(members)]
+    members = np.array(members, dtype=np.int32)
+    offsets = np.array(offsets, dtype=np.int64)
+    labels = np.full(len(nodes), -1, dtype=np.int32)
+    labels[members] = np.repeat(np.arange(len(offsets) - 1, dtype=np.int32), np.diff(offsets))
+
+    return {"nodes": nodes, "edges": edges, "labels": labels, "members": members, "offsets": offsets}
+
+def _build_graph(arrays: dict) -> nx.Graph:
+    """
+    Turn the arrays of one time step back into the graph load_dyn_data returns
+    """
+    graph = nx.Graph()
+    nodes = arrays["nodes"].tolist()
+    graph.add_nodes_from(nodes)
+    graph.add_edges_from((nodes[source], nodes[target]) for source, target in arrays["edges"].tolist())
+    members = arrays["members"].tolist()
+    offsets = arrays["offsets"].tolist()
+    for community_id in range(len(offsets) - 1):
+        community = [nodes[member] for member in members[offsets[community_id]:offsets[community_id + 1]]]
+        for member in community:
+            graph.nodes[member]["community_id"] = community_id
+            graph.nodes[member]["community"] = community
+
+    return graph
+
+def _write_cache(cache_path: str, time_step: int, arrays: dict):
+    """
+    Store the arrays of one time step, every file is written under a temporary name first
+    """
+    for name, array in arrays.items():
+        path = os.path.join(cache_path, f"t{time_step}.{name}.npy")
+        with open(path + ".tmp", "wb") as file:
+            np.save(file, array)
+        os.replace(path + ".tmp", path)
+
+def _read_cache(cache_path: str, time_step: int) -> dict:
+    return {name: np.load(os.path.join(cache_path, f"t{time_step}.{name}.npy"), mmap_mode="r") for name in CACHE_ARRAYS}
+
+def _prepare_snapshots(data_path: str, cache: bool, workers: int) -> Tuple[List[int], dict, str]:
+    """
+    Find the time steps of a dataset and parse those that are not cached (yet), returns the time steps, the arrays
+    parsed in this call and the cache folder
     """
-    temporal_graph = []
     temporal_ids = []
     for com_snapshot_file in os.listdir(data_path):
         if "comm" not in com_snapshot_file:
             continue
         temporal_ids += [int(com_snapshot_file.removesuffix(".comm").removeprefix("switch.")[1:])]
-
     temporal_ids = sorted(temporal_ids)
-    for time_step in tqdm(temporal_ids):
-        graph = nx.Graph()
-        file_name_edges = f"switch.t{time_step}.edges" if time_step >= 10 else f"switch.t0{time_step}.edges"
-        with open(os.path.join(data_path,file_name_edges), "r") as file:
-            while edge := file.readline():
-                source, target = edge.strip().split(" ")
-                graph.add_edge(source, target)
-
-        file_name_coms = f"switch.t{time_step}.comm" if time_step >= 10 else f"switch.t0{time_step}.comm"
-        community_id = 0
-        with open(os.path.join(data_path,file_name_coms), "r") as file:
-            while community := file.readline():
-                community = community.strip().split(" ")
-                for member in community:
-                    graph.nodes[member]["community_id"] = community_id
-                    graph.nodes[member]["community"] = community
-                community_id += 1
-        temporal_graph += [graph]
-
-    return temporal_graph
\ No newline at end of file
+
+    cache_path = os.path.join(data_path, CACHE_DIR)
+    manifest_path = os.path.join(cache_path, "manifest.json")
+    manifest = {}
+    if cache and os.path.exists(manifest_path):
+        with open(manifest_path, "r") as file:
+            manifest = json.load(file)
+        if manifest.get("version") != CACHE_VERSION:
+            manifest = {}
+    snapshots = manifest.get("snapshots", {})
+
+    keys = {time_step: [_file_key(path) for path in _snapshot_files(data_path, time_step)] for time_step in temporal_ids}
+    stale = [time_step for time_step in temporal_ids if not cache or snapshots.get(str(time_step)) != keys[time_step]]
+    parsed = {}
+    if stale:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            arrays = pool.map(_parse_snapshot, [_snapshot_files(data_path, time_step) for time_step in stale])
+            parsed = dict(zip(stale, tqdm(arrays, total=len(stale), desc="parsing")))
+    if cache and stale:
+        os.makedirs(cache_path, exist_ok=True)
+        for time_step, arrays in parsed.items():
+            _write_cache(cache_path, time_step, arrays)
+        snapshots = {str(time_step): keys[time_step] for time_step in temporal_ids}
+        with open(manifest_path + ".tmp", "w") as file:
+            json.dump({"version": CACHE_VERSION, "snapshots": snapshots}, file)
+        os.replace(manifest_path + ".tmp", manifest_path)
+        # later reads go through the memory-mapped cache
+        parsed = {}
+
+    return temporal_ids, parsed, cache_path
+
+class DynGraphStream:
+    """
+    Snapshots of a dataset that are only built into graphs while they are iterated over
+
+    Every iteration starts again from the first snapshot, and with read-ahead the next `prefetch` snapshots are built in
+    a background thread while the current one is in use. Only those and the snapshot handed out are held at any time.
+    Indexing gives a single snapshot, slicing another stream.
+    """
+    def __init__(self, temporal_ids: List[int], parsed: dict, cache_path: str, prefetch: int=1):
+        self.temporal_ids = temporal_ids
+        self.parsed = parsed
+        self.cache_path = cache_path
+        self.prefetch = prefetch
+
+    def __len__(self) -> int:
+        return len(self.temporal_ids)
+
+    def _build(self, time_step: int) -> nx.Graph:
+        arrays = self.parsed[time_step] if time_step in self.parsed else _read_cache(self.cache_path, time_step)
+        return _build_graph(arrays)
+
+    def __getitem__(self, index: int|slice) -> "nx.Graph|DynGraphStream":
+        if isinstance(index, slice):
+            return DynGraphStream(self.temporal_ids[index], self.parsed, self.cache_path, self.prefetch)
+        return self._build(self.temporal_ids[index])
+
+    def __iter__(self) -> Iterator[nx.Graph]:
+        if self.prefetch <= 0:
+            for time_step in self.temporal_ids:
+                yield self._build(time_step)
+            return
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pending = deque(pool.submit(self._build, time_step) for time_step in self.temporal_ids[:self.prefetch])
+            for time_step in self.temporal_ids[self.prefetch:]:
+                graph = pending.popleft().result()
+                pending.append(pool.submit(self._build, time_step)) # the `prefetch` snapshots after the one handed out
+                yield graph
+            while pending:
+                yield pending.popleft().result()
+
+def load_dyn_data(data_path: str, cache: bool=True, workers: int=None, lazy: bool=False, prefetch: int=1, delta: bool=False) -> List[nx.Graph]|DynGraphStream:
+    """
+    Load data generated by Greene et al. (2010)
+    Each time step is a separate file with its own communitites and edges
+
+    The parsed snapshots are cached as NumPy arrays in a .cache folder next to the files and memory-mapped on later
+    loads. A snapshot is parsed again, in parallel over `workers` processes, when its files changed in modification time
+    or size. With `lazy` a DynGraphStream is returned instead of the list of graphs, reading `prefetch` snapshots ahead.
+    With `delta` the snapshots are replayed from the delta files written by evaluation.delta_format.convert_to_delta
+    """
+    if delta:
+        from evaluation.delta_format import load_delta_data # imports this module
+        return load_delta_data(data_path, lazy=lazy)
+
+    temporal_ids, parsed, cache_path = _prepare_snapshots(data_path, cache, workers)
+    if lazy:
+        return DynGraphStream(temporal_ids, parsed, cache_path, prefetch)
+
+    # the graphs only add objects, so collection passes over them are wasted time
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        temporal_graph = []
+        for time_step in tqdm(temporal_ids):
+            arrays = parsed[time_step] if time_step in parsed else _read_cache(cache_path, time_step)
+            temporal_graph += [_build_graph(arrays)]
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    return temporal_graph
@@ -1,5 +1,4 @@
-from collections import defaultdict
-from itertools import islice
+from itertools import chain
 import os
 import copy
 
@@ -10,8 +9,10 @@ from louvain_variant import louvain_variant
 
 from functools import partial
 from evaluation.save_load_stackoverflow import save_dict, load_graph
-from evaluation.graph_functions import build_graph, count_edges_between_communities, count_edges_within_community
+from evaluation.graph_functions import build_graph, count_edges_between_communities
 from evaluation.draw_graph import draw_community_graph
+from evaluation.sliding_window import SlidingWindowGraph
+from evaluation.temporal_wrapper import TemporalLouvainIterator
 
 import time
 
@@ -22,80 +23,36 @@ def eval_time_com(method):
     stop_time = time.time() - start_time
     return partition, stop_time
 
-def merge_weak_communities(G, partition, threshold, seed=None):
-    if seed is not None:
-        random.seed(seed)
-
-    # Compute within-community edge counts
-    within_counts = count_edges_within_community(G, partition)
-
-    # Compute between-community edge counts
-    between_counts = count_edges_between_communities(G, partition)
-
-    # Invert partition for convenience: {community: set(nodes)}
-    community_nodes = defaultdict(set)
-    for node, comm in partition.items():
-        community_nodes[comm].add(node)
-
-    # Communities to be merged
-    to_merge = [comm for comm, count in within_counts.items() if count < threshold]
-
-    # Track new community assignments
-    new_partition = partition.copy()
-    target = {}
-    for comm in to_merge:
-        # Find all neighboring communities and their edge counts
-        neighbors = {}
-        for (c1, c2), edge_count in between_counts.items():
-            if comm == c1:
-                neighbors[c2] = edge_count
-            elif comm == c2:
-                neighbors[c1] = edge_count
-
-        if not neighbors:
-            continue  # No valid merge target
-
-        # Get the max edge count(s)
-        max_edges = max(neighbors.values())
-        top_targets = [c for c, e in neighbors.items() if e == max_edges]
-
-        # Randomly select a merge target from top targets
-        
-        target_comm = random.choice(top_targets)
-        #print(comm)
-        #if comm == 6:
-        #    print(comm)
-        for node in community_nodes[comm]:
-            new_partition[node] = target_comm
-
-        # Reassign all nodes from comm to target_comm
-    for comm in to_merge:
-        for node, comm2 in new_partition.items():
-            if comm2 == comm:
-                
-                new_partition[node] = 0
-    new_partition = {k: v for k, v in new_partition.items() if v not in to_merge}
-   
-    return new_partition
-
-
 # Time length is the starting time from which we build the graph
 start_length = 100000
 max_length = 100000
 time_steps = 2
 averages = 1
+# Windowed mode: interactions expire after window seconds, or decay with the given half-life, instead of staying for ever
+window = None
+half_life = None
 
 step_size = int((max_length-start_length)/time_steps)
 # Load the starting graph from the json file
 dict_graph = load_graph(f"graph{max_length}")
 
-truncated_dict = dict(islice(dict_graph.items(), start_length))
+truncated_dict = dict_graph.steps(0, start_length)
 #if len(dict_graph) > max_length:
     #del dict_graph # Remove the graph to free memory
 
 if not os.path.exists(f"graph{start_length}.json"):
     save_dict(truncated_dict,f"graph{start_length}")
 
+if window is not None or half_life is not None:
+    # the variant keeps one status up to date with what arrived and expired, the nodes that lost edges are re-evaluated
+    batches = (dict_graph.steps(start_length+step_size*(i-1), start_length+step_size*i) for i in range(1, time_steps+1))
+    sliding_graph = SlidingWindowGraph(window=window, half_life=half_life)
+    windowed = TemporalLouvainIterator(louvain_variant.best_partition, prev_partition=True, incremental=True, soft_removed=True, random_state=42)
+    partitions, times = windowed.process_temporal_graph(sliding_graph.snapshots(chain([truncated_dict], batches)), measure_time=True)
+    print(f"Windowed times: {times}")
+    print(f"Window sizes: {sliding_graph.graph.number_of_nodes()} nodes, {sliding_graph.graph.number_of_edges()} edges")
+    exit()
+
 
 # Buld the graph
 Graph = build_graph(truncated_dict)
@@ -142,14 +99,12 @@ for seed in seeds:
         
         
         core_threshold = sum(count_edges_between_communities(G, partition_var).values())/G.number_of_edges()
-        trunc_dict = dict(islice(dict_graph.items(),start_length+step_size*(i-1), start_length+step_size*i))
-        for nodes in trunc_dict.values():
-            for edge in nodes:
-                for node in edge:
-                    if node not in partition_ayn:
-                        partition_ayn[node] = -1
-                    if node not in partition_var:
-                        partition_var[node] = -1
+        trunc_dict = dict_graph.steps(start_length+step_size*(i-1), start_length+step_size*i)
+        for node in trunc_dict.nodes().tolist():
+            if node not in partition_ayn:
+                partition_ayn[node] = -1
+            if node not in partition_var:
+                partition_var[node] = -1
 
         G = build_graph(trunc_dict,G)
         start_time = time.time()
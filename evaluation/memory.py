@@ -0,0 +1,53 @@
+import psutil
+import threading
+import tracemalloc
+
+TRACE_FRAMES = 10 # deep enough to find the louvain_variant frame under networkx and NumPy calls
+
+class MemoryTracker:
+    """
+    Memory use of one call at a time, used as a context manager around it
+
+    The resident set size of the process is sampled by a background thread every `interval` seconds, so its peak
+    during the call is known, and tracemalloc gives the peak of the Python allocations made during the call.
+    tracemalloc is started on first use if it is not tracing yet and slows the traced code down considerably, so the
+    measured times of a tracked run are not comparable to those of an untracked one. stop ends the tracing again.
+    """
+    def __init__(self, interval: float=0.005):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.usage = None
+        self._started = False
+        self._done = threading.Event()
+        self._peak_rss = 0
+
+    def _sample(self):
+        while not self._done.wait(self.interval):
+            self._peak_rss = max(self._peak_rss, self.process.memory_info().rss)
+
+    def __enter__(self) -> "MemoryTracker":
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+            self._started = True
+        tracemalloc.reset_peak()
+        self._peak_rss = self.process.memory_info().rss
+        self._done.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._done.set()
+        self._thread.join()
+        rss = self.process.memory_info().rss
+        _, traced_peak = tracemalloc.get_traced_memory()
+        self.usage = {"peak_rss": max(self._peak_rss, rss), "rss": rss, "traced_peak": traced_peak}
+        return False
+
+    def stop(self):
+        """
+        Stop tracemalloc if this tracker started it
+        """
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
@@ -0,0 +1,92 @@
+import networkx as nx
+import numpy as np
+import weakref
+
+from louvain_variant.csr_graph import CSRGraph
+from math import log
+from scipy.sparse import csr_matrix
+from sklearn.metrics import mutual_info_score
+from sklearn.metrics.cluster import contingency_matrix
+from typing import Iterable, List, Tuple
+
+_SNAPSHOT_ARRAYS = weakref.WeakKeyDictionary()
+
+def snapshot_arrays(graph: nx.Graph) -> Tuple[CSRGraph, np.ndarray]:
+    """
+    CSR arrays and ground-truth community ids of a snapshot, kept for as long as the graph itself so that every run
+    evaluated on it shares them. They are built again once the time step of the graph changed, as that of the graph a
+    live DeltaGraphStream changes in place
+    """
+    time_step = graph.graph.get("time_step")
+    entry = _SNAPSHOT_ARRAYS.get(graph)
+    if entry is None or entry[0] != time_step:
+        csr = CSRGraph.from_networkx(graph)
+        labels_true = np.fromiter((d["community_id"] for _, d in graph.nodes(data=True)), dtype=np.int64, count=len(graph))
+        entry = _SNAPSHOT_ARRAYS[graph] = (time_step, csr, labels_true)
+    return entry[1:]
+
+def partition_labels(graph: nx.Graph, partition: dict) -> np.ndarray:
+    """
+    Community of every node of graph, in node order
+    """
+    return np.fromiter((partition[node] for node in graph), dtype=np.int64, count=len(graph))
+
+def _entropy(counts: np.ndarray) -> float:
+    """
+    Entropy of a labelling given the sizes of its labels, as sklearn computes it
+    """
+    if counts.sum() == 0:
+        return 1.0
+    if counts.size == 1:
+        return 0.0
+    counts_sum = np.sum(counts)
+    return float(-np.sum((counts / counts_sum) * (np.log(counts) - log(counts_sum))))
+
+def _nmi_from_contingency(contingency: csr_matrix) -> float:
+    """
+    Arithmetic NMI from a sparse contingency table without empty rows or columns, with the special cases of
+    sklearn.metrics.normalized_mutual_info_score
+    """
+    num_classes, num_clusters = contingency.shape
+    if num_classes == num_clusters == 1 or num_classes == num_clusters == 0:
+        return 1.0
+    mi = mutual_info_score(None, None, contingency=contingency)
+    if mi == 0:
+        return 0.0
+
+    normalizer = np.mean([_entropy(np.ravel(contingency.sum(axis=1))), _entropy(np.ravel(contingency.sum(axis=0)))])
+    return float(mi / normalizer)
+
+def nmi(labels_true: np.ndarray, labels_pred: np.ndarray) -> float:
+    """
+    Normalized mutual information (arithmetic mean) of two labellings, from their sparse contingency table
+    """
+    return _nmi_from_contingency(contingency_matrix(labels_true, labels_pred, sparse=True))
+
+def modularity(graph: CSRGraph, labels: np.ndarray) -> float:
+    """
+    Modularity of the partition of a CSRGraph given by the label of every node, as community_louvain.modularity
+    """
+    links = graph.size()
+    if links == 0:
+        raise ValueError("A graph without link has an undefined modularity")
+
+    _, codes = np.unique(labels, return_inverse=True)
+    _, _, internals = graph.neighbourhood_stats(codes)
+    inc = np.bincount(codes, weights=internals)
+    deg = np.bincount(codes, weights=graph.degrees)
+    return float(np.sum(inc / links - (deg / (2. * links)) ** 2))
+
+def compute_metrics(temporal_graph: Iterable[nx.Graph], partitions: List[dict]) -> Tuple[List[float], List[float]]:
+    """
+    NMI against the ground truth and modularity of the partition of every snapshot, in one pass over the snapshots
+    """
+    nmi_scores = []
+    modularity_scores = []
+    for partition, graph in zip(partitions, temporal_graph):
+        csr, labels_true = snapshot_arrays(graph)
+        labels_pred = partition_labels(graph, partition)
+        nmi_scores += [nmi(labels_true, labels_pred)]
+        modularity_scores += [modularity(csr, labels_pred)]
+
+    return nmi_scores, modularity_scores
@@ -0,0 +1,233 @@
+import json
+import numpy as np
+import os
+
+from typing import Iterable, List
+
+KEY_COLUMNS = ["dataset", "method", "threshold", "seed", "timestep"]
+METRIC_COLUMNS = ["time", "nmi", "modularity"]
+PHASE_PREFIX = "phase_"
+MEMORY_COLUMNS = ["peak_rss", "traced_peak"]
+
+class ResultsStore:
+    """
+    Columnar store of the results of run_eval, one folder per experiment
+
+    Every column of the metrics table (dataset, method, threshold, seed, timestep, time, nmi, modularity) is its own
+    .npy file with one row per run and time step, the threshold is NaN for the methods without one. The partitions are
+    one flat int32 array with the offsets of every row, in the node order of their time step, which is stored once. All
+    files are memory-mapped, so only the columns that are asked for are read. Runs that were profiled add a phase_<name>
+    column per phase with its time in seconds summed over the dendrogram levels, NaN for runs without that phase. Runs
+    that tracked their memory add the peak_rss and traced_peak columns in bytes, NaN for runs that did not, and an
+    allocators column with the top allocators of every row as a JSON string, empty when there are none.
+    """
+    def __init__(self, path: str):
+        self.path = path
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.npy")
+
+    def _save(self, name: str, array: np.ndarray):
+        with open(self._file(name) + ".tmp", "wb") as file:
+            np.save(file, array)
+        os.replace(self._file(name) + ".tmp", self._file(name))
+
+    def column(self, name: str) -> np.ndarray:
+        return np.load(self._file(name), mmap_mode="r")
+
+    def metrics(self, columns: Iterable[str]=None) -> dict:
+        """
+        The asked columns of the metrics table, all of them by default
+        """
+        columns = KEY_COLUMNS + METRIC_COLUMNS if columns is None else columns
+        return {name: self.column(name) for name in columns}
+
+    @classmethod
+    def write(cls, path: str, dataset: str, runs: List[tuple]) -> "ResultsStore":
+        """
+        Store runs of (method, threshold or None, seed, result) where result holds the per time step "time", "nmi",
+        "modularity", "partitions" and optionally "phases" and "memory" of a run, as returned by run_eval.eval_method
+        """
+        store = cls(path)
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            if name.startswith(PHASE_PREFIX) or name[:-len(".npy")] in MEMORY_COLUMNS + ["allocators"]:
+                os.remove(os.path.join(path, name)) # of an earlier, profiled or memory tracking write
+        phases = sorted(set(phase for _, _, _, result in runs for timings in result.get("phases", []) for phase in timings))
+        memory = any("memory" in result for _, _, _, result in runs)
+        columns = {name: [] for name in KEY_COLUMNS + METRIC_COLUMNS + [PHASE_PREFIX + phase for phase in phases]
+                   + (MEMORY_COLUMNS + ["allocators"] if memory else [])}
+        node_order = []
+        partitions = []
+        for method, threshold, seed, result in runs:
+            run_phases = set(phase for timings in result.get("phases", []) for phase in timings)
+            for timestep, partition in enumerate(result["partitions"]):
+                if timestep == len(node_order):
+                    node_order += [list(partition)]
+                partitions += [np.fromiter((partition[node] for node in node_order[timestep]), dtype=np.int32,
+                                           count=len(node_order[timestep]))]
+                for name, value in zip(KEY_COLUMNS, (dataset, method, np.nan if threshold is None else threshold, seed, timestep)):
+                    columns[name] += [value]
+                for name in METRIC_COLUMNS:
+                    columns[name] += [result[name][timestep]]
+                for phase in phases:
+                    # 0 at the time steps where a phase of the run did not happen, NaN for phases the run does not have
+                    elapsed = sum(result["phases"][timestep].get(phase, {}).values()) / 1e9 if phase in run_phases else np.nan
+                    columns[PHASE_PREFIX + phase] += [elapsed]
+                if memory:
+                    usage = result["memory"][timestep] if "memory" in result else {}
+                    for name in MEMORY_COLUMNS:
+                        columns[name] += [usage.get(name, np.nan)]
+                    columns["allocators"] += [json.dumps(usage["allocators"]) if "allocators" in usage else ""]
+
+        dtypes = {"dataset": str, "method": str, "threshold": np.float64, "seed": np.int64, "timestep": np.int32, "allocators": str}
+        for name, values in columns.items():
+            store._save(name, np.array(values, dtype=dtypes.get(name, np.float64)))
+        store._save("partitions", np.concatenate(partitions) if partitions else np.zeros(0, dtype=np.int32))
+        store._save("partition_offsets", np.cumsum([0] + [len(partition) for partition in partitions], dtype=np.int64))
+        store._save("nodes", np.array([node for nodes in node_order for node in nodes]))
+        store._save("node_offsets", np.cumsum([0] + [len(nodes) for nodes in node_order], dtype=np.int64))
+        return store
+
+    def partition(self, row: int) -> dict:
+        """
+        Partition of one row of the metrics table
+        """
+        offsets = self.column("partition_offsets")
+        node_offsets = self.column("node_offsets")
+        timestep = int(self.column("timestep")[row])
+        nodes = self.column("nodes")[node_offsets[timestep]:node_offsets[timestep + 1]].tolist()
+        return dict(zip(nodes, self.column("partitions")[offsets[row]:offsets[row + 1]].tolist()))
+
+    def rows(self, method: str, threshold: float=None, seed: int=None) -> np.ndarray:
+        """
+        Rows of the metrics table of a method, optionally for one threshold (None for the methods without one) and seed
+        """
+        mask = self.column("method") == method
+        if threshold is None:
+            mask &= np.isnan(self.column("threshold"))
+        else:
+            mask &= self.column("threshold") == threshold
+        if seed is not None:
+            mask &= self.column("seed") == seed
+        return np.flatnonzero(mask)
+
+    def phases(self) -> List[str]:
+        """
+        Names of the phase columns, empty if no run was profiled
+        """
+        return sorted(name[:-len(".npy")] for name in os.listdir(self.path) if name.startswith(PHASE_PREFIX) and name.endswith(".npy"))
+
+    def memory_columns(self) -> List[str]:
+        """
+        Names of the memory columns, empty if no run tracked its memory
+        """
+        return [name for name in MEMORY_COLUMNS if os.path.exists(self._file(name))]
+
+    def allocators(self, row: int) -> dict:
+        """
+        Top allocators of one row of the metrics table, {"top": [[file:line, bytes], ...], "peak_phase": phase@level},
+        None if the row has none
+        """
+        if not os.path.exists(self._file("allocators")):
+            return None
+        allocators = str(self.column("allocators")[row])
+        return json.loads(allocators) if allocators else None
+
+    def phase_summary(self) -> dict:
+        """
+        Mean time in seconds per time step of every phase of the profiled runs, {threshold or "original": {method: {phase: mean}}}
+        """
+        phases = self.phases()
+        keys = self.metrics(["method", "threshold"])
+        thresholds = np.asarray(keys["threshold"])
+        methods = np.asarray(keys["method"])
+        values = {name: np.asarray(self.column(name)) for name in phases}
+        summary = {}
+        for threshold in sorted(set(thresholds[~np.isnan(thresholds)].tolist())) + [None]:
+            in_group = np.isnan(thresholds) if threshold is None else thresholds == threshold
+            for method in dict.fromkeys(methods[in_group].tolist()):
+                rows = np.flatnonzero(in_group & (methods == method))
+                means = {name[len(PHASE_PREFIX):]: float(np.mean(values[name][rows])) for name in phases
+                         if not np.isnan(values[name][rows]).all()}
+                if means:
+                    summary.setdefault("original" if threshold is None else threshold, {})[method] = means
+
+        return summary
+
+    def summary(self, metrics: Iterable[str]=None) -> dict:
+        """
+        Mean and standard deviation over the seeds of every metric per time step, in the layout plot_all reads:
+        {threshold or "original": {method: {metric: (mean, std)}}}. By default the memory columns are included when stored
+        """
+        metrics = METRIC_COLUMNS + self.memory_columns() if metrics is None else metrics
+        keys = self.metrics(["method", "threshold", "seed"])
+        values = self.metrics(metrics)
+        thresholds = np.asarray(keys["threshold"])
+        methods = np.asarray(keys["method"])
+        summary = {}
+        for threshold in sorted(set(thresholds[~np.isnan(thresholds)].tolist())) + [None]:
+            in_group = np.isnan(thresholds) if threshold is None else thresholds == threshold
+            group = summary.setdefault("original" if threshold is None else threshold, {})
+            for method in dict.fromkeys(methods[in_group].tolist()):
+                rows = np.flatnonzero(in_group & (methods == method))
+                seeds = list(dict.fromkeys(np.asarray(keys["seed"])[rows].tolist()))
+                num_timesteps = len(rows) // len(seeds)
+                group[method] = {}
+                for name in metrics:
+                    # rows are stored run by run, so this is a seeds x time steps table
+                    table = np.asarray(values[name])[rows].reshape(len(seeds), num_timesteps)
+                    group[method][name] = (np.mean(table, axis=0), np.std(table, axis=0))
+
+        return summary
+
+def unit_file(units_path: str, name: str, threshold: float, seed: int, engine: str, sweep: bool=False, profile: bool=False,
+              memory: bool=False) -> str:
+    """
+    File the result of one (seed, threshold, method) run is stored in by save_unit. The engine is part of the key of the
+    variants, and so is every mode that changes what is stored: a sweep splits the time of a snapshot over its thresholds,
+    profile adds the phases and memory the memory use, which also slows the run down. A resumed run so only reads back
+    the units made in the same modes. The original methods are neither swept nor profiled, only memory is in their key
+    """
+    if threshold is None:
+        key, modes = "original", {"memory": memory}
+    else:
+        key, modes = f"{threshold}_{engine}", {"sweep": sweep, "profile": profile, "memory": memory}
+    key += "".join(f"_{mode}" for mode, enabled in modes.items() if enabled)
+    return os.path.join(units_path, f"{name.replace(' ', '_')}_{key}_{seed}.npz")
+
+def save_unit(path: str, result: dict):
+    """
+    Store the result of one run (see ResultsStore.write) on its own as soon as it is done, under a temporary name
+    first so that an interrupted write never leaves a broken file behind
+    """
+    partitions = [np.fromiter(partition.values(), dtype=np.int32, count=len(partition)) for partition in result["partitions"]]
+    arrays = {name: np.array(result[name], dtype=np.float64) for name in METRIC_COLUMNS}
+    arrays["partitions"] = np.concatenate(partitions) if partitions else np.zeros(0, dtype=np.int32)
+    arrays["offsets"] = np.cumsum([0] + [len(partition) for partition in partitions], dtype=np.int64)
+    arrays["nodes"] = np.array([node for partition in result["partitions"] for node in partition])
+    if "phases" in result:
+        arrays["phases"] = np.array(json.dumps(result["phases"]))
+    if "memory" in result:
+        arrays["memory"] = np.array(json.dumps(result["memory"]))
+    with open(path + ".tmp", "wb") as file:
+        np.savez(file, **arrays)
+    os.replace(path + ".tmp", path)
+
+def load_unit(path: str) -> dict:
+    """
+    Result of one run stored by save_unit
+    """
+    with np.load(path) as arrays:
+        offsets = arrays["offsets"].tolist()
+        nodes = arrays["nodes"].tolist()
+        labels = arrays["partitions"].tolist()
+        result = {name: arrays[name].tolist() for name in METRIC_COLUMNS}
+        if "phases" in arrays:
+            # JSON keys are strings, the levels are ints
+            result["phases"] = [{phase: {int(level): elapsed for level, elapsed in levels.items()} for phase, levels in timings.items()}
+                                for timings in json.loads(str(arrays["phases"]))]
+        if "memory" in arrays:
+            result["memory"] = json.loads(str(arrays["memory"]))
+    result["partitions"] = [dict(zip(nodes[start:stop], labels[start:stop])) for start, stop in zip(offsets, offsets[1:])]
+    return result
@@ -1,47 +1,133 @@
-
-from collections import defaultdict
+import io
 import json
+import numpy as np
 import os
 
-def load_graph(filename):
-    dict_graph = defaultdict(list)
-    #dict_time = defaultdict(list)
-    #time = 0
-    if not os.path.exists(f"{filename}.json"):
-        print("Importing data...")
-        with open("sx-stackoverflow-a2q.txt", "r") as file:
-     
-            line_count = sum(1 for line in file)
-        with open("sx-stackoverflow-a2q.txt", "r") as file:
+from evaluation.edge_log import EdgeLog
+
+EDGE_FILE = "sx-stackoverflow-a2q.txt"
+COLUMNS = {"src": np.int32, "dst": np.int32, "ts": np.int64}
+COLUMNS_VERSION = 1
+CHUNK_BYTES = 1 << 26 # bytes of the edge file parsed at once
+
+def _columns_path(path):
+    return f"{path}.columns"
+
+def _parse_chunk(chunk):
+    """
+    Parse whole lines of "src dst timestamp" into an (n, 3) array. Lines that do not have three numbers are skipped,
+    as the original line by line import did, which only costs a slower pass over the chunks that have them
+    """
+    if not chunk.strip():
+        return np.zeros((0, 3), dtype=np.int64)
+    try:
+        edges = np.loadtxt(io.BytesIO(chunk), dtype=np.int64, comments=None, ndmin=2)
+        if edges.shape[1] == 3:
+            return edges
+    except ValueError: # lines with other numbers of columns, or with something else than integers
+        pass
+    rows = []
+    for parts in (line.split() for line in chunk.splitlines()):
+        if len(parts) != 3:
+            continue
+        try:
+            rows.append([int(part) for part in parts])
+        except ValueError:
+            continue
+    return np.array(rows, dtype=np.int64).reshape(-1, 3)
+
+def convert_edge_file(path=EDGE_FILE, chunk_bytes=CHUNK_BYTES):
+    """
+    Convert the temporal edge file into binary src, dst (int32) and ts (int64) columns in a .columns folder next to it
+
+    The file is read once, in chunks of chunk_bytes cut at line ends, and every chunk is parsed in one go and appended
+    to the columns, so memory stays at a chunk. The columns keep the order of the file. The manifest records the number
+    of edges and the modification time and size of the file, it is written last so that an interrupted conversion is
+    never read back
+    """
+    out_path = _columns_path(path)
+    os.makedirs(out_path, exist_ok=True)
+    stat = os.stat(path)
+    num_edges = 0
+    files = {name: open(os.path.join(out_path, f"{name}.bin"), "wb") for name in COLUMNS}
+    try:
+        with open(path, "rb") as file:
+            rest = b""
             progress = 0
-            
-            print("Lines to be imported: ",line_count)
-            for line in file:
-                # Strip whitespace and split the line into parts
-                
-                parts = line.strip().split()
-                if len(parts) == 3:
-                    
-                    a, b, c = map(int, parts)
-                    dict_graph[c].append((a,b))
-                    #dict_time[progress] = (a,b)
-                progress += 1
-                if progress % int(line_count/100) == 0:
-                    print(f"Import progress: {int(progress/line_count * 100)}%", end="\r")
-        print(f"Import progress: {100}%")
-
-
-    else:
+            while True:
+                data = file.read(chunk_bytes)
+                if data:
+                    chunk = rest + data
+                    end = chunk.rfind(b"\n") + 1
+                    chunk, rest = chunk[:end], chunk[end:]
+                else: # the last line may lack its line end
+                    chunk, rest = (rest + b"\n" if rest.strip() else b""), b""
+                edges = _parse_chunk(chunk)
+                if len(edges) and (edges[:, :2].min() < np.iinfo(np.int32).min or edges[:, :2].max() > np.iinfo(np.int32).max):
+                    raise ValueError(f"Node ids of {path} do not fit in int32")
+                for column, (name, dtype) in enumerate(COLUMNS.items()):
+                    files[name].write(edges[:, column].astype(dtype).tobytes())
+                num_edges += len(edges)
+                progress += len(data)
+                print(f"Import progress: {int(progress / max(stat.st_size, 1) * 100)}%", end="\r")
+                if not data:
+                    break
+    finally:
+        for column_file in files.values():
+            column_file.close()
+    print(f"Import progress: {100}%")
+
+    with open(os.path.join(out_path, "manifest.json.tmp"), "w") as file:
+        json.dump({"version": COLUMNS_VERSION, "num_edges": num_edges, "source": [stat.st_mtime_ns, stat.st_size]}, file)
+    os.replace(os.path.join(out_path, "manifest.json.tmp"), os.path.join(out_path, "manifest.json"))
+    return out_path
+
+def load_edge_columns(path=EDGE_FILE):
+    """
+    The src, dst and ts columns of the temporal edge file as read-only memory-mapped arrays, in file order
+
+    The file is converted with convert_edge_file the first time and again when it changed in modification time or size,
+    later loads only map the columns
+    """
+    out_path = _columns_path(path)
+    manifest_path = os.path.join(out_path, "manifest.json")
+    manifest = None
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r") as file:
+            manifest = json.load(file)
+    stat = os.stat(path)
+    if manifest is None or manifest.get("version") != COLUMNS_VERSION or manifest["source"] != [stat.st_mtime_ns, stat.st_size]:
+        print("Importing data...")
+        convert_edge_file(path)
+        with open(manifest_path, "r") as file:
+            manifest = json.load(file)
+
+    num_edges = manifest["num_edges"]
+    if num_edges == 0:
+        return {name: np.zeros(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+    return {name: np.memmap(os.path.join(out_path, f"{name}.bin"), dtype=dtype, mode="r", shape=(num_edges,))
+            for name, dtype in COLUMNS.items()}
+
+def load_graph(filename, path=EDGE_FILE):
+    """
+    Temporal edges as an EdgeLog sorted by timestamp, which reads as {timestamp: [(src, dst), ...]}
+
+    They come from the binary columns of the edge file at path (see load_edge_columns) if it exists, so they stay
+    memory-mapped when the file is already in time order, otherwise from the JSON file written by save_dict under filename
+    """
+    if not os.path.exists(path) and os.path.exists(f"{filename}.json"):
         print("Opening json...")
         with open(f"{filename}.json", "r") as json_file:
             data = json.load(json_file)
+        # Convert string keys back to integers
+        return EdgeLog.from_dict({int(k): v for k, v in data.items()})
 
-            # Convert string keys back to integers
-            dict_graph = {int(k): v for k, v in data.items()}
-    return dict_graph
+    return EdgeLog.from_columns(load_edge_columns(path))
 
 def save_dict(dict, filename):
-    
+
     print("Saving to json...")
+    if isinstance(dict, EdgeLog):
+        dict = dict.to_dict()
     with open(f"{filename}.json", "w") as json_file:
-        json.dump(dict, json_file, indent=4)
\ No newline at end of file
+        json.dump(dict, json_file)
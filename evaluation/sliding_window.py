@@ -0,0 +1,148 @@
+import heapq
+import math
+import networkx as nx
+
+from evaluation.delta_format import _copy_on_write
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+REBASE_HALF_LIVES = 64 # decayed weights are rebased once they grew by 2**64, well before the squared degrees overflow
+
+class SlidingWindowGraph:
+    """
+    Graph of the recent interactions of a temporal edge stream, in which old interactions expire or decay
+
+    With a window, an edge has the number of its interactions in the last window time units as weight, and is removed
+    when the last of them expires. With a half_life, every interaction counts 2**(-age / half_life) and an edge is
+    removed once its weight drops below min_weight. Nodes are removed with their last edge and self-loops are skipped,
+    as in build_graph.
+
+    Decayed weights are kept relative to an origin time rather than the current one: they are all off by the same
+    factor, which changes neither the modularity nor any modularity gain, so an interaction only changes the weight of
+    its own edge and the cost of a step follows the number of interactions that arrive and expire in it. Once the
+    weights grew by 2**REBASE_HALF_LIVES they are all scaled back, that factor is returned in the delta.
+    """
+    def __init__(self, window: float=None, half_life: float=None, min_weight: float=0.05, weight: str="weight"):
+        if (window is None) == (half_life is None):
+            raise ValueError("Give either a window or a half_life")
+        if (window is not None and window <= 0) or (half_life is not None and half_life <= 0) or min_weight <= 0:
+            raise ValueError("The window, half_life and min_weight have to be positive")
+        self.window = window
+        self.half_life = half_life
+        self.min_weight = min_weight
+        self.weight = weight
+        self.graph = nx.Graph()
+        self.now = None
+        self.origin = None
+        self._expiry = [] # heap of (time, node, node) at which an interaction expires or an edge decayed away
+        self._deadline = {} # latest decay deadline of every edge, older heap entries of an edge are skipped
+
+    def _rebase(self, now: float) -> float:
+        if self.origin is None:
+            self.origin = now
+        if self.half_life is None or (now - self.origin) / self.half_life < REBASE_HALF_LIVES:
+            return 1.
+        factor = 2. ** (-(now - self.origin) / self.half_life)
+        for _, _, datas in self.graph.edges(data=True):
+            datas[self.weight] *= factor
+        self.origin = now
+        return factor
+
+    def advance(self, edges: Dict[float, List[Tuple]]) -> Tuple[list, list, list, float]:
+        """
+        Add the interactions of edges, given as {timestamp: [(src, dst), ...]} or an EdgeLog, and expire those that fell
+        out of the window (or decayed away) at the latest timestamp seen so far
+        Returns the changes to the graph in the (added_edges, removed_edges, removed_nodes) form of
+        louvain_variant.utils.snapshot_delta, followed by the factor all weights were rescaled by before those changes
+        """
+        if not edges:
+            return [], [], [], 1.
+        now = max(edges) if self.now is None else max(self.now, max(edges))
+        rescale = self._rebase(now)
+        self.now = now
+        before = {} # weight of every changed edge at the start of the step, None when it did not exist
+        new_nodes = set()
+
+        for timestamp, node_pairs in edges.items():
+            for node1, node2 in node_pairs:
+                if node1 == node2:
+                    continue
+                datas = self.graph.get_edge_data(node1, node2)
+                if (node1, node2) not in before and (node2, node1) not in before:
+                    before[(node1, node2)] = None if datas is None else datas[self.weight]
+                new_nodes.update(node for node in (node1, node2) if node not in self.graph)
+                if self.half_life is None:
+                    edge_weight = 1. if datas is None else datas[self.weight] + 1.
+                    deadline = timestamp + self.window
+                else:
+                    edge_weight = 2. ** ((timestamp - self.origin) / self.half_life)
+                    edge_weight += 0. if datas is None else datas[self.weight]
+                    deadline = self.origin + self.half_life * math.log2(edge_weight / self.min_weight)
+                    self._deadline[(node1, node2)] = self._deadline[(node2, node1)] = deadline
+                self.graph.add_edge(node1, node2, **{self.weight: edge_weight})
+                heapq.heappush(self._expiry, (deadline, node1, node2))
+
+        endpoints = set()
+        while self._expiry and self._expiry[0][0] <= now:
+            deadline, node1, node2 = heapq.heappop(self._expiry)
+            if self.half_life is not None and self._deadline.get((node1, node2)) != deadline:
+                continue
+            datas = self.graph[node1][node2]
+            if (node1, node2) not in before and (node2, node1) not in before:
+                before[(node1, node2)] = datas[self.weight]
+            if self.half_life is None and datas[self.weight] > 1.:
+                datas[self.weight] -= 1.
+                continue
+            self.graph.remove_edge(node1, node2)
+            self._deadline.pop((node1, node2), None)
+            self._deadline.pop((node2, node1), None)
+            endpoints.update((node1, node2))
+
+        added_edges = []
+        removed_edges = []
+        for (node1, node2), old_weight in before.items():
+            datas = self.graph.get_edge_data(node1, node2)
+            new_weight = None if datas is None else datas[self.weight]
+            if new_weight == old_weight:
+                continue
+            if old_weight is not None:
+                removed_edges.append((node1, node2, old_weight))
+            if new_weight is not None:
+                added_edges.append((node1, node2, new_weight))
+        isolated = [node for node in endpoints if self.graph.degree(node) == 0]
+        self.graph.remove_nodes_from(isolated)
+        removed_nodes = [node for node in isolated if node not in new_nodes]
+
+        return added_edges, removed_edges, removed_nodes, rescale
+
+    def snapshots(self, batches: Iterable[Dict[float, List[Tuple]]]) -> Iterator[nx.Graph]:
+        """
+        Advance the window by every batch and hand out a copy of the graph after it, so snapshots stay valid after the
+        next one is produced. Every snapshot only gets its own neighbours for the endpoints of the edges a step changed
+        and shares the rest with the snapshot before it, see evaluation.delta_format._copy_on_write; the first one, and
+        those after the weights were rescaled, are full copies
+        As the snapshots of evaluation.delta_format.DeltaGraphStream, every snapshot has the latest timestamp in
+        graph.graph["time_step"], the one of the snapshot before it in graph.graph["delta_from"] and the changes in
+        graph.graph["delta"], so that the incremental mode of TemporalLouvainIterator does not compare them, together
+        with the factor the weights were rescaled by in graph.graph["rescale"]
+        """
+        previous = self.now
+        graph = None
+        for batch in batches:
+            added_edges, removed_edges, removed_nodes, rescale = self.advance(batch)
+            delta = (added_edges, removed_edges, removed_nodes)
+            if graph is None or rescale != 1.:
+                graph = self.graph.copy()
+            else:
+                graph = _copy_on_write(graph, set(node for edge in chain(added_edges, removed_edges) for node in edge[:2]))
+                # a changed edge is removed with its old weight first, so it gets a new attribute dict and the one the
+                # snapshots before share is left as it is
+                graph.remove_edges_from(removed_edges)
+                graph.add_weighted_edges_from(added_edges, weight=self.weight)
+                graph.remove_nodes_from(removed_nodes)
+            graph.graph["time_step"] = self.now
+            graph.graph["delta_from"] = previous
+            graph.graph["delta"] = delta if previous is not None else ([], [], [])
+            graph.graph["rescale"] = rescale
+            previous = self.now
+            yield graph
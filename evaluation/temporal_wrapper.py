@@ -1,7 +1,13 @@
+import inspect
 import time
 
+from evaluation.memory import MemoryTracker
+from itertools import chain, islice
+from louvain_variant.community_status import CoreCentralityCache, Status
+from louvain_variant.profiler import MemoryProfiler, PhaseProfiler
+from louvain_variant.utils import snapshot_delta
 from networkx import Graph
-from typing import Tuple
+from typing import Dict, Iterable, Iterator, List, Tuple
 
 class TemporalLouvainIterator:
     """
@@ -11,17 +17,99 @@ class TemporalLouvainIterator:
         self.louvain_method = louvain_method
         self.louvain_args = kwargs
         self.use_prev_partition = self.louvain_args.pop("prev_partition", False) # for louvain that restarts every time it should be False
+        self.incremental = self.louvain_args.pop("incremental", False) # only for the variants, keeps one Status up to date across snapshots
+        self.soft_removed = self.louvain_args.pop("soft_removed", False) # incremental mode only, also re-evaluates the nodes that lost edges
+        self.profile = self.louvain_args.pop("profile", False) # only for the variants
+        self.memory = MemoryTracker() if self.louvain_args.pop("memory", False) else None
+        self.profiler = PhaseProfiler() if self.profile else None
+        if self.memory is not None and "profiler" in inspect.signature(louvain_method).parameters:
+            self.profiler = MemoryProfiler() # also finds the lines of the variant that allocate the most
+        if self.profiler is not None:
+            self.louvain_args["profiler"] = self.profiler
+        self.phase_timings = [] # {phase: {level: nanoseconds}} of every snapshot when profiling
+        self.memory_usage = [] # peak RSS, traced peak and top allocators of every snapshot when tracking memory
         self.limit_steps = limit_steps
+        self._status = None
+        self._prev_graph = None
+        self._prev_step = None
 
-    def _process_temporal_graph_normal(self, temporal_graph: list) -> list:
+    def _call_method(self, graph: Graph, partition: dict=None) -> dict:
+        """
+        Run the method on one snapshot and keep its phase timings when profiling and its memory use when tracking memory
+        """
+        if self.memory is None:
+            partition = self._call_once(graph, partition)
+        else:
+            with self.memory:
+                partition = self._call_once(graph, partition)
+            self.memory_usage += [self._pop_memory()]
+        if self.profiler is not None:
+            timings = self.profiler.pop()
+            if self.profile:
+                self.phase_timings += [timings]
+
+        return partition
+
+    def _call_once(self, graph: Graph, partition: dict=None) -> dict:
+        if not self.incremental:
+            return self.louvain_method(graph, partition=partition, **self.louvain_args)
+        return self._call_incremental(graph, partition)
+
+    def _pop_memory(self) -> dict:
+        """
+        Memory use of the last call, with its top allocators if the method reports them
+        """
+        usage = dict(self.memory.usage)
+        if isinstance(self.profiler, MemoryProfiler):
+            usage["allocators"] = self.profiler.pop_allocators()
+        return usage
+
+    def _call_incremental(self, graph: Graph, partition: dict=None) -> dict:
+        """
+        Run the method in incremental mode, by updating the persistent Status with the changes since the previous snapshot
+
+        The changes are those the snapshot carries in graph.graph["delta"] (replayed delta files, a SlidingWindowGraph),
+        so a step costs about the size of the changes. Comparing the whole previous and current graph with
+        snapshot_delta is only the fallback for snapshots without them, it costs a pass over all edges of both
+        """
+        weight = self.louvain_args.get("weight", "weight")
+        if partition is None or self._status is None:
+            partition = self.louvain_method(graph, partition=partition, **self.louvain_args)
+            self._status = Status(core_threshold=self.louvain_args.get("core_threshold", 0.8))
+            self._status.init(graph, weight, partition)
+        else:
+            delta = graph.graph.get("delta")
+            if delta is None or self._prev_step != graph.graph.get("delta_from"):
+                delta = snapshot_delta(self._prev_graph, graph, weight)
+            else:
+                # weights rebased by a common factor, as those of a SlidingWindowStream with decay
+                self._status.rescale(graph.graph.get("rescale", 1.))
+            self._status.apply_delta(graph, *delta, soft_removed=self.soft_removed)
+            partition = self.louvain_method(graph, partition=partition, status=self._status, **self.louvain_args)
+            self._status.reassign(graph, partition)
+        self._prev_graph = graph
+        self._prev_step = graph.graph.get("time_step") # kept apart, a stream can hand out the same graph changed in place
+
+        return partition
+
+    def _snapshots(self, temporal_graph: Iterable[Graph]) -> Tuple[Graph, Iterator[Graph]]:
+        """
+        Split off the first snapshot, the rest is cut at limit_steps without indexing so that any iterable of graphs works
+        """
+        snapshots = iter(temporal_graph)
+        first = next(snapshots)
+        return first, islice(snapshots, max(self.limit_steps - 1, 0) if self.limit_steps is not None else None)
+
+    def _process_temporal_graph_normal(self, temporal_graph: Iterable[Graph]) -> list:
         """
         Only evaluate algorithm performance
         """
         partition_list = []
-        partition = self.louvain_method(temporal_graph[0], **self.louvain_args)
+        first, rest = self._snapshots(temporal_graph)
+        partition = self._call_method(first)
         partition_list += [partition]
-        for snapshot in temporal_graph[1:self.limit_steps]:
-            partition = self.louvain_method(snapshot, partition=partition, **self.louvain_args)
+        for snapshot in rest:
+            partition = self._call_method(snapshot, partition=partition)
             partition_list += [partition]
         
         return partition_list
@@ -30,33 +118,101 @@ class TemporalLouvainIterator:
         start_time = time.time()
         if partition is not None and not self.use_prev_partition: # applied to original Louvain and Smoothed (i.e., Temporal) Louvain
             partition = None
-        partition = self.louvain_method(graph, partition=partition, **self.louvain_args)
+        partition = self._call_method(graph, partition=partition)
         stop_time = time.time() - start_time
 
         return partition, stop_time
     
-    def _process_temporal_graph_time(self, temporal_graph: list) -> Tuple[list,list]:
+    def _process_temporal_graph_time(self, temporal_graph: Iterable[Graph]) -> Tuple[list,list]:
         """
         Evaluate algorithm performance and its running time
         """
         partition_list = []
         time_list = []
-        partition, measured_time = self._time_measure_call(temporal_graph[0])
+        first, rest = self._snapshots(temporal_graph)
+        partition, measured_time = self._time_measure_call(first)
 
         partition_list += [partition]
         time_list += [measured_time]
-        for snapshot in temporal_graph[1:self.limit_steps]:
+        for snapshot in rest:
             partition, measured_time = self._time_measure_call(snapshot, partition=partition)
             partition_list += [partition]
             time_list += [measured_time]
         
         return partition_list, time_list
 
-    def process_temporal_graph(self, temporal_graph: list, measure_time: bool) -> Tuple[list,list]|list:
-        self.limit_steps = self.limit_steps if self.limit_steps is not None else len(temporal_graph)
-        if measure_time:
-            results = self._process_temporal_graph_time(temporal_graph)
-        else:
-            results = self._process_temporal_graph_normal(temporal_graph)
+    def process_temporal_graph(self, temporal_graph: Iterable[Graph], measure_time: bool) -> Tuple[list,list]|list:
+        """
+        Run the method over a list of snapshots or any other iterable of them, such as a lazily loaded DynGraphStream
+        """
+        try:
+            if measure_time:
+                results = self._process_temporal_graph_time(temporal_graph)
+            else:
+                results = self._process_temporal_graph_normal(temporal_graph)
+        finally:
+            if self.memory is not None:
+                self.memory.stop()
+
+        return results
+
+    def process_temporal_graph_sweep(self, temporal_graph: Iterable[Graph], core_thresholds: List[float]) -> Dict[float, Tuple[list,list,list,list]]:
+        """
+        Run a sweep method (such as louvain_variant.best_partition_sweep) for all core thresholds in one pass over the snapshots
+        Thresholds whose previous partitions are equal are computed in one call, which shares the work that does not depend on the threshold,
+        and the measured time of that call is split evenly over them, as are its phase timings when profiling. Its memory use is not split,
+        every threshold of the group gets that of the whole call.
+        Returns the partitions, times, phase timings (empty when not profiling) and memory use (empty when not tracking memory) of every threshold
+        """
+        if self.incremental:
+            raise ValueError("A threshold sweep does not support the incremental mode")
+        args = dict(self.louvain_args)
+        args.pop("core_threshold", None)
+        caches = None
+        if args.pop("core_cache", None) is not None: # every threshold follows its own partitions, so it gets a cache of its own
+            caches = {core_threshold: CoreCentralityCache() for core_threshold in core_thresholds}
+        results = {core_threshold: ([], [], [], []) for core_threshold in core_thresholds}
+
+        first, rest = self._snapshots(temporal_graph)
+        try:
+            self._sweep(chain([first], rest), core_thresholds, args, caches, results)
+        finally:
+            if self.memory is not None:
+                self.memory.stop()
+
+        return results
+
+    def _sweep(self, snapshots: Iterable[Graph], core_thresholds: List[float], args: dict, caches: dict, results: dict):
+        for graph in snapshots:
+            groups = [] # (previous partition, thresholds)
+            for core_threshold in core_thresholds:
+                partitions = results[core_threshold][0]
+                previous = partitions[-1] if partitions and self.use_prev_partition else None
+                for group_partition, group in groups:
+                    if group_partition == previous:
+                        group.append(core_threshold)
+                        break
+                else:
+                    groups.append((previous, [core_threshold]))
 
-        return results
\ No newline at end of file
+            for previous, group in groups:
+                cache = caches[group[0]] if caches is not None else None
+                start_time = time.time()
+                if self.memory is None:
+                    partitions = self.louvain_method(graph, group, partition=previous, core_cache=cache, **args)
+                else:
+                    with self.memory:
+                        partitions = self.louvain_method(graph, group, partition=previous, core_cache=cache, **args)
+                stop_time = time.time() - start_time
+                phases = self.profiler.pop() if self.profiler is not None else None
+                usage = self._pop_memory() if self.memory is not None else None
+                for core_threshold in group:
+                    results[core_threshold][0].append(partitions[core_threshold])
+                    results[core_threshold][1].append(stop_time / len(group))
+                    if self.profile:
+                        results[core_threshold][2].append({phase: {level: elapsed // len(group) for level, elapsed in levels.items()}
+                                                           for phase, levels in phases.items()})
+                    if usage is not None:
+                        results[core_threshold][3].append(usage)
+                    if core_threshold != group[0] and caches is not None and cache.graph is not None:
+                        caches[core_threshold].update(cache.graph, cache.node2com, cache.stats)
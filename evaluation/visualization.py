@@ -23,6 +23,9 @@ def plot_algorithms(method_mapping: dict, results_total: dict, axes, color=None,
         ax_row[0].errorbar(x=range(len(time_score[0])), y=time_score[0], yerr=time_score[1], color=color, capsize=5)
         ax_row[1].errorbar(x=range(len(time_score[0])), y=nmi_score[0], yerr=nmi_score[1], color=color, capsize=5)
         ax_row[2].errorbar(x=range(len(time_score[0])), y=modularity_score[0], yerr=modularity_score[1], color=color, capsize=5, label=label)
+        if len(ax_row) > 3: # runs that tracked their memory
+            peak_rss = results_total[method_name]["peak_rss"]
+            ax_row[3].errorbar(x=range(len(time_score[0])), y=peak_rss[0] / 2**20, yerr=peak_rss[1] / 2**20, color=color, capsize=5)
         
         method_name = METHOD_NAME_MAP[method_name]
         ax_row[0].set_ylabel(method_name, fontsize=17)
@@ -34,12 +37,16 @@ def plot_algorithms(method_mapping: dict, results_total: dict, axes, color=None,
 
 def plot_all(results_total: dict, file_name: str):
     """
-    Plot the results of the original and the variant Louvain approaches 
+    Plot the results of the original and the variant Louvain approaches, with the peak RSS as an extra column if it was tracked
     """
-    _, axes = plt.subplots(len(METHOD_MAPPING_ORIGINAL.keys()) + len(METHOD_MAPPING_VARIANT.keys()), 3, sharex=True, figsize=(12,10))
+    memory = "peak_rss" in next(iter(results_total["original"].values()))
+    num_columns = 4 if memory else 3
+    _, axes = plt.subplots(len(METHOD_MAPPING_ORIGINAL.keys()) + len(METHOD_MAPPING_VARIANT.keys()), num_columns, sharex=True, figsize=(4 * num_columns,10))
     axes[0][0].set_title("Time (s)", fontsize=17)
     axes[0][1].set_title("NMI", fontsize=17)
     axes[0][2].set_title("Modularity", fontsize=17)
+    if memory:
+        axes[0][3].set_title("Memory (MB)", fontsize=17)
     axes[-1][1].set_xlabel("Time step", fontsize=17)
 
     axes_orig = axes[:len(METHOD_MAPPING_ORIGINAL.keys())]
@@ -51,7 +58,8 @@ def plot_all(results_total: dict, file_name: str):
             continue
         plot_algorithms(METHOD_MAPPING_VARIANT, results, axes_variant, color=None, label=cc_th)
 
-    plt.legend(loc="upper center", bbox_to_anchor=(-0.65,5.33), ncols=len(results_total.keys()), fontsize=15, title="Core-Centrality Thresholds", shadow=True)
+    # the labels are on the modularity column, the legend is centred over the figure
+    axes[-1][2].legend(loc="upper center", bbox_to_anchor=(-0.1 if memory else -0.65,5.33), ncols=len(results_total.keys()), fontsize=15, title="Core-Centrality Thresholds", shadow=True)
     plt.tight_layout()
     # plt.subplots_adjust(hspace=0.35)
     plt.savefig(f"{file_name}_plot.pdf", bbox_inches="tight")
@@ -9,6 +9,75 @@
 ######################
 
 import networkx as nx
+import numpy as np
+
+from collections import Counter
+from itertools import chain
+
+from .csr_graph import CSRGraph
+from .profiler import NULL_PROFILER
+
+def _match_labels(partition: dict, reference: dict) -> dict:
+    """Map the labels of partition to those of reference by largest overlap
+
+    Every label of reference is used at most once, labels of partition
+    without a match are left out.
+    """
+    overlaps = Counter((com, reference[node]) for node, com in partition.items() if node in reference)
+    relabel = {}
+    used = set()
+    for (com, reference_com), _ in overlaps.most_common():
+        if com not in relabel and reference_com not in used:
+            relabel[com] = reference_com
+            used.add(reference_com)
+    return relabel
+
+class CoreCentralityCache(object):
+    """
+    Neighbourhood statistics of every node of the previous snapshot
+
+    Status.init only recomputes the core centrality, external degree, internal
+    weight and degree of the nodes whose adjacency changed, whose community
+    changed or who have a neighbour whose community changed. Communities are
+    matched between snapshots by overlap, so renumbering them costs nothing.
+    The changed adjacency is read from graph.graph["delta"] when a snapshot
+    carries its changes since the cached one, as the snapshots of
+    evaluation.delta_format do, otherwise every snapshot has to be its own
+    graph object to be compared with the cached one.
+    """
+    def __init__(self):
+        self.graph = None
+        self.time_step = None
+        self.node2com = dict([])
+        self.stats = dict([])
+
+    def dirty_nodes(self, graph: nx.Graph, part: dict) -> set:
+        """Nodes of graph whose statistics cannot be taken from the cache"""
+        delta = graph.graph.get("delta")
+        # a live stream hands out the cached graph again, changed in place
+        if delta is None or self.time_step is None or graph.graph.get("delta_from") != self.time_step:
+            delta = None
+        if self.graph is None or (self.graph is graph and delta is None):
+            return set(graph.nodes())
+
+        relabel = _match_labels({node: part[node] for node in graph}, self.node2com)
+        moved = set(node for node in graph
+                    if node not in self.node2com or relabel.get(part[node]) != self.node2com[node])
+        dirty = set(moved).union(*(graph[node] for node in moved))
+        if delta is not None:
+            dirty.update(node for edge in chain(delta[0], delta[1]) for node in edge[:2] if node in graph)
+            return dirty
+        previous = self.graph.adj
+        for node, neighbours in graph.adj.items():
+            if node not in dirty and (node not in previous or previous[node] != neighbours):
+                dirty.add(node)
+        return dirty
+
+    def update(self, graph: nx.Graph, part: dict, stats: dict):
+        self.graph = graph
+        self.time_step = graph.graph.get("time_step")
+        self.node2com = {node: part[node] for node in graph}
+        self.stats = stats
 
 class Status(object):
     """
@@ -21,6 +90,10 @@ class Status(object):
     internals = {}
     degrees = {}
     gdegrees = {}
+    # cross-check the running modularity against a full recomputation
+    debug = False
+    # undo log of __remove and __insert while a checkpoint is active
+    journal = None
 
     def __init__(self, core_threshold=0.8):
         self.node2com = dict([])
@@ -30,6 +103,10 @@ class Status(object):
         self.internals = dict([])
         self.loops = dict([])
         self.core_threshold = core_threshold
+        self.com_members = dict([])
+        self.modularity_internals = 0.
+        self.modularity_degrees = 0.
+        self.journal = None
 
     def __str__(self):
         return ("node2com : " + str(self.node2com) + " degrees : "
@@ -37,30 +114,199 @@ class Status(object):
                 + " total_weight : " + str(self.total_weight))
 
     def copy(self):
-        """Perform a deep copy of status"""
-        new_status = Status()
-        new_status.node2com = self.node2com.copy()
-        new_status.internals = self.internals.copy()
-        new_status.degrees = self.degrees.copy()
-        new_status.gdegrees = self.gdegrees.copy()
-        new_status.total_weight = self.total_weight
-
-    def _compute_core_centrality(self, neighbours_list: list, community_set: set):
-        neighbours_list = set(neighbours_list)
-        degree = len(neighbours_list)
-
-        k_in_community = len(neighbours_list & community_set)
-        k_out_community = len(neighbours_list - community_set)
-
-        core_centrality = 1 - (k_out_community / degree)
-
-        return core_centrality, k_out_community
-    
-    def _get_community_set(self, neighbours_list: list, node2com: dict, current_com: int):
-        return set([node for node in neighbours_list if node2com[node] == current_com])
-
-    def init(self, graph: nx.Graph, weight, part=None):
-        """Initialize the status of a graph with every node in one community"""
+        """Perform a copy of status whose dicts and sets can be changed independently"""
+        new_status = Status.__new__(Status)
+        for key, value in self.__dict__.items():
+            new_status.__dict__[key] = value.copy() if isinstance(value, (dict, set)) else value
+        new_status.com_members = {com: members.copy() for com, members in self.com_members.items()}
+        new_status.journal = None
+        return new_status
+
+    def checkpoint(self):
+        """Start recording the moves of nodes and return a marker to roll back to
+
+        While a checkpoint is active, __remove and __insert log what they
+        change, so that rollback can undo the moves made since the marker
+        without copying the status. Checkpoints can be nested, release stops
+        the recording.
+        """
+        if self.journal is None:
+            self.journal = []
+        return len(self.journal)
+
+    def _record(self, node, com):
+        """Log the state that moving node out of or into com is about to change"""
+        self.journal.append((node, self.node2com.get(node), com, self.degrees.get(com),
+                             self.internals.get(com), self.modularity_internals, self.modularity_degrees))
+
+    def rollback(self, marker):
+        """Undo the moves made since checkpoint returned marker"""
+        while len(self.journal) > marker:
+            node, previous_com, com, degree, internal, modularity_internals, modularity_degrees = self.journal.pop()
+            self.node2com[node] = previous_com
+            for aggregate, value in ((self.degrees, degree), (self.internals, internal)):
+                if value is None:
+                    aggregate.pop(com, None)
+                else:
+                    aggregate[com] = value
+            if previous_com == com:
+                self.com_members[com].add(node)
+            else:
+                self.com_members[com].discard(node)
+            self.modularity_internals = modularity_internals
+            self.modularity_degrees = modularity_degrees
+
+    def release(self):
+        """Stop recording moves, the state since the last checkpoint is kept"""
+        self.journal = None
+
+    def relabel(self, node, com):
+        """Move node to com in node2com and com_members only
+
+        The degrees and internals of both communities are left as they are,
+        the running modularity sums follow the communities that become empty
+        or non-empty. Moves are recorded while a checkpoint is active.
+        """
+        previous_com = self.node2com[node]
+        if previous_com == com:
+            return
+        if self.journal is not None:
+            self._record(node, previous_com)
+            self._record(node, com)
+        members = self.com_members[previous_com]
+        members.discard(node)
+        if not members:
+            self.modularity_internals -= self.internals.get(previous_com, 0.)
+            self.modularity_degrees -= self.degrees.get(previous_com, 0.) ** 2
+        members = self.com_members.setdefault(com, set())
+        if not members:
+            self.modularity_internals += self.internals.get(com, 0.)
+            self.modularity_degrees += self.degrees.get(com, 0.) ** 2
+        members.add(node)
+        self.node2com[node] = com
+
+    def singletons(self, graph):
+        """A status of the same graph with every node of graph in a community of its own
+
+        The communities are numbered in the order of graph. The node degrees
+        and loops do not change while nodes move, so they are shared with this
+        status instead of copied.
+        """
+        status = Status(core_threshold=self.core_threshold)
+        nodes = list(graph)
+        coms = range(len(nodes))
+        status.weight = self.weight
+        status.total_weight = self.total_weight
+        status.gdegrees = self.gdegrees
+        status.loops = self.loops
+        status.node2com = dict(zip(nodes, coms))
+        status.degrees = dict(zip(coms, (self.gdegrees.get(node, 0.) for node in nodes)))
+        status.internals = dict(zip(coms, (self.loops.get(node, 0.) for node in nodes)))
+        status.com_members = {com: {node} for com, node in zip(coms, nodes)}
+        status.modularity_internals = sum(status.internals.values())
+        status.modularity_degrees = sum(degree ** 2 for degree in status.degrees.values())
+        return status
+
+    def reindex(self):
+        """Rebuild the community members and the running modularity sums
+
+        The sums cover the communities with at least one node, __insert and
+        __remove keep them and com_members up to date; call this after
+        node2com, degrees or internals were changed in another way.
+        """
+        self.com_members = dict([])
+        for node, com in self.node2com.items():
+            self.com_members.setdefault(com, set()).add(node)
+        self.modularity_internals = sum(self.internals.get(com, 0.) for com in self.com_members)
+        self.modularity_degrees = sum(self.degrees.get(com, 0.) ** 2 for com in self.com_members)
+
+    def _update_community(self, com, degree_change=0., internal_change=0., joining=None, leaving=None):
+        """Change the aggregates and members of a community together with the running modularity sums"""
+        degree = self.degrees.get(com, 0.)
+        internal = self.internals.get(com, 0.)
+        members = self.com_members.setdefault(com, set())
+        if members:
+            self.modularity_internals -= internal
+            self.modularity_degrees -= degree ** 2
+        self.degrees[com] = degree + degree_change
+        self.internals[com] = internal + internal_change
+        if leaving is not None:
+            members.discard(leaving)
+        if joining is not None:
+            members.add(joining)
+        if members:
+            self.modularity_internals += self.internals[com]
+            self.modularity_degrees += self.degrees[com] ** 2
+
+    def _neighbourhood_stats(self, graph: nx.Graph, nodes, node2com: dict) -> dict:
+        """Core centrality, external degree, internal weight and degree of nodes
+
+        The core centrality is the fraction of the neighbours of a node that
+        are in its community, the external degree the number of the others and
+        the internal weight the weight of its edges inside its community
+        (halved, except for a self-loop). The adjacency of all nodes is read
+        into arrays at once and the four statistics come from one pass over
+        them, as CSRGraph.neighbourhood_stats does for the csr engine.
+        """
+        nodes = list(nodes)
+        adj = graph._adj
+        counts = np.fromiter((len(adj[node]) for node in nodes), dtype=np.int64, count=len(nodes))
+        num_edges = int(counts.sum())
+        neighbours = list(chain.from_iterable(adj[node] for node in nodes))
+        weights = np.fromiter((datas.get(self.weight, 1) for node in nodes for datas in adj[node].values()),
+                              dtype=np.float64, count=num_edges)
+        if (weights <= 0).any():
+            error = "Bad graph type ({})".format(type(graph))
+            raise ValueError(error)
+        rows = np.repeat(np.arange(len(nodes)), counts)
+        own = [node2com[node] for node in nodes]
+        same = np.fromiter((node2com[neighbor] for neighbor in neighbours), dtype=np.int64, count=num_edges) \
+            == np.array(own, dtype=np.int64)[rows]
+        loops = np.fromiter((neighbor == node for node in nodes for neighbor in adj[node]), dtype=bool, count=num_edges)
+
+        external_degrees = np.bincount(rows, weights=~same, minlength=len(nodes)).astype(np.int64)
+        core_centrality = 1 - np.divide(external_degrees, counts, out=np.zeros(len(nodes)), where=counts > 0)
+        inc = np.bincount(rows, weights=np.where(same, np.where(loops, weights, weights / 2.), 0.), minlength=len(nodes))
+        # a self-loop counts twice towards the degree, as in networkx
+        deg = np.bincount(rows, weights=weights, minlength=len(nodes)) + \
+            np.bincount(rows, weights=np.where(loops, weights, 0.), minlength=len(nodes))
+        return dict(zip(nodes, zip(core_centrality.tolist(), external_degrees.tolist(), inc.tolist(), deg.tolist())))
+
+    def _soft_frontier(self, graph: nx.Graph, new_nodes):
+        """New nodes together with the neighbours of their neighbours
+
+        Both hops are taken for all new nodes at once, and the first hop is
+        deduplicated before it is expanded: a hub next to many new nodes adds
+        its neighbourhood once instead of once per new node.
+        """
+        first_hop = set().union(*(graph[node] for node in new_nodes))
+        return set(new_nodes).union(*(graph[node] for node in first_hop))
+
+    def _update_core_centrality(self, graph: nx.Graph, nodes):
+        """Recompute core centrality, external degree and the low-core set of nodes"""
+        for node, (core_centrality, external_degree, _, _) in self._neighbourhood_stats(graph, nodes, self.node2com).items():
+            self.external_degrees[node] = external_degree
+            self.core_centrality[node] = core_centrality
+            if core_centrality < self.core_threshold:
+                self.low_core_nodes.add(node)
+            else:
+                self.low_core_nodes.discard(node)
+
+    def init(self, graph: nx.Graph, weight, part=None, cache=None, profiler=NULL_PROFILER):
+        """Initialize the status of a graph with every node in one community
+
+        With a partition, a CoreCentralityCache can be given to reuse the
+        neighbourhood statistics of the nodes that did not change since the
+        previous snapshot, on the networkx engine only. The time spent on
+        those statistics is recorded as the 'core_centrality' phase of
+        profiler.
+        """
+        if isinstance(graph, CSRGraph):
+            if cache is not None:
+                raise ValueError("A CoreCentralityCache is only supported by the networkx engine, "
+                                 "the csr engine computes the statistics of all nodes in one pass")
+            return self._init_csr(graph, weight, part, profiler)
+
         count = 0
         self.node2com = dict([])
         self.node_new_arrival = dict([])
@@ -76,11 +322,15 @@ class Status(object):
         self.core_centrality = dict([])
 
         self.soft_nodes_set = None
+        self.soft_frontier = None
+        self.low_core_nodes = set()
+        self.arrivals = set()
 
         if part is None:
             for node in graph.nodes():
                 self.node2com[node] = count
                 self.node_new_arrival[node] = True
+                self.arrivals.add(node)
                 deg = float(graph.degree(node, weight=weight))
                 if deg < 0:
                     error = "Bad node degree ({})".format(deg)
@@ -93,48 +343,282 @@ class Status(object):
                 count += 1
             self.max_com_id = count
         else:
+            part = dict(part) # the new arrivals are added to a copy, the partition of the caller is left as it is
             self.max_com_id = max(part.values()) + 1
             self.soft_nodes_set = set()
             for node in graph.nodes():
                 if node not in part.keys():
                     part[node] = self.max_com_id
-                    neighbours_new_node = [n for n in graph.neighbors(node)]
-                    for n in neighbours_new_node:
-                        self.soft_nodes_set |= set(graph.neighbors(n))
-
                     self.max_com_id += 1
-                    self.soft_nodes_set |= set([node])
                     self.node_new_arrival[node] = True
+                    self.arrivals.add(node)
                 else:
                     self.node_new_arrival[node] = False
+            self.soft_frontier = self._soft_frontier(graph, self.arrivals)
+            self.soft_nodes_set |= self.soft_frontier
 
-            for node in graph.nodes():
-                com = part.get(node)
-                self.node2com[node] = com
-                deg = float(graph.degree(node, weight=weight))
-                self.degrees[com] = self.degrees.get(com, 0) + deg
-                self.gdegrees[node] = deg
+            # the statistics are aggregated in the same walk, which is counted with them
+            with profiler.phase("core_centrality"):
+                dirty_nodes = None if cache is None else cache.dirty_nodes(graph, part)
+                walked = graph.nodes() if dirty_nodes is None else [node for node in graph.nodes() if node in dirty_nodes]
+                walked_stats = self._neighbourhood_stats(graph, walked, part)
+                stats = dict([])
+                for node in graph.nodes():
+                    com = part.get(node)
+                    self.node2com[node] = com
+                    stats[node] = walked_stats[node] if dirty_nodes is None or node in dirty_nodes else cache.stats[node]
+                    core_centrality, external_degree, inc, deg = stats[node]
+                    self.degrees[com] = self.degrees.get(com, 0) + deg
+                    self.gdegrees[node] = deg
+                    self.external_degrees[node] = external_degree
+                    self.core_centrality[node] = core_centrality
+
+                    if core_centrality < self.core_threshold:
+                        self.soft_nodes_set |= set([node])
+                        self.low_core_nodes.add(node)
 
-                neighbor_list = list(graph.neighbors(node))
-                community_set = self._get_community_set(neighbor_list, part, com)
-                core_centrality, external_degree = self._compute_core_centrality(neighbor_list, community_set)
-                self.external_degrees[node] = external_degree
-                self.core_centrality[node] = core_centrality
-
-                if core_centrality < self.core_threshold:
-                    self.soft_nodes_set |= set([node])
-                
-                inc = 0.
-                for neighbor, datas in graph[node].items():
-                    edge_weight = datas.get(weight, 1)
-                    if edge_weight <= 0:
-                        error = "Bad graph type ({})".format(type(graph))
-                        raise ValueError(error)
-                    if part[neighbor] == com:
-                        if neighbor == node:
-                            inc += float(edge_weight)
-                        else:
-                            inc += float(edge_weight) / 2.
-                self.internals[com] = self.internals.get(com, 0) + inc
+                    self.internals[com] = self.internals.get(com, 0) + inc
+            if cache is not None:
+                cache.update(graph, part, stats)
 
         self.max_com_id = max(self.node2com.values())
+        self.reindex()
+
+    def _init_csr(self, graph: CSRGraph, weight, part=None, profiler=NULL_PROFILER):
+        """Same as init, computed on the arrays of a CSRGraph whose nodes are 0..n-1"""
+        num_nodes = graph.number_of_nodes()
+        nodes = range(num_nodes)
+        self.total_weight = graph.size()
+        self.weight = weight
+        self.external_degrees = dict([])
+        self.core_centrality = dict([])
+        self.soft_nodes_set = None
+        self.soft_frontier = None
+        self.low_core_nodes = set()
+        self.arrivals = set()
+
+        if part is None:
+            if (graph.degrees < 0).any():
+                error = "Bad node degree ({})".format(graph.degrees.min())
+                raise ValueError(error)
+            degrees = graph.degrees.tolist()
+            loops = graph.loops.tolist()
+            self.node2com = dict(zip(nodes, nodes))
+            self.node_new_arrival = dict.fromkeys(nodes, True)
+            self.degrees = dict(zip(nodes, degrees))
+            self.gdegrees = dict(zip(nodes, degrees))
+            self.loops.update(zip(nodes, loops))
+            self.internals = dict(zip(nodes, loops))
+            self.arrivals = set(nodes)
+        else:
+            if (graph.weights <= 0).any():
+                error = "Bad graph type ({})".format(type(graph))
+                raise ValueError(error)
+            labels = np.full(num_nodes, -1, dtype=np.int64)
+            known = [node for node in part.keys() if 0 <= node < num_nodes]
+            labels[known] = [part[node] for node in known]
+            new_arrivals = labels < 0
+            max_com_id = max(part.values()) + 1 if part else 0
+            labels[new_arrivals] = max_com_id + np.arange(np.count_nonzero(new_arrivals))
+
+            with profiler.phase("core_centrality"):
+                core_centrality, external_degrees, node_internals = graph.neighbourhood_stats(labels)
+            soft_frontier = new_arrivals.copy()
+            if new_arrivals.any():
+                soft_frontier |= graph.two_hop(new_arrivals)
+            soft_nodes = soft_frontier | (core_centrality < self.core_threshold)
+
+            communities = np.unique(labels)
+            com_degrees = np.bincount(labels, weights=graph.degrees)
+            internals = np.bincount(labels, weights=node_internals)
+
+            self.node2com = dict(zip(nodes, labels.tolist()))
+            self.node_new_arrival = dict(zip(nodes, new_arrivals.tolist()))
+            self.gdegrees = dict(zip(nodes, graph.degrees.tolist()))
+            self.degrees = dict(zip(communities.tolist(), com_degrees[communities].tolist()))
+            self.internals = dict(zip(communities.tolist(), internals[communities].tolist()))
+            self.external_degrees = dict(zip(nodes, external_degrees.tolist()))
+            self.core_centrality = dict(zip(nodes, core_centrality.tolist()))
+            self.soft_nodes_set = set(np.flatnonzero(soft_nodes).tolist())
+            self.soft_frontier = soft_frontier
+            self.low_core_nodes = set(np.flatnonzero(core_centrality < self.core_threshold).tolist())
+            self.arrivals = set(np.flatnonzero(new_arrivals).tolist())
+
+        self.max_com_id = max(self.node2com.values())
+        self.reindex()
+
+    def set_core_threshold(self, core_threshold):
+        """Change the core threshold of an initialised status
+
+        Only the low-core nodes and the soft nodes depend on the threshold.
+        They are rebuilt from the core centralities and the soft frontier
+        (new arrivals and their two-hop neighbourhood, for a CSRGraph as a
+        boolean mask) in the order init builds them, so a copy of a status
+        with its threshold changed behaves exactly like a status initialised
+        with that threshold.
+        """
+        self.core_threshold = core_threshold
+        if self.soft_nodes_set is None:
+            return
+
+        if isinstance(self.soft_frontier, np.ndarray):
+            core_centrality = np.fromiter(self.core_centrality.values(), dtype=np.float64,
+                                          count=len(self.core_centrality))
+            self.soft_nodes_set = set(np.flatnonzero(self.soft_frontier | (core_centrality < core_threshold)).tolist())
+            self.low_core_nodes = set(np.flatnonzero(core_centrality < core_threshold).tolist())
+            return
+
+        self.soft_nodes_set = set()
+        self.soft_nodes_set |= self.soft_frontier
+        self.low_core_nodes = set()
+        for node, core_centrality in self.core_centrality.items():
+            if core_centrality < core_threshold:
+                self.soft_nodes_set |= set([node])
+                self.low_core_nodes.add(node)
+
+    def _add_edge_weight(self, node1, node2, edge_weight):
+        """Add (or with a negative weight, remove) an edge to the aggregates"""
+        com1 = self.node2com[node1]
+        com2 = self.node2com[node2]
+        self.total_weight += edge_weight
+        if node1 == node2:
+            self.loops[node1] = self.loops.get(node1, 0.) + edge_weight
+            self.gdegrees[node1] += 2. * edge_weight
+            self._update_community(com1, 2. * edge_weight, edge_weight)
+            return
+        self.gdegrees[node1] += edge_weight
+        self.gdegrees[node2] += edge_weight
+        if com1 == com2:
+            self._update_community(com1, 2. * edge_weight, edge_weight)
+        else:
+            self._update_community(com1, edge_weight)
+            self._update_community(com2, edge_weight)
+
+    def rescale(self, factor):
+        """Multiply every edge weight of the status by factor
+
+        The modularity and every modularity gain are the same for a graph
+        whose weights are all scaled by one factor, so this lets the weights
+        of a graph be rebased (such as the decayed weights of
+        evaluation.sliding_window) without touching its nodes one by one.
+        """
+        if factor == 1:
+            return
+        self.total_weight *= factor
+        for aggregate in (self.degrees, self.gdegrees, self.internals, self.loops):
+            for key in aggregate:
+                aggregate[key] *= factor
+        self.modularity_internals *= factor
+        self.modularity_degrees *= factor ** 2
+
+    def apply_delta(self, graph: nx.Graph, added_edges=(), removed_edges=(), removed_nodes=(), soft_removed=False):
+        """Bring a status of the previous snapshot up to date with graph
+
+        Only the nodes touched by the changes are visited: the aggregates of
+        their communities, their core centrality and the soft-node set are
+        updated in place, so the cost scales with the churn between snapshots
+        instead of with the size of graph. Nodes that appear in added_edges
+        but not in the status are new arrivals, each put in its own community.
+
+        Parameters
+        ----------
+        graph : networkx.Graph
+            the new snapshot, already containing the changes
+        added_edges : iterable of (node, node, weight)
+            edges of graph which were not in the previous snapshot
+        removed_edges : iterable of (node, node, weight)
+            edges of the previous snapshot which are not in graph
+        removed_nodes : iterable
+            nodes of the previous snapshot which are not in graph
+        soft_removed : bool, optional
+            also mark the nodes that lost an edge (or whose edge changed
+            weight) soft, not only the new arrivals and their neighbourhood.
+            Default to False
+
+        Raises
+        ------
+        ValueError
+            If an added edge does not have a positive weight
+        """
+        for node in self.arrivals:
+            if node in self.node_new_arrival:
+                self.node_new_arrival[node] = False
+        self.arrivals = set()
+        touched = set()
+        departures = set()
+
+        for node1, node2, edge_weight in removed_edges:
+            self._add_edge_weight(node1, node2, -float(edge_weight))
+            touched.update((node1, node2))
+        if soft_removed:
+            departures = set(touched)
+
+        for node1, node2, edge_weight in added_edges:
+            if edge_weight <= 0:
+                error = "Bad graph type ({})".format(type(graph))
+                raise ValueError(error)
+            for node in (node1, node2):
+                if node not in self.node2com:
+                    self.max_com_id += 1
+                    self.node2com[node] = self.max_com_id
+                    self.degrees[self.max_com_id] = 0.
+                    self.internals[self.max_com_id] = 0.
+                    self._update_community(self.max_com_id, joining=node)
+                    self.gdegrees[node] = 0.
+                    self.node_new_arrival[node] = True
+                    self.arrivals.add(node)
+            self._add_edge_weight(node1, node2, float(edge_weight))
+            touched.update((node1, node2))
+
+        for node in removed_nodes:
+            if node in self.node2com:
+                self._update_community(self.node2com.pop(node), leaving=node)
+            for attribute in (self.gdegrees, self.loops, self.node_new_arrival,
+                              self.external_degrees, self.core_centrality):
+                attribute.pop(node, None)
+            self.low_core_nodes.discard(node)
+            touched.discard(node)
+
+        self._update_core_centrality(graph, touched)
+        self.soft_frontier = self._soft_frontier(graph, self.arrivals)
+        self.soft_frontier |= departures.intersection(self.node2com)
+        self.soft_nodes_set = self.soft_frontier | self.low_core_nodes
+
+    def reassign(self, graph: nx.Graph, partition: dict):
+        """Move the nodes of graph to the communities of partition
+
+        The labels of partition are first matched to the current communities
+        by largest overlap, so that only nodes which really changed community
+        are moved. The core centrality of the moved nodes and their neighbours
+        is updated as well.
+        """
+        relabel = _match_labels(partition, self.node2com)
+        for com in set(partition.values()) - relabel.keys():
+            self.max_com_id += 1
+            relabel[com] = self.max_com_id
+
+        moved = set()
+        for node, com in partition.items():
+            com = relabel[com]
+            com_node = self.node2com[node]
+            if com == com_node:
+                continue
+            weight_old = 0.
+            weight_new = 0.
+            for neighbor, datas in graph[node].items():
+                if neighbor == node:
+                    continue
+                neighborcom = self.node2com[neighbor]
+                if neighborcom == com_node:
+                    weight_old += datas.get(self.weight, 1)
+                elif neighborcom == com:
+                    weight_new += datas.get(self.weight, 1)
+            loop = self.loops.get(node, 0.)
+            self._update_community(com_node, -self.gdegrees.get(node, 0.), -weight_old - loop, leaving=node)
+            self._update_community(com, self.gdegrees.get(node, 0.), weight_new + loop, joining=node)
+            self.node2com[node] = com
+            moved.add(node)
+
+        for node in list(moved):
+            moved.update(graph.neighbors(node))
+        self._update_core_centrality(graph, moved)
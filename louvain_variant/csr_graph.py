@@ -0,0 +1,203 @@
+import networkx as nx
+import numpy as np
+
+
+def _sum_edge_pairs(src, dst, weights):
+    """Merge parallel edges of an undirected edge list
+
+    Every pair of endpoints is reduced to a single edge whose weight is the sum
+    of the weights of all the edges between them. The merged edges are returned
+    in order of first appearance, so that building a graph from them inserts
+    the edges in the same order as adding them one by one would.
+
+    Parameters
+    ----------
+    src, dst : numpy.ndarray
+        integer endpoints of the edges, one entry per edge
+    weights : numpy.ndarray
+        weight of every edge
+
+    Returns
+    -------
+    src, dst, weights : numpy.ndarray
+        the endpoints (``src <= dst``) and summed weights of the merged edges
+    """
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.float64)
+    if len(src) == 0:
+        return src, dst, weights
+
+    low = np.minimum(src, dst)
+    high = np.maximum(src, dst)
+    keys = low * (int(high.max()) + 1) + high
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    summed = np.bincount(inverse, weights=weights)
+    order = np.argsort(first, kind="stable")
+    return low[first[order]], high[first[order]], summed[order]
+
+
+class CSRGraph(object):
+    """
+    Undirected weighted graph stored as compressed sparse rows
+
+    Node ``i`` stands for ``labels[i]`` of the graph it was built from, its
+    neighbours are ``indices[indptr[i]:indptr[i + 1]]`` and the matching edge
+    weights ``weights[indptr[i]:indptr[i + 1]]``. Edges are stored in both rows,
+    self-loops only once, which mirrors the adjacency of a networkx.Graph.
+    """
+    def __init__(self, indptr, indices, weights, labels=None):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        num_nodes = len(self.indptr) - 1
+        self.labels = list(range(num_nodes)) if labels is None else list(labels)
+
+        self.rows = np.repeat(np.arange(num_nodes, dtype=np.int32), np.diff(self.indptr))
+        loop_mask = self.rows == self.indices
+        self.loops = np.zeros(num_nodes)
+        self.loops[self.rows[loop_mask]] = self.weights[loop_mask]
+        # a self-loop counts twice towards the degree, as in networkx
+        self.degrees = np.bincount(self.rows, weights=self.weights, minlength=num_nodes) + self.loops
+
+        # plain lists are much faster than numpy scalars in the per-node loops
+        self._indptr_list = self.indptr.tolist()
+        self._indices_list = self.indices.tolist()
+        self._weights_list = self.weights.tolist()
+
+    @classmethod
+    def from_networkx(cls, graph: nx.Graph, weight="weight"):
+        """Convert a networkx graph, keeping its node order
+
+        The neighbours of every node are listed in the order in which its
+        edges first appear in graph.edges(), which is the order of a copy of
+        graph, so that both engines visit them in the same order.
+        """
+        index = {node: i for i, node in enumerate(graph)}
+        edges = list(graph.edges(data=weight, default=1))
+        src = np.fromiter((index[node] for node, _, _ in edges), dtype=np.int64, count=len(edges))
+        dst = np.fromiter((index[node] for _, node, _ in edges), dtype=np.int64, count=len(edges))
+        weights = np.fromiter((edge_weight for _, _, edge_weight in edges), dtype=np.float64, count=len(edges))
+
+        return cls.from_edges(len(index), src, dst, weights, labels=list(index))
+
+    @classmethod
+    def from_edges(cls, num_nodes, src, dst, weights, labels=None):
+        """Build a graph on ``num_nodes`` nodes from an undirected edge list
+
+        Parallel edges are merged by summing their weights, and every row lists
+        its neighbours in the order in which their edges first appear.
+        """
+        src, dst, weights = _sum_edge_pairs(src, dst, weights)
+        not_loop = src != dst
+        rows = np.concatenate([src, dst[not_loop]])
+        cols = np.concatenate([dst, src[not_loop]])
+        data = np.concatenate([weights, weights[not_loop]])
+        # interleave both directions of every edge before grouping by row
+        position = np.concatenate([np.arange(len(src)), np.flatnonzero(not_loop)])
+        order = np.lexsort((position, rows))
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=num_nodes), out=indptr[1:])
+
+        return cls(indptr, cols[order], data[order], labels=labels)
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def __iter__(self):
+        return iter(range(len(self)))
+
+    def nodes(self):
+        return range(len(self))
+
+    def number_of_nodes(self):
+        return len(self)
+
+    def number_of_edges(self):
+        return (len(self.indices) + int(np.count_nonzero(self.loops))) // 2
+
+    def is_directed(self):
+        return False
+
+    def size(self):
+        """Total weight of the edges"""
+        return float(self.weights.sum() + self.loops.sum()) / 2.
+
+    def neighbors(self, node):
+        return self._indices_list[self._indptr_list[node]:self._indptr_list[node + 1]]
+
+    def neighcom(self, node, node2com):
+        """Weights from node to each community of its neighbours"""
+        start = self._indptr_list[node]
+        stop = self._indptr_list[node + 1]
+        weights = {}
+        for neighbor, edge_weight in zip(self._indices_list[start:stop], self._weights_list[start:stop]):
+            if neighbor != node:
+                neighborcom = node2com[neighbor]
+                weights[neighborcom] = weights.get(neighborcom, 0) + edge_weight
+
+        return weights
+
+    def partition_array(self, partition):
+        """Turn a partition keyed by node index into a label array"""
+        labels = np.empty(len(self), dtype=np.int64)
+        labels[np.fromiter(partition.keys(), dtype=np.int64, count=len(partition))] = \
+            np.fromiter(partition.values(), dtype=np.int64, count=len(partition))
+        return labels
+
+    def neighbourhood_stats(self, labels):
+        """Core centrality, external degree and internal weight of every node
+
+        The core centrality of a node is the fraction of its neighbours that
+        share its label, the external degree the number of those that do not
+        and the internal weight the weight of its edges inside its community
+        (halved, except for a self-loop). All three come from one pass over
+        the arrays.
+        """
+        same = labels[self.rows] == labels[self.indices]
+        external = np.bincount(self.rows, weights=~same, minlength=len(self))
+        degree = np.diff(self.indptr)
+        core_centrality = 1. - np.divide(external, degree, out=np.zeros(len(self)), where=degree > 0)
+        # edges between two nodes appear in both rows, self-loops only once
+        weights = np.where(self.rows == self.indices, self.weights, self.weights / 2.)
+        internals = np.bincount(self.rows, weights=np.where(same, weights, 0.), minlength=len(self))
+        return core_centrality, external.astype(np.int64), internals
+
+    def two_hop(self, mask):
+        """Nodes reachable from the masked nodes through exactly two edges"""
+        hop = np.zeros(len(self), dtype=bool)
+        hop[self.indices[mask[self.rows]]] = True
+        frontier = np.zeros(len(self), dtype=bool)
+        frontier[self.indices[hop[self.rows]]] = True
+        return frontier
+
+    def aggregate(self, partition):
+        """Graph of the communities of partition, see induced_graph
+
+        As the nodes of the networkx induced graph, the communities are placed
+        in the order in which they first appear among the values of partition,
+        and labelled with their ids.
+        """
+        labels = self.partition_array(partition)
+        values = np.fromiter(partition.values(), dtype=np.int64, count=len(partition))
+        communities, first = np.unique(values, return_index=True)
+        order = np.argsort(first, kind="stable")
+        position = np.empty(len(communities), dtype=np.int64)
+        position[order] = np.arange(len(communities))
+        labels = position[np.searchsorted(communities, labels)]
+        # every undirected edge once, in the order networkx would list it
+        upper = self.rows <= self.indices
+        return CSRGraph.from_edges(len(communities),
+                                   labels[self.rows[upper]],
+                                   labels[self.indices[upper]],
+                                   self.weights[upper],
+                                   labels=communities[order].tolist())
+
+    def to_networkx(self, weight="weight"):
+        graph = nx.Graph()
+        graph.add_nodes_from(self.labels)
+        upper = self.rows <= self.indices
+        graph.add_weighted_edges_from(zip([self.labels[i] for i in self.rows[upper]],
+                                          [self.labels[i] for i in self.indices[upper]],
+                                          self.weights[upper].tolist()), weight=weight)
+        return graph
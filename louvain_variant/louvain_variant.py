@@ -14,11 +14,17 @@
 
 from __future__ import print_function
 
-import warnings
+import heapq
+import numbers
+import numpy as np
 
-from louvain_variant.utils import __neighcom, __remove, __insert, __modularity, __randomize, __renumber
+from collections import deque
+
+from louvain_variant.utils import __neighcom, __remove, __insert, __modularity, __randomize, __renumber, __movable_nodes
 from louvain_variant.utils import induced_graph, modularity, partition_at_level, __PASS_MAX, __MIN, check_random_state
+from louvain_variant.utils import engine_graph, partition_by_label, resolve_randomize
 from .community_status import Status
+from .profiler import NULL_PROFILER
 
 __author__ = """Thomas Aynaud (thomas.aynaud@lip6.fr)"""
 #    Copyright (C) 2009 by
@@ -32,7 +38,12 @@ def best_partition(graph,
                    resolution=1.,
                    randomize=None,
                    random_state=None,
-                   core_threshold=0.8):
+                   core_threshold=0.8,
+                   engine="networkx",
+                   status=None,
+                   local_moving="passes",
+                   core_cache=None,
+                   profiler=None):
     """Compute the partition of the graph nodes which maximises the modularity
     (or try..) using the Louvain heuristices
 
@@ -61,6 +72,33 @@ def best_partition(graph,
         If RandomState instance, random_state is the random number generator;
         If None, the random number generator is the RandomState instance used
         by `np.random`.
+    core_threshold : float, optional
+        nodes whose core centrality is below this value are re-evaluated when
+        a partition is given. Default to 0.8
+    engine : str, optional
+        'networkx' runs on the networkx graph, 'csr' converts it once into
+        NumPy CSR arrays (see CSRGraph) and runs on those. The partitions of
+        the two are close in modularity and number of communities but not
+        identical, the csr engine visits the (soft) nodes in another order
+        and so makes other random moves. Default to 'networkx'
+    status : Status, optional
+        a status of graph and partition kept up to date across snapshots with
+        Status.apply_delta. It is used instead of initialising a new one and
+        is left unchanged. Only available with the 'networkx' engine
+    local_moving : str, optional
+        'passes' sweeps over all (soft) nodes until a pass no longer improves
+        the modularity. 'queue' visits every node once and then only
+        re-visits the neighbours of nodes that changed community, and
+        'core_queue' does the same starting with the nodes of lowest core
+        centrality. Default to 'passes'
+    core_cache : CoreCentralityCache, optional
+        neighbourhood statistics of the previous snapshot, used to only
+        recompute those of the nodes around a change when a partition is
+        given. It is updated with the current snapshot. Ignored by the 'csr'
+        engine, which computes them all at once
+    profiler : PhaseProfiler, optional
+        records the time of every phase per dendrogram level, see
+        PhaseProfiler. Default to no profiling
 
     Returns
     -------
@@ -119,7 +157,12 @@ def best_partition(graph,
                                 resolution,
                                 randomize,
                                 random_state,
-                                core_threshold)
+                                core_threshold,
+                                engine,
+                                status,
+                                local_moving,
+                                core_cache,
+                                profiler)
     return partition_at_level(dendo, len(dendo) - 1)
 
 def generate_dendrogram(graph,
@@ -128,7 +171,12 @@ def generate_dendrogram(graph,
                         resolution=1.,
                         randomize=None,
                         random_state=None,
-                        core_threshold=0.8):
+                        core_threshold=0.8,
+                        engine="networkx",
+                        status=None,
+                        local_moving="passes",
+                        core_cache=None,
+                        profiler=None):
     """Find communities in the graph and return the associated dendrogram
 
     A dendrogram is a tree and each level is a partition of the graph nodes.
@@ -151,6 +199,16 @@ def generate_dendrogram(graph,
         represents the time described in
         "Laplacian Dynamics and Multiscale Modular Structure in Networks",
         R. Lambiotte, J.-C. Delvenne, M. Barahona
+    engine : str, optional
+        'networkx' or 'csr', see best_partition
+    status : Status, optional
+        a status of graph and part_init to start from, see best_partition
+    local_moving : str, optional
+        'passes', 'queue' or 'core_queue', see best_partition
+    core_cache : CoreCentralityCache, optional
+        statistics of the previous snapshot, see best_partition
+    profiler : PhaseProfiler, optional
+        timings of the phases, see best_partition
 
     Returns
     -------
@@ -162,6 +220,9 @@ def generate_dendrogram(graph,
     ------
     TypeError
         If the graph is not a networkx.Graph
+    ValueError
+        If a status is given with an engine other than 'networkx', or the
+        local_moving mode is unknown
 
     See Also
     --------
@@ -189,21 +250,7 @@ def generate_dendrogram(graph,
     if graph.is_directed():
         raise TypeError("Bad graph type, use only non directed graph")
 
-    # Properly handle random state, eventually remove old `randomize` parameter
-    # NOTE: when `randomize` is removed, delete code up to random_state = ...
-    if randomize is not None:
-        warnings.warn("The `randomize` parameter will be deprecated in future "
-                      "versions. Use `random_state` instead.", DeprecationWarning)
-        # If shouldn't randomize, we set a fixed seed to get determinisitc results
-        if randomize is False:
-            random_state = 0
-
-    # We don't know what to do if both `randomize` and `random_state` are defined
-    if randomize and random_state is not None:
-        raise ValueError("`randomize` and `random_state` cannot be used at the "
-                         "same time")
-
-    random_state = check_random_state(random_state)
+    random_state = check_random_state(resolve_randomize(randomize, random_state))
 
     # special case, when there is no link
     # the best partition is everyone in its community
@@ -213,28 +260,202 @@ def generate_dendrogram(graph,
             part[node] = i
         return [part]
 
-    current_graph = graph.copy()
-    status = Status(core_threshold=core_threshold)
-    status.init(current_graph, weight, part_init)
+    if status is not None and engine != "networkx":
+        raise ValueError("A persistent status is only supported by the networkx engine")
+    if local_moving not in ("passes", "queue", "core_queue"):
+        raise ValueError("Unknown local moving ({}), use 'passes', 'queue' or 'core_queue'".format(local_moving))
+
+    profiler = NULL_PROFILER if profiler is None else profiler
+    profiler.level = 0
+    with profiler.phase("copy"):
+        if status is None:
+            current_graph, part_init = engine_graph(graph, part_init, weight, engine)
+        else:
+            # the levels only read the graph, a copy would cost a pass over all edges of every snapshot
+            current_graph = graph
+    if status is None:
+        status = Status(core_threshold=core_threshold)
+        with profiler.phase("init"):
+            status.init(current_graph, weight, part_init, cache=core_cache, profiler=profiler)
+        return __levels(graph, current_graph, status, weight, resolution, random_state, engine, local_moving, profiler)
+
+    # the moves on a given status are undone once level 0 is read off
+    recording = status.journal is not None
+    marker = status.checkpoint()
+    try:
+        return __levels(graph, current_graph, status, weight, resolution, random_state, engine, local_moving, profiler)
+    finally:
+        status.rollback(marker)
+        if not recording:
+            status.release()
+
+def best_partition_sweep(graph,
+                         core_thresholds,
+                         partition=None,
+                         weight='weight',
+                         resolution=1.,
+                         randomize=None,
+                         random_state=None,
+                         engine="networkx",
+                         local_moving="passes",
+                         core_cache=None,
+                         profiler=None):
+    """Compute best_partition for several core thresholds at once
+
+    Parameters
+    ----------
+    graph : networkx.Graph
+       the networkx graph which is decomposed
+    core_thresholds : iterable of float
+       the core thresholds to compute a partition for
+    partition, weight, resolution, randomize, random_state, engine,
+    local_moving, core_cache, profiler :
+       see best_partition
+
+    Returns
+    -------
+    partitions : dict
+       the partition of every core threshold
+
+    See Also
+    --------
+    generate_dendrogram_sweep : for the work that is shared between the
+    thresholds
+    """
+    dendrograms = generate_dendrogram_sweep(graph,
+                                            core_thresholds,
+                                            partition,
+                                            weight,
+                                            resolution,
+                                            randomize,
+                                            random_state,
+                                            engine,
+                                            local_moving,
+                                            core_cache,
+                                            profiler)
+    return {core_threshold: partition_at_level(dendo, len(dendo) - 1)
+            for core_threshold, dendo in dendrograms.items()}
+
+def generate_dendrogram_sweep(graph,
+                              core_thresholds,
+                              part_init=None,
+                              weight='weight',
+                              resolution=1.,
+                              randomize=None,
+                              random_state=None,
+                              engine="networkx",
+                              local_moving="passes",
+                              core_cache=None,
+                              profiler=None):
+    """Find the dendrogram of generate_dendrogram for several core thresholds
+
+    The work that does not depend on the threshold is done once: copying or
+    converting graph and initialising the status, neighbourhood statistics
+    included. Every threshold continues from a copy of that status with its
+    low-core and soft nodes rebuilt. Without part_init the threshold plays no
+    role, so with an integer random_state one dendrogram is computed and
+    handed to every threshold.
+
+    With an integer random_state every dendrogram equals the one of
+    generate_dendrogram with that threshold; a RandomState instance is used
+    by the thresholds in turn, as by consecutive calls.
+
+    Parameters
+    ----------
+    graph : networkx.Graph
+        the networkx graph which will be decomposed
+    core_thresholds : iterable of float
+        the core thresholds to find a dendrogram for
+    part_init, weight, resolution, randomize, random_state, engine,
+    local_moving, core_cache, profiler :
+        see generate_dendrogram
+
+    Returns
+    -------
+    dendrograms : dict
+        the dendrogram of every core threshold
+
+    Raises
+    ------
+    TypeError
+        If the graph is not a networkx.Graph
+    ValueError
+        If the local_moving mode is unknown
+    """
+    if graph.is_directed():
+        raise TypeError("Bad graph type, use only non directed graph")
+
+    core_thresholds = list(core_thresholds)
+    seed = resolve_randomize(randomize, random_state)
+    if not core_thresholds:
+        return dict([])
+
+    # special case, when there is no link
+    # the best partition is everyone in its community
+    if graph.number_of_edges() == 0:
+        return {core_threshold: [{node: i for i, node in enumerate(graph.nodes())}]
+                for core_threshold in core_thresholds}
+
+    if local_moving not in ("passes", "queue", "core_queue"):
+        raise ValueError("Unknown local moving ({}), use 'passes', 'queue' or 'core_queue'".format(local_moving))
+
+    profiler = NULL_PROFILER if profiler is None else profiler
+    profiler.level = 0
+    with profiler.phase("copy"):
+        current_graph, part_init = engine_graph(graph, part_init, weight, engine)
+    shared_status = Status(core_threshold=core_thresholds[0])
+    with profiler.phase("init"):
+        shared_status.init(current_graph, weight, part_init, cache=core_cache, profiler=profiler)
+    shared = part_init is None and isinstance(seed, (numbers.Integral, np.integer))
+
+    dendrograms = dict([])
+    for core_threshold in core_thresholds:
+        if shared and dendrograms:
+            dendrograms[core_threshold] = [level.copy() for level in dendrograms[core_thresholds[0]]]
+            continue
+        status = shared_status.copy()
+        status.set_core_threshold(core_threshold)
+        dendrograms[core_threshold] = __levels(graph, current_graph, status, weight, resolution,
+                                               check_random_state(seed), engine, local_moving, profiler)
+    return dendrograms
+
+def __levels(graph, current_graph, status: Status, weight, resolution, random_state, engine, local_moving, profiler):
+    """Build the dendrogram from a status of current_graph
+
+    status is only used for level 0, the levels above it get a status of
+    their own.
+    """
     status_list = list()
-    __one_level(current_graph, status, weight, resolution, random_state)
+    profiler.level = 0
+    with profiler.phase("local_moving"):
+        __local_moving(current_graph, status, weight, resolution, random_state, local_moving)
     new_mod = __modularity(status, resolution)
-    partition = __renumber(status.node2com)
-    status_list.append(partition)
+    with profiler.phase("renumber"):
+        partition = __renumber(status.node2com)
+    status = Status(core_threshold=status.core_threshold)
+    status_list.append(partition_by_label(partition, current_graph))
     mod = new_mod
-    current_graph = induced_graph(partition, current_graph, weight)
-    status.init(current_graph, weight)
+    with profiler.phase("induced_graph"):
+        current_graph = induced_graph(partition, current_graph, weight)
+    profiler.level = 1
+    with profiler.phase("init"):
+        status.init(current_graph, weight)
 
     while True:
-        __one_level(current_graph, status, weight, resolution, random_state)
+        with profiler.phase("local_moving"):
+            __local_moving(current_graph, status, weight, resolution, random_state, local_moving)
         new_mod = __modularity(status, resolution)
         if new_mod - mod < __MIN:
             break
-        partition = __renumber(status.node2com)
-        status_list.append(partition)
+        with profiler.phase("renumber"):
+            partition = __renumber(status.node2com)
+        status_list.append(partition_by_label(partition, current_graph))
         mod = new_mod
-        current_graph = induced_graph(partition, current_graph, weight)
-        status.init(current_graph, weight)
+        with profiler.phase("induced_graph"):
+            current_graph = induced_graph(partition, current_graph, weight)
+        profiler.level += 1
+        with profiler.phase("init"):
+            status.init(current_graph, weight)
     return status_list[:]
 
 
@@ -246,37 +467,106 @@ def __one_level(graph, status: Status, weight_key, resolution, random_state):
     nb_pass_done = 0
     cur_mod = __modularity(status, resolution)
     new_mod = cur_mod
+    movable = __movable_nodes(graph, status)
 
     while modified and nb_pass_done != __PASS_MAX:
         cur_mod = new_mod
         modified = False
         nb_pass_done += 1
 
-        if status.soft_nodes_set is None:
-            iterator = __randomize(graph.nodes(), random_state)
-        else:
-            iterator = __randomize(status.soft_nodes_set, random_state)
+        iterator = __randomize(movable, random_state)
 
         for node in iterator:
-            com_node = status.node2com[node]
-            degc_totw = status.gdegrees.get(node, 0.) / (status.total_weight * 2.)  # NOQA
-            neigh_communities = __neighcom(node, graph, status, weight_key)
-            remove_cost = - neigh_communities.get(com_node,0) + \
-                resolution * (status.degrees.get(com_node, 0.) - status.gdegrees.get(node, 0.)) * degc_totw
-            __remove(node, com_node,
-                     neigh_communities.get(com_node, 0.), status)
-            best_com = com_node
-            best_increase = 0
-            for com, dnc in __randomize(neigh_communities.items(), random_state):
-                incr = remove_cost + dnc - \
-                       resolution * status.degrees.get(com, 0.) * degc_totw
-                if incr > best_increase:
-                    best_increase = incr
-                    best_com = com
-            __insert(node, best_com,
-                     neigh_communities.get(best_com, 0.), status)
+            com_node, best_com = __move_node(node, graph, status, weight_key, resolution, random_state)
             if best_com != com_node:
                 modified = True
         new_mod = __modularity(status, resolution)
         if new_mod - cur_mod < __MIN:
-            break
\ No newline at end of file
+            break
+
+def __local_moving(graph, status: Status, weight_key, resolution, random_state, local_moving):
+    """Run the local moving phase of one level in the given mode"""
+    if local_moving == "passes":
+        __one_level(graph, status, weight_key, resolution, random_state)
+    else:
+        __one_level_queue(graph, status, weight_key, resolution, random_state,
+                          by_core_centrality=local_moving == "core_queue")
+
+def __move_node(node, graph, status: Status, weight_key, resolution, random_state):
+    """Move node to the neighbouring community with the best modularity gain
+
+    Returns the community the node was in and the one it is in now.
+    """
+    com_node = status.node2com[node]
+    degc_totw = status.gdegrees.get(node, 0.) / (status.total_weight * 2.)  # NOQA
+    neigh_communities = __neighcom(node, graph, status, weight_key)
+    remove_cost = - neigh_communities.get(com_node,0) + \
+        resolution * (status.degrees.get(com_node, 0.) - status.gdegrees.get(node, 0.)) * degc_totw
+    __remove(node, com_node,
+             neigh_communities.get(com_node, 0.), status)
+    best_com = com_node
+    best_increase = 0
+    for com, dnc in __randomize(neigh_communities.items(), random_state):
+        incr = remove_cost + dnc - \
+               resolution * status.degrees.get(com, 0.) * degc_totw
+        if incr > best_increase:
+            best_increase = incr
+            best_com = com
+    __insert(node, best_com,
+             neigh_communities.get(best_com, 0.), status)
+
+    return com_node, best_com
+
+def __one_level_queue(graph, status: Status, weight_key, resolution, random_state, by_core_centrality=False):
+    """Compute one level of communities with a work queue
+
+    Every (soft) node is visited once in random order; afterwards only the
+    neighbours of a node that changed community are queued again, and only
+    if they are not already queued or in the new community. With
+    by_core_centrality the queue is a heap on core centrality, so the
+    loosest attached nodes are visited first. As in __one_level, the visits
+    are counted in passes, a pass being as many visits as there were nodes
+    queued when it started: the queue is left once a pass raised the
+    modularity by less than __MIN, so moves whose gains are float noise
+    cannot queue each other again forever.
+    """
+    movable = status.soft_nodes_set
+    nodes = __randomize(__movable_nodes(graph, status), random_state)
+
+    queued = set(nodes)
+    if by_core_centrality:
+        # the insertion counter keeps the random order among equal centralities
+        queue = [(status.core_centrality.get(node, 0.), count, node) for count, node in enumerate(nodes)]
+        heapq.heapify(queue)
+        count = len(queue)
+    else:
+        queue = deque(nodes)
+
+    nb_pass_done = 0
+    cur_mod = __modularity(status, resolution)
+    remaining = len(queue) # visits left in the current pass
+    while queue:
+        if remaining == 0:
+            nb_pass_done += 1
+            new_mod = __modularity(status, resolution)
+            if new_mod - cur_mod < __MIN or nb_pass_done == __PASS_MAX:
+                break
+            cur_mod = new_mod
+            remaining = len(queue)
+        remaining -= 1
+        node = heapq.heappop(queue)[2] if by_core_centrality else queue.popleft()
+        queued.discard(node)
+        com_node, best_com = __move_node(node, graph, status, weight_key, resolution, random_state)
+        if best_com == com_node:
+            continue
+        for neighbor in graph.neighbors(node):
+            if neighbor in queued or status.node2com[neighbor] == best_com:
+                continue
+            if movable is not None and neighbor not in movable:
+                continue
+            queued.add(neighbor)
+            if by_core_centrality:
+                heapq.heappush(queue, (status.core_centrality.get(neighbor, 0.), count, neighbor))
+                count += 1
+            else:
+                queue.append(neighbor)
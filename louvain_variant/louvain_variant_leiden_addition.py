@@ -17,13 +17,15 @@
 
 from __future__ import print_function
 
-import copy
 import networkx as nx
-import warnings
+import numbers
+import numpy as np
 
 from .community_status import Status
-from louvain_variant.utils import __neighcom, __remove, __insert, __modularity, __randomize, __renumber
+from .profiler import NULL_PROFILER
+from louvain_variant.utils import __neighcom, __remove, __insert, __modularity, __randomize, __renumber, __movable_nodes
 from louvain_variant.utils import induced_graph, modularity, partition_at_level, __PASS_MAX, __MIN, check_random_state
+from louvain_variant.utils import engine_graph, partition_by_label, partition_by_position, resolve_randomize
 
 
 __author__ = """Thomas Aynaud (thomas.aynaud@lip6.fr)"""
@@ -38,7 +40,11 @@ def best_partition(graph,
                    resolution=1.,
                    randomize=None,
                    random_state=None,
-                   core_threshold=0.8):
+                   core_threshold=0.8,
+                   engine="networkx",
+                   status=None,
+                   core_cache=None,
+                   profiler=None):
     """Compute the partition of the graph nodes which maximises the modularity
     (or try..) using the Louvain heuristices
 
@@ -67,6 +73,27 @@ def best_partition(graph,
         If RandomState instance, random_state is the random number generator;
         If None, the random number generator is the RandomState instance used
         by `np.random`.
+    core_threshold : float, optional
+        nodes whose core centrality is below this value are re-evaluated when
+        a partition is given. Default to 0.8
+    engine : str, optional
+        'networkx' runs on the networkx graph, 'csr' converts it once into
+        NumPy CSR arrays (see CSRGraph) and runs on those. The partitions of
+        the two are close in modularity and number of communities but not
+        identical, the csr engine visits the (soft) nodes in another order
+        and so makes other random moves. Default to 'networkx'
+    status : Status, optional
+        a status of graph and partition kept up to date across snapshots with
+        Status.apply_delta. It is used instead of initialising a new one and
+        is left unchanged. Only available with the 'networkx' engine
+    core_cache : CoreCentralityCache, optional
+        neighbourhood statistics of the previous snapshot, used to only
+        recompute those of the nodes around a change when a partition is
+        given. It is updated with the current snapshot. Ignored by the 'csr'
+        engine, which computes them all at once
+    profiler : PhaseProfiler, optional
+        records the time of every phase per dendrogram level, see
+        PhaseProfiler. Default to no profiling
 
     Returns
     -------
@@ -125,7 +152,11 @@ def best_partition(graph,
                                 resolution,
                                 randomize,
                                 random_state,
-                                core_threshold)
+                                core_threshold,
+                                engine,
+                                status,
+                                core_cache,
+                                profiler)
   
     return partition_at_level(dendo, len(dendo) - 1)
 
@@ -135,7 +166,11 @@ def generate_dendrogram(graph,
                         resolution=1.,
                         randomize=None,
                         random_state=None,
-                        core_threshold=0.8):
+                        core_threshold=0.8,
+                        engine="networkx",
+                        status=None,
+                        core_cache=None,
+                        profiler=None):
     """Find communities in the graph and return the associated dendrogram
 
     A dendrogram is a tree and each level is a partition of the graph nodes.
@@ -158,6 +193,14 @@ def generate_dendrogram(graph,
         represents the time described in
         "Laplacian Dynamics and Multiscale Modular Structure in Networks",
         R. Lambiotte, J.-C. Delvenne, M. Barahona
+    engine : str, optional
+        'networkx' or 'csr', see best_partition
+    status : Status, optional
+        a status of graph and part_init to start from, see best_partition
+    core_cache : CoreCentralityCache, optional
+        statistics of the previous snapshot, see best_partition
+    profiler : PhaseProfiler, optional
+        timings of the phases, see best_partition
 
     Returns
     -------
@@ -169,6 +212,8 @@ def generate_dendrogram(graph,
     ------
     TypeError
         If the graph is not a networkx.Graph
+    ValueError
+        If a status is given with an engine other than 'networkx'
 
     See Also
     --------
@@ -196,21 +241,7 @@ def generate_dendrogram(graph,
     if graph.is_directed():
         raise TypeError("Bad graph type, use only non directed graph")
 
-    # Properly handle random state, eventually remove old `randomize` parameter
-    # NOTE: when `randomize` is removed, delete code up to random_state = ...
-    if randomize is not None:
-        warnings.warn("The `randomize` parameter will be deprecated in future "
-                      "versions. Use `random_state` instead.", DeprecationWarning)
-        # If shouldn't randomize, we set a fixed seed to get determinisitc results
-        if randomize is False:
-            random_state = 0
-
-    # We don't know what to do if both `randomize` and `random_state` are defined
-    if randomize and random_state is not None:
-        raise ValueError("`randomize` and `random_state` cannot be used at the "
-                         "same time")
-
-    random_state = check_random_state(random_state)
+    random_state = check_random_state(resolve_randomize(randomize, random_state))
 
     # special case, when there is no link
     # the best partition is everyone in its community
@@ -220,44 +251,217 @@ def generate_dendrogram(graph,
             part[node] = i
         return [part]
 
-    current_graph = graph.copy()
-    status = Status(core_threshold=core_threshold)
-    status.init(current_graph, weight, part_init)
+    if status is not None and engine != "networkx":
+        raise ValueError("A persistent status is only supported by the networkx engine")
+
+    profiler = NULL_PROFILER if profiler is None else profiler
+    profiler.level = 0
+    with profiler.phase("copy"):
+        if status is None:
+            current_graph, part_init = engine_graph(graph, part_init, weight, engine)
+        else:
+            # the levels only read the graph, a copy would cost a pass over all edges of every snapshot
+            current_graph = graph
+    if status is None:
+        status = Status(core_threshold=core_threshold)
+        with profiler.phase("init"):
+            status.init(current_graph, weight, part_init, cache=core_cache, profiler=profiler)
+        return __levels(graph, current_graph, status, weight, resolution, random_state, engine, profiler)
+
+    # the moves and refinement on a given status are undone once level 0 is read off
+    recording = status.journal is not None
+    marker = status.checkpoint()
+    try:
+        return __levels(graph, current_graph, status, weight, resolution, random_state, engine, profiler)
+    finally:
+        status.rollback(marker)
+        if not recording:
+            status.release()
+
+def best_partition_sweep(graph,
+                         core_thresholds,
+                         partition=None,
+                         weight='weight',
+                         resolution=1.,
+                         randomize=None,
+                         random_state=None,
+                         engine="networkx",
+                         core_cache=None,
+                         profiler=None):
+    """Compute best_partition for several core thresholds at once
+
+    Parameters
+    ----------
+    graph : networkx.Graph
+       the networkx graph which is decomposed
+    core_thresholds : iterable of float
+       the core thresholds to compute a partition for
+    partition, weight, resolution, randomize, random_state, engine,
+    core_cache, profiler :
+       see best_partition
+
+    Returns
+    -------
+    partitions : dict
+       the partition of every core threshold
+
+    See Also
+    --------
+    generate_dendrogram_sweep : for the work that is shared between the
+    thresholds
+    """
+    dendrograms = generate_dendrogram_sweep(graph,
+                                            core_thresholds,
+                                            partition,
+                                            weight,
+                                            resolution,
+                                            randomize,
+                                            random_state,
+                                            engine,
+                                            core_cache,
+                                            profiler)
+    return {core_threshold: partition_at_level(dendo, len(dendo) - 1)
+            for core_threshold, dendo in dendrograms.items()}
+
+def generate_dendrogram_sweep(graph,
+                              core_thresholds,
+                              part_init=None,
+                              weight='weight',
+                              resolution=1.,
+                              randomize=None,
+                              random_state=None,
+                              engine="networkx",
+                              core_cache=None,
+                              profiler=None):
+    """Find the dendrogram of generate_dendrogram for several core thresholds
+
+    Copying or converting graph and initialising the status are done once,
+    every threshold continues from a copy of that status with its low-core
+    and soft nodes rebuilt. Without part_init the threshold plays no role,
+    so with an integer random_state one dendrogram is computed and handed to
+    every threshold. See louvain_variant.generate_dendrogram_sweep.
+
+    Parameters
+    ----------
+    graph : networkx.Graph
+        the networkx graph which will be decomposed
+    core_thresholds : iterable of float
+        the core thresholds to find a dendrogram for
+    part_init, weight, resolution, randomize, random_state, engine,
+    core_cache, profiler :
+        see generate_dendrogram
+
+    Returns
+    -------
+    dendrograms : dict
+        the dendrogram of every core threshold
+
+    Raises
+    ------
+    TypeError
+        If the graph is not a networkx.Graph
+    """
+    if graph.is_directed():
+        raise TypeError("Bad graph type, use only non directed graph")
+
+    core_thresholds = list(core_thresholds)
+    seed = resolve_randomize(randomize, random_state)
+    if not core_thresholds:
+        return dict([])
+
+    # special case, when there is no link
+    # the best partition is everyone in its community
+    if graph.number_of_edges() == 0:
+        return {core_threshold: [{node: i for i, node in enumerate(graph.nodes())}]
+                for core_threshold in core_thresholds}
+
+    profiler = NULL_PROFILER if profiler is None else profiler
+    profiler.level = 0
+    with profiler.phase("copy"):
+        current_graph, part_init = engine_graph(graph, part_init, weight, engine)
+    shared_status = Status(core_threshold=core_thresholds[0])
+    with profiler.phase("init"):
+        shared_status.init(current_graph, weight, part_init, cache=core_cache, profiler=profiler)
+    shared = part_init is None and isinstance(seed, (numbers.Integral, np.integer))
+
+    dendrograms = dict([])
+    for core_threshold in core_thresholds:
+        if shared and dendrograms:
+            dendrograms[core_threshold] = [level.copy() for level in dendrograms[core_thresholds[0]]]
+            continue
+        status = shared_status.copy()
+        status.set_core_threshold(core_threshold)
+        dendrograms[core_threshold] = __levels(graph, current_graph, status, weight, resolution,
+                                               check_random_state(seed), engine, profiler)
+    return dendrograms
+
+def __levels(graph, current_graph, status: Status, weight, resolution, random_state, engine, profiler):
+    """Build the dendrogram from a status of current_graph
+
+    status is only used for level 0, the levels above it get a status of
+    their own.
+    """
     status_list = list()
-    refined_status = __one_level(current_graph, status, weight, resolution, random_state)
-    partition = __renumber(status.node2com)
-    if refined_status is None:
-        refined_partition = None
-        current_graph = induced_graph(partition, current_graph, weight)
-    else:   
-        refined_partition = __renumber(refined_status.node2com)
-        current_graph = induced_graph(refined_partition, current_graph, weight)
-
-    status_list.append(partition)
+    profiler.level = 0
+    with profiler.phase("local_moving"):
+        refined_status = __one_level(current_graph, status, weight, resolution, random_state, profiler)
+    with profiler.phase("renumber"):
+        partition = __renumber(status.node2com)
+        refined_partition = None if refined_status is None else __renumber(refined_status.node2com)
+    previous_graph = current_graph
+    with profiler.phase("induced_graph"):
+        if refined_status is None:
+            current_graph = induced_graph(partition, current_graph, weight)
+        else:   
+            current_graph = induced_graph(refined_partition, current_graph, weight)
+
+    status_list.append(partition_by_label(partition, previous_graph))
     new_mod = __modularity(status, resolution)
-    status.init(current_graph, weight, part=refined_partition)  
+    refined_partition = __refined_part(refined_partition, previous_graph, current_graph)
+    status = Status(core_threshold=status.core_threshold)
+    profiler.level = 1
+    with profiler.phase("init"):
+        status.init(current_graph, weight, part=refined_partition, profiler=profiler)  
     mod = new_mod
 
     while True:
-        refined_status = __one_level(current_graph, status, weight, resolution, random_state)
+        with profiler.phase("local_moving"):
+            refined_status = __one_level(current_graph, status, weight, resolution, random_state, profiler)
         new_mod = __modularity(status, resolution)
         if new_mod - mod < __MIN:
             break
 
-        partition = __renumber(status.node2com)
-        if refined_status is None:
-            refined_partition = None
-            current_graph = induced_graph(partition, current_graph, weight)
-        else:   
-            refined_partition = __renumber(refined_status.node2com)
-            current_graph = induced_graph(refined_partition, current_graph, weight)
-
-        status_list.append(partition)
+        with profiler.phase("renumber"):
+            partition = __renumber(status.node2com)
+            refined_partition = None if refined_status is None else __renumber(refined_status.node2com)
+        previous_graph = current_graph
+        with profiler.phase("induced_graph"):
+            if refined_status is None:
+                current_graph = induced_graph(partition, current_graph, weight)
+            else:   
+                current_graph = induced_graph(refined_partition, current_graph, weight)
+
+        status_list.append(partition_by_label(partition, previous_graph))
+        refined_partition = __refined_part(refined_partition, previous_graph, current_graph)
         mod = new_mod
-        status.init(current_graph, weight, part=refined_partition)
+        profiler.level += 1
+        with profiler.phase("init"):
+            status.init(current_graph, weight, part=refined_partition, profiler=profiler)
 
     return status_list[:]
 
+def __refined_part(refined_partition, previous_graph, current_graph):
+    """The refined partition of the nodes of previous_graph as the starting partition of current_graph
+
+    The networkx engine looks the nodes of the induced graph up among the
+    nodes of the graph it was induced from, so on a CSRGraph the partition is
+    keyed by their labels rather than their positions, which would be taken
+    for nodes of the induced graph.
+    """
+    if refined_partition is None:
+        return None
+    return partition_by_position(partition_by_label(refined_partition, previous_graph), current_graph)
+
 def own_refinement(graph, modified_community, status, weight_key, resolution, random_state):
     modified = True
     nb_pass_done = 0
@@ -297,7 +501,7 @@ def own_refinement(graph, modified_community, status, weight_key, resolution, ra
             break
 
 ## @TODO: modify for set of soft-nodes
-def __one_level(graph: nx.Graph, status: Status, weight_key, resolution, random_state):
+def __one_level(graph: nx.Graph, status: Status, weight_key, resolution, random_state, profiler=NULL_PROFILER):
     """Compute one level of communities
     """
     modified = True
@@ -305,16 +509,14 @@ def __one_level(graph: nx.Graph, status: Status, weight_key, resolution, random_
     cur_mod = __modularity(status, resolution)
     new_mod = cur_mod
     coms_to_refine = set()
+    movable = __movable_nodes(graph, status)
 
     while modified and nb_pass_done != __PASS_MAX:
         cur_mod = new_mod
         modified = False
         nb_pass_done += 1
 
-        if status.soft_nodes_set is None:
-            iterator = __randomize(graph.nodes(), random_state)
-        else:
-            iterator = __randomize(status.soft_nodes_set, random_state)
+        iterator = __randomize(movable, random_state)
 
         for node in iterator:
             com_node = status.node2com[node]
@@ -347,16 +549,17 @@ def __one_level(graph: nx.Graph, status: Status, weight_key, resolution, random_
     ##### checking all communities with new arrivals for sub-structures
     return_status = None # if no soft nodes exist yet, i.e. first iteration, then do not assign partition to aggregated graph
     if status.soft_nodes_set is not None:
-        refined_status_phase = copy.deepcopy(status)
-        for singleton_id, node in enumerate(graph):
-            refined_status_phase.node2com[node] = singleton_id
-
-        # refine partition and only consider changed communities
-        for com in coms_to_refine:
-            com_members = [node for node, community in status.node2com.items() if community == com]
-            own_refinement(graph, com_members, refined_status_phase, weight_key, resolution, random_state)
-            for node in com_members:
-                status.node2com[node] = refined_status_phase.node2com[node]
+        with profiler.phase("refinement"):
+            refined_status_phase = status.singletons(graph)
+
+            # refine partition and only consider changed communities, visiting
+            # their members in node order
+            position = {node: i for i, node in enumerate(status.node2com)}
+            for com in coms_to_refine:
+                com_members = sorted(status.com_members.get(com, ()), key=position.__getitem__)
+                own_refinement(graph, com_members, refined_status_phase, weight_key, resolution, random_state)
+                for node in com_members:
+                    status.relabel(node, refined_status_phase.node2com[node])
         return_status = refined_status_phase
 
     return return_status
\ No newline at end of file
@@ -0,0 +1,137 @@
+import os
+import time
+import tracemalloc
+
+from collections import Counter
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class _Phase(object):
+    """Context manager that adds the time spent inside it to a phase of a PhaseProfiler"""
+    __slots__ = ("profiler", "name", "level", "start")
+
+    def __init__(self, profiler, name, level):
+        self.profiler = profiler
+        self.name = name
+        self.level = level
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.add(self.name, self.level, time.perf_counter_ns() - self.start)
+        return False
+
+
+class PhaseProfiler(object):
+    """
+    Wall-clock time of the phases of best_partition, per dendrogram level
+
+    Timings are taken with time.perf_counter_ns and summed per phase and
+    level, in nanoseconds, until they are popped. The phases are 'copy'
+    (copying or converting the graph), 'init' (Status.init, which contains
+    'core_centrality', the neighbourhood statistics of every node),
+    'local_moving' (which contains the 'refinement' of Leiden-Addition),
+    'renumber' and 'induced_graph'. The dendrogram level being built is set
+    in level.
+    """
+    enabled = True
+
+    def __init__(self):
+        self.timings = dict([])
+        self.level = 0
+
+    def phase(self, name):
+        """Context manager timing one phase at the current dendrogram level"""
+        return _Phase(self, name, self.level)
+
+    def add(self, name, level, elapsed_ns):
+        levels = self.timings.setdefault(name, dict([]))
+        levels[level] = levels.get(level, 0) + elapsed_ns
+
+    def pop(self):
+        """The timings as {phase: {level: nanoseconds}}, after which they start again from zero"""
+        timings = self.timings
+        self.timings = dict([])
+        return timings
+
+
+class MemoryProfiler(PhaseProfiler):
+    """
+    PhaseProfiler that also samples the Python allocations traced by
+    tracemalloc at the end of every phase
+
+    A snapshot is kept of the largest sample since the last pop_allocators.
+    When popped, its allocations are attributed to the innermost line of this
+    package on their traceback (the Status dicts, the dendrogram levels, the
+    induced graphs) and the `top` largest lines are returned, with the phase
+    and level of that sample. tracemalloc has to be tracing, with enough
+    frames to reach past networkx and NumPy.
+    """
+    def __init__(self, top=5):
+        super(MemoryProfiler, self).__init__()
+        self.top = top
+        self.largest = 0
+        self.snapshot = None
+        self.peak_phase = None
+
+    def add(self, name, level, elapsed_ns):
+        super(MemoryProfiler, self).add(name, level, elapsed_ns)
+        if not tracemalloc.is_tracing():
+            return
+        current, _ = tracemalloc.get_traced_memory()
+        if current > self.largest:
+            self.snapshot = None # before taking the next one, it holds memory of its own
+            self.snapshot = tracemalloc.take_snapshot()
+            self.largest, _ = tracemalloc.get_traced_memory()
+            self.peak_phase = "{}@{}".format(name, level)
+
+    def pop_allocators(self):
+        """
+        The top allocators as [[file:line, bytes], ...] and the phase of the
+        largest sample, after which sampling starts again
+        """
+        sizes = Counter()
+        if self.snapshot is not None:
+            for statistic in self.snapshot.statistics("traceback"):
+                for frame in reversed(statistic.traceback): # most recent call first
+                    if frame.filename.startswith(PACKAGE_DIR):
+                        sizes["{}:{}".format(os.path.basename(frame.filename), frame.lineno)] += statistic.size
+                        break
+        allocators = {"top": [[location, size] for location, size in sizes.most_common(self.top)],
+                      "peak_phase": self.peak_phase}
+        self.largest = 0
+        self.snapshot = None
+        self.peak_phase = None
+        return allocators
+
+
+class _NullPhase(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class NullProfiler(object):
+    """Stand-in for PhaseProfiler when profiling is off, every phase is the same no-op"""
+    enabled = False
+    level = 0
+    _phase = _NullPhase()
+
+    def phase(self, name):
+        return self._phase
+
+    def add(self, name, level, elapsed_ns):
+        pass
+
+    def pop(self):
+        return dict([])
+
+
+NULL_PROFILER = NullProfiler()
@@ -10,6 +10,9 @@
 import numbers
 import networkx as nx
 import numpy as np
+import warnings
+
+from .csr_graph import CSRGraph, _sum_edge_pairs
 
 __PASS_MAX = -1
 __MIN = 0.0000001
@@ -19,6 +22,9 @@ def __neighcom(node, graph, status, weight_key):
     Compute the communities in the neighborhood of node in the graph given
     with the decomposition node2com
     """
+    if isinstance(graph, CSRGraph):
+        return graph.neighcom(node, status.node2com)
+
     weights = {}
     for neighbor, datas in graph[node].items():
         if neighbor != node:
@@ -30,26 +36,69 @@ def __neighcom(node, graph, status, weight_key):
 
 def __remove(node, com, weight, status):
     """ Remove node from community com and modify status"""
-    status.degrees[com] = (status.degrees.get(com, 0.)
+    if status.journal is not None:
+        status._record(node, com)
+    degree = status.degrees.get(com, 0.)
+    internal = status.internals.get(com, 0.)
+    status.degrees[com] = (degree
                            - status.gdegrees.get(node, 0.))
-    status.internals[com] = float(status.internals.get(com, 0.) -
+    status.internals[com] = float(internal -
                                   weight - status.loops.get(node, 0.))
     status.node2com[node] = -1
 
+    # keep the members and the running modularity sums over the non-empty communities
+    members = status.com_members[com]
+    members.discard(node)
+    status.modularity_internals -= internal
+    status.modularity_degrees -= degree ** 2
+    if members:
+        status.modularity_internals += status.internals[com]
+        status.modularity_degrees += status.degrees[com] ** 2
+
 
 def __insert(node, com, weight, status):
     """ Insert node into community and modify status"""
+    if status.journal is not None:
+        status._record(node, com)
+    degree = status.degrees.get(com, 0.)
+    internal = status.internals.get(com, 0.)
     status.node2com[node] = com
-    status.degrees[com] = (status.degrees.get(com, 0.) +
+    status.degrees[com] = (degree +
                            status.gdegrees.get(node, 0.))
-    status.internals[com] = float(status.internals.get(com, 0.) +
+    status.internals[com] = float(internal +
                                   weight + status.loops.get(node, 0.))
 
+    members = status.com_members.setdefault(com, set())
+    if members:
+        status.modularity_internals -= internal
+        status.modularity_degrees -= degree ** 2
+    members.add(node)
+    status.modularity_internals += status.internals[com]
+    status.modularity_degrees += status.degrees[com] ** 2
+
 
 def __modularity(status, resolution):
     """
     Fast compute the modularity of the partition of the graph using
-    status precomputed
+    the running sums kept in status, in O(1)
+    """
+    links = float(status.total_weight)
+    result = 0.
+    if links > 0:
+        result = status.modularity_internals * resolution / links - \
+            status.modularity_degrees / (4. * links * links)
+    if status.debug:
+        full_result = __full_modularity(status, resolution)
+        if abs(result - full_result) > 1e-9:
+            error = "Running modularity ({}) differs from the recomputed one ({})".format(result, full_result)
+            raise ValueError(error)
+    return result
+
+
+def __full_modularity(status, resolution):
+    """
+    Compute the modularity of the partition of the graph using
+    status precomputed, visiting every community
     """
     links = float(status.total_weight)
     result = 0.
@@ -67,6 +116,16 @@ def __randomize(items, random_state):
     random_state.shuffle(randomized_items)
     return randomized_items
 
+def __movable_nodes(graph, status):
+    """The nodes local moving visits: all nodes of graph, or its soft nodes in
+    the order of graph, as the order of a set of labels such as strings
+    changes with their hashes, which would keep a random_state from fixing
+    the result
+    """
+    if status.soft_nodes_set is None:
+        return graph.nodes()
+    return [node for node in graph.nodes() if node in status.soft_nodes_set]
+
 def __renumber(dictionary):
     """Renumber the values of the dictionary from 0 to n
     """
@@ -87,18 +146,115 @@ def __renumber(dictionary):
 
     return ret
 
+def snapshot_delta(prev_graph, graph, weight="weight"):
+    """Compute the changes between two snapshots of a temporal graph
+
+    Parameters
+    ----------
+    prev_graph : networkx.Graph
+        the previous snapshot
+    graph : networkx.Graph
+        the current snapshot
+    weight : str, optional
+        the key in graph to use as weight. Default to 'weight'
+
+    Returns
+    -------
+    added_edges : list of (node, node, weight)
+        edges of graph which are not in prev_graph
+    removed_edges : list of (node, node, weight)
+        edges of prev_graph which are not in graph
+    removed_nodes : list
+        nodes of prev_graph which are not in graph
+
+    An edge whose weight changed is both removed and added again.
+    """
+    def missing_edges(graph_from, graph_to):
+        edges = []
+        done = set()
+        for node, neighbours in graph_from.adjacency():
+            other = graph_to._adj.get(node)
+            if other is None or neighbours != other:
+                for neighbor, datas in neighbours.items():
+                    if neighbor in done:
+                        continue
+                    if other is None or other.get(neighbor) != datas:
+                        edges.append((node, neighbor, datas.get(weight, 1)))
+            done.add(node)
+        return edges
+
+    removed_nodes = [node for node in prev_graph if node not in graph]
+    return missing_edges(graph, prev_graph), missing_edges(prev_graph, graph), removed_nodes
+
+def engine_graph(graph, part_init=None, weight="weight", engine="networkx"):
+    """Copy the graph into the representation the given engine works on
+
+    Parameters
+    ----------
+    graph : networkx.Graph
+        the graph which will be decomposed
+    part_init : dict, optional
+        starting partition of the nodes of graph
+    weight : str, optional
+        the key in graph to use as weight. Default to 'weight'
+    engine : str, optional
+        'networkx' works on a copy of graph, 'csr' converts it once into a
+        CSRGraph whose nodes are the positions of the nodes in graph
+
+    Returns
+    -------
+    current_graph : networkx.Graph or CSRGraph
+        the graph to run the local moving on
+    part_init : dict or None
+        the starting partition keyed by the nodes of current_graph
+
+    Raises
+    ------
+    ValueError
+        If the engine is unknown
+    """
+    if engine == "networkx":
+        return graph.copy(), part_init
+    if engine == "csr":
+        csr_graph = CSRGraph.from_networkx(graph, weight)
+        return csr_graph, partition_by_position(part_init, csr_graph)
+    raise ValueError("Unknown engine ({}), use 'networkx' or 'csr'".format(engine))
+
+def partition_by_position(partition, graph):
+    """Key a partition of the labels of a CSRGraph by the positions of its nodes
+
+    The nodes that are not in graph are kept under negative keys, which
+    Status.init skips, since their communities still count towards the ids
+    it gives to new arrivals. A partition of a networkx graph is returned as
+    it is.
+    """
+    if partition is None or not isinstance(graph, CSRGraph):
+        return partition
+    index = {node: i for i, node in enumerate(graph.labels)}
+    return {index.get(node, -1 - i): com for i, (node, com) in enumerate(partition.items())}
+
+def partition_by_label(partition, graph):
+    """Key a partition of the positions of the nodes of a CSRGraph by their
+    labels, a partition of a networkx graph is returned as it is
+    """
+    if not isinstance(graph, CSRGraph):
+        return partition
+    labels = graph.labels
+    return {labels[node]: com for node, com in partition.items()}
+
 def induced_graph(partition, graph, weight="weight"):
     """Produce the graph where nodes are the communities
 
     there is a link of weight w between communities if the sum of the weights
-    of the links between their elements is w
+    of the links between their elements is w. The edges are aggregated in bulk
+    and inserted in the order in which each community pair first occurs.
 
     Parameters
     ----------
     partition : dict
        a dictionary where keys are graph nodes and  values the part the node
        belongs to
-    graph : networkx.Graph
+    graph : networkx.Graph or CSRGraph
         the initial graph
     weight : str, optional
         the key in graph to use as weight. Default to 'weight'
@@ -106,8 +262,8 @@ def induced_graph(partition, graph, weight="weight"):
 
     Returns
     -------
-    g : networkx.Graph
-       a networkx graph where nodes are the parts
+    g : networkx.Graph or CSRGraph
+       a graph of the same kind where nodes are the parts
 
     Examples
     --------
@@ -122,16 +278,27 @@ def induced_graph(partition, graph, weight="weight"):
     >>> nx.is_isomorphic(ind, goal)
     True
     """
+    if isinstance(graph, CSRGraph):
+        return graph.aggregate(partition)
+
     ret = nx.Graph()
     ret.add_nodes_from(partition.values())
 
-    for node1, node2, datas in graph.edges(data=True):
-        edge_weight = datas.get(weight, 1)
-        com1 = partition[node1]
-        com2 = partition[node2]
-        w_prec = ret.get_edge_data(com1, com2, {weight: 0}).get(weight, 1)
-        ret.add_edge(com1, com2, **{weight: w_prec + edge_weight})
-
+    edges = list(graph.edges(data=weight, default=1))
+    if not edges:
+        return ret
+
+    # map the endpoints to community positions and sum every community pair at once
+    communities = list(ret.nodes())
+    index = {com: i for i, com in enumerate(communities)}
+    node1, node2, edge_weights = zip(*edges)
+    com1 = np.fromiter((index[partition[node]] for node in node1), dtype=np.int64, count=len(edges))
+    com2 = np.fromiter((index[partition[node]] for node in node2), dtype=np.int64, count=len(edges))
+    com1, com2, edge_weights = _sum_edge_pairs(com1, com2, edge_weights)
+
+    ret.add_weighted_edges_from(zip([communities[i] for i in com1.tolist()],
+                                    [communities[i] for i in com2.tolist()],
+                                    edge_weights.tolist()), weight=weight)
     return ret
 
 def modularity(partition, graph, weight='weight'):
@@ -266,3 +433,29 @@ def check_random_state(seed):
         return seed
     raise ValueError("%r cannot be used to seed a numpy.random.RandomState"
                      " instance" % seed)
+
+def resolve_randomize(randomize, random_state):
+    """Fold the deprecated `randomize` parameter into random_state
+
+    Returns the seed to give to check_random_state.
+
+    Raises
+    ------
+    ValueError
+        If both `randomize` and `random_state` are used
+    """
+    # Properly handle random state, eventually remove old `randomize` parameter
+    # NOTE: when `randomize` is removed, delete this function
+    if randomize is not None:
+        warnings.warn("The `randomize` parameter will be deprecated in future "
+                      "versions. Use `random_state` instead.", DeprecationWarning)
+        # If shouldn't randomize, we set a fixed seed to get determinisitc results
+        if randomize is False:
+            random_state = 0
+
+    # We don't know what to do if both `randomize` and `random_state` are defined
+    if randomize and random_state is not None:
+        raise ValueError("`randomize` and `random_state` cannot be used at the "
+                         "same time")
+
+    return random_state
@@ -1,88 +1,212 @@
 import numpy as np
 import os
-import pickle
 
 from argparse import ArgumentParser, BooleanOptionalAction
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from evaluation.load_graphs import load_dyn_data
 from evaluation.temporal_wrapper import TemporalLouvainIterator
-from evaluation.utils import compute_nmi, compute_modularity
-from evaluation.utils import METHOD_MAPPING_ORIGINAL, METHOD_MAPPING_VARIANT
-from evaluation.utils import return_def_list
+from evaluation.metrics import compute_metrics
+from evaluation.results_store import ResultsStore, load_unit, save_unit, unit_file
+from evaluation.utils import METHOD_MAPPING_ORIGINAL, METHOD_MAPPING_SWEEP, METHOD_MAPPING_VARIANT
 from evaluation.visualization import plot_all
+from louvain_variant.community_status import CoreCentralityCache
 from tqdm import tqdm
 
 np.random.seed(42)
 SEEDS = [35161, 58086, 39824, 41633, 45775, 16416, 27860, 57299, 34548, 29213]
 RESULTS_PATH = "evaluation/results"
+_TEMPORAL_GRAPH = None # the snapshots of the process, every worker builds its own from the memory-mapped cache
 CC_THRESHOLDS = np.linspace(0,1,5).round(1)
 
-def eval_timesteps(temporal_graph: list, core_threshold: float=0.8, limit_steps: int=None, evaluate_cc: bool=True, random_state: int=42) -> dict:
+def eval_method(temporal_graph: list, name: str, method: callable, core_threshold: float, limit_steps: int, random_state: int, engine: str, profile: bool=False, memory: bool=False) -> dict:
     """
-    Perform evaluation (and measure Time (s), Modularity, and NMI) on all specified subset of methods with the given parameters
+    Run one method over the temporal graph and measure Time (s), Modularity, and NMI
+    With profile the variants also record the time of their phases per dendrogram level ("phases", see PhaseProfiler)
+    With memory every time step also records its peak RSS and traced peak in bytes, and for the variants their top allocators
+    ("memory", see MemoryTracker and MemoryProfiler). Tracking slows the methods down, so their times are not comparable then
     """
-    results_dict = {}
-    paras = {
+    parameters = {
         "random_state":random_state, 
         "core_threshold": core_threshold,
-        "prev_partition": True
+        "prev_partition": True,
+        "engine": engine,
+        "memory": memory
     }
-    
-    iterator_methods = tqdm(METHOD_MAPPING_VARIANT.items() if evaluate_cc else METHOD_MAPPING_ORIGINAL.items(), desc="")
-    for name, method in iterator_methods:
-        iterator_methods.set_description(name)
-        parameters = paras.copy()
-        if "variant" not in name.lower():
-            parameters.pop("core_threshold")
-        if "temporal" not in name.lower() and "variant" not in name.lower():
-            parameters.pop("prev_partition")
-
-        iterator = TemporalLouvainIterator(method, limit_steps=limit_steps, **parameters)
-        partitions, time_list = iterator.process_temporal_graph(temporal_graph, measure_time=True)
-        results_dict[name] = {
-            "partitions": partitions, 
-            "time": time_list,
-            "nmi": compute_nmi(temporal_graph, partitions),
-            "modularity": compute_modularity(temporal_graph, partitions)
-        }
+    if "variant" not in name.lower():
+        parameters.pop("core_threshold")
+        parameters.pop("engine")
+    else:
+        if engine == "networkx":
+            parameters["core_cache"] = CoreCentralityCache() # reused across the snapshots of this run only
+        parameters["profile"] = profile
+    if "temporal" not in name.lower() and "variant" not in name.lower():
+        parameters.pop("prev_partition")
 
-    return results_dict
+    iterator = TemporalLouvainIterator(method, limit_steps=limit_steps, **parameters)
+    partitions, time_list = iterator.process_temporal_graph(temporal_graph, measure_time=True)
+    nmi_scores, modularity_scores = compute_metrics(temporal_graph, partitions) # one more pass over lazily loaded snapshots
+    result = {
+        "partitions": partitions, 
+        "time": time_list,
+        "nmi": nmi_scores,
+        "modularity": modularity_scores
+    }
+    if iterator.phase_timings:
+        result["phases"] = iterator.phase_timings
+    if iterator.memory_usage:
+        result["memory"] = iterator.memory_usage
+    return result
 
-def run_eval(data_path: str, NUM_TIMESTEPS: int=None) -> dict:
+def eval_sweep(temporal_graph: list, name: str, method: callable, core_thresholds: list, limit_steps: int, random_state: int, engine: str, profile: bool=False, memory: bool=False) -> list:
     """
-    Perform evaluation on all methods on the given temporal/dynamic graph
+    Run the sweep method of a variant over the temporal graph for all core thresholds in one pass and measure Time (s), Modularity,
+    and NMI of every threshold. The partitions equal those of eval_method per threshold, the time of a snapshot is split over the
+    thresholds computed together
     """
-    temporal_graph = load_dyn_data(data_path)
-    
-    results_total = {
-        cc_th.item(): defaultdict(return_def_list) for cc_th in np.linspace(0,1,5).round(1)
+    parameters = {
+        "random_state": random_state,
+        "prev_partition": True,
+        "engine": engine,
+        "profile": profile,
+        "memory": memory
     }
-    results_total["original"] = defaultdict(return_def_list)
+    if engine == "networkx":
+        parameters["core_cache"] = CoreCentralityCache() # only a marker, every threshold gets its own
+    iterator = TemporalLouvainIterator(method, limit_steps=limit_steps, **parameters)
+    sweep = iterator.process_temporal_graph_sweep(temporal_graph, core_thresholds)
+    results = []
+    for core_threshold in core_thresholds:
+        partitions, time_list, phase_timings, memory_usage = sweep[core_threshold]
+        nmi_scores, modularity_scores = compute_metrics(temporal_graph, partitions)
+        results += [{
+            "partitions": partitions,
+            "time": time_list,
+            "nmi": nmi_scores,
+            "modularity": modularity_scores
+        }]
+        if phase_timings:
+            results[-1]["phases"] = phase_timings
+        if memory_usage:
+            results[-1]["memory"] = memory_usage
+    return results
 
-    for random_state in SEEDS:
-        results = eval_timesteps(temporal_graph[:], core_threshold=None, limit_steps=NUM_TIMESTEPS, evaluate_cc=False, random_state=random_state)
-        for method_name, method_result in results.items():
-            for result_type, result_value in method_result.items():
-                results_total["original"][method_name][result_type] += [result_value]
+def _unit_file(units_path: str, job: tuple, sweep: bool=False, profile: bool=False, memory: bool=False) -> str:
+    """
+    File the result of one (seed, threshold, method) job is stored in, see evaluation.results_store.unit_file
+    """
+    random_state, core_threshold, name, _, engine = job
+    return unit_file(units_path, name, core_threshold, random_state, engine, sweep, profile, memory)
+
+def _eval_jobs(jobs: list, units_path: str, sweep: bool=False, profile: bool=False, memory: bool=False) -> list:
+    """
+    Evaluate (seed, threshold, method) jobs of run_eval that only differ in threshold, the threshold is None for the original methods
+    More than one job is run as a threshold sweep. The results are stored as soon as they are done, so that an interrupted run can be resumed
+    """
+    random_state, core_threshold, name, limit_steps, engine = jobs[0]
+    if len(jobs) > 1:
+        core_thresholds = [job[1] for job in jobs]
+        results = eval_sweep(_TEMPORAL_GRAPH[:], name, METHOD_MAPPING_SWEEP[name], core_thresholds, limit_steps, random_state, engine, profile, memory)
+    else:
+        method = METHOD_MAPPING_ORIGINAL[name] if core_threshold is None else METHOD_MAPPING_VARIANT[name]
+        results = [eval_method(_TEMPORAL_GRAPH[:], name, method, core_threshold, limit_steps, random_state, engine, profile, memory)]
+    for job, result in zip(jobs, results):
+        save_unit(_unit_file(units_path, job, sweep, profile, memory), result)
+    return results
+
+def _load_worker(data_path: str, lazy: bool, delta: bool):
+    """
+    Load the snapshots in a worker process. They are built from the memory-mapped .cache arrays (or delta files) of the
+    dataset, which the workers share through the page cache, so no worker holds graphs of another process
+    """
+    global _TEMPORAL_GRAPH
+    _TEMPORAL_GRAPH = load_dyn_data(data_path, lazy=lazy, delta=delta)
+
+def run_eval(data_path: str, NUM_TIMESTEPS: int=None, engine: str="networkx", workers: int=1, lazy: bool=False, delta: bool=False, resume: bool=False, sweep: bool=False, profile: bool=False, memory: bool=False) -> dict:
+    """
+    Perform evaluation on all methods on the given temporal/dynamic graph
 
+    With more than one worker the (seed, threshold, method) runs are spread over processes that each build the snapshots
+    from the memory-mapped cache of the dataset, and their results are collected in the same order as the serial run,
+    so only the measured times differ.
+    With lazy the snapshots are built while they are used instead of all being loaded up front, with delta they are
+    replayed from the delta files of the dataset (see evaluation.delta_format).
+    Every (seed, threshold, method) unit is stored as soon as it finishes; with resume the units that are already
+    stored are read back instead of run again. With sweep all thresholds of a variant and seed are run together, see eval_sweep.
+    With profile the variants record the time of their phases, see ResultsStore.phase_summary, with memory all methods record
+    their memory use per time step, see eval_method
+    """
+    global _TEMPORAL_GRAPH
+    units_path = os.path.join(results_path(data_path, NUM_TIMESTEPS), "units")
+    os.makedirs(units_path, exist_ok=True)
+    jobs = []
+    for random_state in SEEDS:
+        jobs += [(random_state, None, name, NUM_TIMESTEPS, "networkx") for name in METHOD_MAPPING_ORIGINAL]
         for cc in CC_THRESHOLDS:
-            results = eval_timesteps(temporal_graph[:], core_threshold=cc, limit_steps=NUM_TIMESTEPS, evaluate_cc=True, random_state=random_state)
-            for method_name, method_result in results.items():
-                for result_type, result_value in method_result.items():
-                    results_total[cc][method_name][result_type] += [result_value]
-
-    for cc_th, results in results_total.items():
-        for method_name, all_results in results.items():
-            for result_type, result_value in all_results.items():
-                if result_type == "partitions":
-                    continue
-                results_total[cc_th][method_name][result_type] = (np.mean(result_value,axis=0), np.std(result_value, axis=0))
-                
-    file_name = f"results_{data_path.split("/")[-1]}_T{NUM_TIMESTEPS}.pickle" if NUM_TIMESTEPS is not None \
-                else f"results_{data_path.split("/")[-1]}.pickle"
-    pickle.dump(results_total, open(os.path.join(RESULTS_PATH,file_name), "wb"))
-
-    return results_total
+            jobs += [(random_state, cc, name, NUM_TIMESTEPS, engine) for name in METHOD_MAPPING_VARIANT]
+    outcomes = {job: load_unit(_unit_file(units_path, job, sweep, profile, memory)) for job in jobs
+                if resume and os.path.exists(_unit_file(units_path, job, sweep, profile, memory))}
+    batches = {}
+    for job in jobs:
+        if job not in outcomes:
+            # a sweep covers the thresholds of one variant and seed
+            batches.setdefault((job[0], job[2]) if sweep and job[1] is not None else job, []).append(job)
+    batches = list(batches.values())
+
+    if batches:
+        try:
+            if workers > 1:
+                if not delta:
+                    # parse the dataset into its cache once, the workers map the cached arrays and build the graphs themselves
+                    load_dyn_data(data_path, lazy=True)
+                with ProcessPoolExecutor(max_workers=workers, initializer=_load_worker, initargs=(data_path, lazy, delta)) as pool:
+                    results = tqdm(pool.map(_eval_jobs, batches, [units_path] * len(batches), [sweep] * len(batches), [profile] * len(batches), [memory] * len(batches)), total=len(batches))
+                    for batch, batch_results in zip(batches, results):
+                        outcomes.update(zip(batch, batch_results))
+            else:
+                _TEMPORAL_GRAPH = load_dyn_data(data_path, lazy=lazy, delta=delta)
+                for batch in tqdm(batches):
+                    outcomes.update(zip(batch, _eval_jobs(batch, units_path, sweep, profile, memory)))
+        finally:
+            _TEMPORAL_GRAPH = None
+
+    # (method, threshold, seed, result) in the order of the serial loops
+    runs = [(job[2], job[1], job[0], outcomes[job]) for job in jobs]
+    store = ResultsStore.write(results_path(data_path, NUM_TIMESTEPS), data_path.split("/")[-1], runs)
+
+    return store.summary()
+
+def print_phases(phase_summary: dict):
+    """
+    Print the mean time per time step of every phase of the profiled variants, see ResultsStore.phase_summary
+    """
+    for threshold, methods in phase_summary.items():
+        for method, phases in methods.items():
+            print(f"{method} (core threshold {threshold})")
+            for phase, mean in sorted(phases.items(), key=lambda item: -item[1]):
+                print(f"    {phase:<16}{mean * 1000:10.2f} ms")
+
+def print_allocators(store: ResultsStore):
+    """
+    Print the largest peak of the traced memory of every variant and threshold, with the top allocators at that peak
+    """
+    keys = store.metrics(["method", "threshold"])
+    traced_peak = np.asarray(store.column("traced_peak"))
+    for method, threshold in dict.fromkeys(zip(np.asarray(keys["method"]).tolist(), np.asarray(keys["threshold"]).tolist())):
+        rows = store.rows(method, None if np.isnan(threshold) else threshold)
+        row = rows[np.nanargmax(traced_peak[rows])]
+        allocators = store.allocators(row)
+        if allocators is None:
+            continue
+        print(f"{method} (core threshold {threshold}): {traced_peak[row] / 2**20:.1f} MB traced at {allocators['peak_phase']}")
+        for location, size in allocators["top"]:
+            print(f"    {location:<40}{size / 2**20:10.2f} MB")
+
+def results_path(data_path: str, NUM_TIMESTEPS: int=None) -> str:
+    """
+    Folder of the ResultsStore of an experiment
+    """
+    dataset = data_path.split("/")[-1]
+    return os.path.join(RESULTS_PATH, f"results_{dataset}_T{NUM_TIMESTEPS}" if NUM_TIMESTEPS is not None else f"results_{dataset}")
 
 if __name__ == "__main__":
     arg_parser = ArgumentParser()
@@ -90,20 +214,39 @@ if __name__ == "__main__":
     arg_parser.add_argument("--load_results", action=BooleanOptionalAction)
     arg_parser.add_argument("--num_t", type=int, default=None) # evaluate on all available time steps if None
     arg_parser.add_argument("--num_seeds", type=int, default=len(SEEDS)) # how many rounds of evaluation to do
+    arg_parser.add_argument("--engine", type=str, default="networkx", choices=["networkx", "csr"]) # graph engine of the variants
+    arg_parser.add_argument("--workers", type=int, default=1) # number of processes to run the experiments in
+    arg_parser.add_argument("--lazy", action=BooleanOptionalAction) # stream the snapshots instead of loading them all
+    arg_parser.add_argument("--delta", action=BooleanOptionalAction) # replay the snapshots from the delta files
+    arg_parser.add_argument("--resume", action=BooleanOptionalAction) # only run the units that are not stored yet
+    arg_parser.add_argument("--sweep", action=BooleanOptionalAction) # run all thresholds of a variant in one pass
+    arg_parser.add_argument("--profile", action=BooleanOptionalAction) # time the phases of the variants
+    arg_parser.add_argument("--memory", action=BooleanOptionalAction) # track the memory use of every time step
 
     args = arg_parser.parse_args()
     load_results = args.load_results
     data_path = args.data_path
     NUM_TIMESTEPS = args.num_t
     num_seeds = args.num_seeds
+    engine = args.engine
+    workers = args.workers
+    lazy = bool(args.lazy)
+    delta = bool(args.delta)
+    resume = bool(args.resume)
+    sweep = bool(args.sweep)
+    profile = bool(args.profile)
+    memory = bool(args.memory)
     SEEDS = SEEDS[:num_seeds]
 
     if not load_results:
-        results_total = run_eval(data_path, NUM_TIMESTEPS=NUM_TIMESTEPS)
+        results_total = run_eval(data_path, NUM_TIMESTEPS=NUM_TIMESTEPS, engine=engine, workers=workers, lazy=lazy, delta=delta, resume=resume, sweep=sweep, profile=profile, memory=memory)
 
-    file_name = f"results_{data_path.split("/")[-1]}_T{NUM_TIMESTEPS}.pickle" if NUM_TIMESTEPS is not None \
-                else f"results_{data_path.split("/")[-1]}.pickle"
-    results_total = pickle.load(open(os.path.join(RESULTS_PATH,file_name), "rb"))
+    store = ResultsStore(results_path(data_path, NUM_TIMESTEPS))
+    results_total = store.summary()
+    if profile:
+        print_phases(store.phase_summary())
+    if memory:
+        print_allocators(store)
 
     fig_name = data_path.split("/")[-1] # use the name of the folder (i.e., specific dataset) as the name of the plot
     plot_all(results_total, os.path.join(RESULTS_PATH,fig_name + (f"_T{NUM_TIMESTEPS}" if NUM_TIMESTEPS is not None else "")))
@@ -1,4 +1,5 @@
-# this script will ALWAYS load all of the results OR will compute them from scratch
+# this script will ALWAYS load all of the results OR will compute them, from scratch or, with --resume, only the
+# (seed, threshold, method) units that are not stored yet
 
 path="dyn_graph"
 datasets=(
@@ -6,10 +7,12 @@ datasets=(
     "100_5000_20_02_02" "100_5000_20_02_05"
 )
 load_results=false
+resume=""
 
 while [[ "$#" -gt 0 ]]; do
     case $1 in
         --load_results) load_results=true ;;
+        --resume) resume="--resume" ;;
     esac
     shift
 done
@@ -19,6 +22,6 @@ for data in ${datasets[@]}; do
     if [ $load_results = true ]; then
         python run_eval.py --data_path $path/$data --load_results
     else
-        python run_eval.py --data_path $path/$data
+        python run_eval.py --data_path $path/$data $resume
     fi
 done
\ No newline at end of file
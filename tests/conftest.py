@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from evaluation.load_graphs import load_dyn_data
+
+SMALL_DATASET = os.path.join(ROOT, "dyn_graph", "5_250_10_20_02_01")
+
+@pytest.fixture(scope="session")
+def snapshots():
+    """The snapshots of the smallest bundled dataset, parsed without writing a cache next to it"""
+    return load_dyn_data(SMALL_DATASET, cache=False)
@@ -0,0 +1,154 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from benchmarks.incremental import churn_snapshots
+from louvain_variant import louvain_variant, louvain_variant_leiden_addition
+from louvain_variant.community_status import CoreCentralityCache, Status
+from louvain_variant import utils
+from louvain_variant.utils import check_random_state, engine_graph
+
+def _soft_frontier_per_node(graph, part):
+    """The soft nodes of the new arrivals as Status.init found them, one new node and neighbour at a time"""
+    soft_nodes = set()
+    for node in graph.nodes():
+        if node not in part:
+            for neighbour in graph.neighbors(node):
+                soft_nodes |= set(graph.neighbors(neighbour))
+            soft_nodes |= set([node])
+    return soft_nodes
+
+def _arrivals(seed, num_nodes=300):
+    """A random graph and a partition of the nodes of an earlier snapshot, so that some nodes are new arrivals"""
+    rng = np.random.default_rng(seed)
+    graph = nx.gnm_random_graph(num_nodes, 4 * num_nodes, seed=seed)
+    graph.add_edges_from((node, node) for node in rng.choice(num_nodes, 10).tolist())
+    graph.add_nodes_from(range(num_nodes, num_nodes + 3)) # isolated new arrivals
+    part = {node: int(rng.integers(20)) for node in range(num_nodes) if rng.random() > 0.03}
+    return graph, part
+
+@pytest.mark.parametrize("seed", range(5))
+def test_soft_frontier_matches_per_node(seed):
+    graph, part = _arrivals(seed)
+    status = Status()
+    status.init(graph, "weight", dict(part))
+    assert status.soft_frontier == _soft_frontier_per_node(graph, part)
+
+    csr_graph, csr_part = engine_graph(graph, part, engine="csr")
+    status = Status()
+    status.init(csr_graph, "weight", csr_part)
+    assert {csr_graph.labels[node] for node in np.flatnonzero(status.soft_frontier)} == \
+           _soft_frontier_per_node(graph, part)
+
+def test_soft_frontier_of_snapshots(snapshots):
+    partition = louvain_variant.best_partition(snapshots[0], random_state=42)
+    for graph in snapshots[1:]:
+        status = Status()
+        status.init(graph, "weight", dict(partition))
+        assert status.soft_frontier == _soft_frontier_per_node(graph, partition)
+        partition = louvain_variant.best_partition(graph, partition, random_state=42)
+
+def _stats_per_node(graph, node, part):
+    """Core centrality, external degree, internal weight and degree of node, one neighbour at a time"""
+    com = part[node]
+    external_degree = 0
+    inc = 0.
+    deg = 0.
+    for neighbor, datas in graph[node].items():
+        edge_weight = datas.get("weight", 1)
+        deg += edge_weight * (2 if neighbor == node else 1)
+        if part[neighbor] == com:
+            inc += edge_weight if neighbor == node else edge_weight / 2.
+        else:
+            external_degree += 1
+    return 1 - external_degree / len(graph[node]) if len(graph[node]) else 1., external_degree, inc, deg
+
+@pytest.mark.parametrize("seed", range(5))
+def test_neighbourhood_stats_match_per_node(seed):
+    graph, part = _arrivals(seed)
+    for node1, node2 in list(graph.edges())[::7]:
+        graph[node1][node2]["weight"] = 2.5
+    status = Status()
+    status.init(graph, "weight", part)
+    part = status.node2com # the new arrivals included
+
+    internals = {}
+    for node in graph:
+        core_centrality, external_degree, inc, deg = _stats_per_node(graph, node, part)
+        assert status.core_centrality[node] == pytest.approx(core_centrality)
+        assert status.external_degrees[node] == external_degree
+        assert status.gdegrees[node] == pytest.approx(deg)
+        internals[part[node]] = internals.get(part[node], 0.) + inc
+    assert {com: status.internals[com] for com in internals} == pytest.approx(internals)
+
+def test_core_cache_matches_init(snapshots):
+    cache = CoreCentralityCache()
+    partition = louvain_variant.best_partition(snapshots[0], random_state=42)
+    for graph in snapshots[1:]:
+        cached = Status()
+        cached.init(graph, "weight", dict(partition), cache=cache)
+        expected = Status()
+        expected.init(graph, "weight", dict(partition))
+        assert cached.core_centrality == expected.core_centrality
+        assert cached.external_degrees == expected.external_degrees
+        assert cached.gdegrees == expected.gdegrees
+        assert cached.internals == pytest.approx(expected.internals)
+        partition = louvain_variant.best_partition(graph, partition, random_state=42)
+
+def test_core_cache_rejected_on_csr(snapshots):
+    partition = louvain_variant.best_partition(snapshots[0], random_state=42)
+    with pytest.raises(ValueError):
+        louvain_variant.best_partition(snapshots[1], partition, engine="csr", core_cache=CoreCentralityCache())
+
+_remove = getattr(utils, "__remove")
+_insert = getattr(utils, "__insert")
+
+def _assert_members_match(status):
+    expected = {}
+    for node, com in status.node2com.items():
+        expected.setdefault(com, set()).add(node)
+    assert {com: members for com, members in status.com_members.items() if members} == expected
+
+def test_members_follow_node2com():
+    graphs = churn_snapshots(600, 4, 0.1, seed=5)
+    status = Status()
+    status.init(graphs[0], "weight", louvain_variant.best_partition(graphs[0], random_state=5))
+    _assert_members_match(status)
+    random_state = check_random_state(5)
+    for graph in graphs[1:]:
+        status.apply_delta(graph, *graph.graph["delta"])
+        _assert_members_match(status)
+
+        before = dict(status.node2com)
+        marker = status.checkpoint()
+        nodes = list(graph.nodes())
+        for node in random_state.choice(len(nodes), 50).tolist():
+            node = nodes[node]
+            com = status.node2com[next(iter(graph[node]), node)]
+            _remove(node, status.node2com[node], 0., status)
+            _insert(node, com, 0., status)
+        _assert_members_match(status)
+        status.rollback(marker)
+        status.release()
+        assert status.node2com == before
+        _assert_members_match(status)
+
+        for method in (louvain_variant.best_partition, louvain_variant_leiden_addition.best_partition):
+            partition = method(graph, dict(status.node2com), status=status, random_state=5)
+            _assert_members_match(status)
+        status.reassign(graph, partition)
+        _assert_members_match(status)
+        assert status.node2com.keys() == set(graph.nodes())
+
+def test_singletons_match_init():
+    graph, _ = _arrivals(0)
+    status = Status()
+    status.init(graph, "weight")
+    louvain_variant.best_partition(graph, partition=dict(status.node2com), status=status, random_state=0)
+    singletons = status.singletons(graph)
+    expected = Status()
+    expected.init(graph, "weight")
+    for attribute in ("node2com", "degrees", "internals", "gdegrees", "com_members"):
+        assert getattr(singletons, attribute) == getattr(expected, attribute)
+    assert singletons.modularity_internals == pytest.approx(expected.modularity_internals)
+    assert singletons.modularity_degrees == pytest.approx(expected.modularity_degrees)
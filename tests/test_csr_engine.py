@@ -0,0 +1,56 @@
+import pytest
+
+from evaluation.temporal_wrapper import TemporalLouvainIterator
+from louvain_variant import louvain_variant, louvain_variant_leiden_addition
+from louvain_variant.community_status import Status
+from louvain_variant.utils import engine_graph, induced_graph
+
+def _partition(graph):
+    return louvain_variant.best_partition(graph, random_state=42)
+
+def test_status_init_matches_networkx(snapshots):
+    graph = snapshots[1]
+    partition = _partition(snapshots[0]) # some nodes of graph are new arrivals
+    expected = Status()
+    expected.init(graph, "weight", dict(partition))
+    csr_graph, csr_partition = engine_graph(graph, dict(partition), engine="csr")
+    status = Status()
+    status.init(csr_graph, "weight", csr_partition)
+
+    nodes = csr_graph.labels
+    assert status.total_weight == pytest.approx(expected.total_weight)
+    for position, node in enumerate(nodes):
+        assert status.gdegrees[position] == pytest.approx(expected.gdegrees[node])
+        assert status.core_centrality[position] == pytest.approx(expected.core_centrality[node])
+    # new arrivals get other community ids, compare the communities by their members
+    members = lambda status, key: {frozenset(key(node) for node in com) for com in status.com_members.values() if com}
+    assert members(status, lambda position: nodes[position]) == members(expected, lambda node: node)
+    assert {nodes[position] for position in status.soft_nodes_set} == expected.soft_nodes_set
+    assert status.modularity_internals == pytest.approx(expected.modularity_internals)
+    assert status.modularity_degrees == pytest.approx(expected.modularity_degrees)
+
+def test_induced_graph_matches_networkx(snapshots):
+    graph = snapshots[0]
+    partition = _partition(graph)
+    csr_graph, csr_partition = engine_graph(graph, partition, engine="csr")
+    expected = induced_graph(partition, graph)
+    induced = induced_graph(csr_partition, csr_graph).to_networkx()
+    assert set(induced.nodes()) == set(expected.nodes())
+    assert {frozenset((u, v)): w for u, v, w in induced.edges(data="weight")} == \
+           pytest.approx({frozenset((u, v)): w for u, v, w in expected.edges(data="weight")})
+
+@pytest.mark.parametrize("method, local_moving", [(louvain_variant.best_partition, "passes"),
+                                                  (louvain_variant.best_partition, "queue"),
+                                                  (louvain_variant.best_partition, "core_queue"),
+                                                  (louvain_variant_leiden_addition.best_partition, None)])
+@pytest.mark.parametrize("core_threshold", [0.5, 1.0])
+def test_variants_match_networkx(snapshots, method, local_moving, core_threshold):
+    """Both engines visit the nodes and their neighbours in the same order, so a seed fixes the same partitions"""
+    args = dict(core_threshold=core_threshold, random_state=42)
+    if local_moving is not None:
+        args["local_moving"] = local_moving
+    results = {}
+    for engine in ("networkx", "csr"):
+        iterator = TemporalLouvainIterator(method, prev_partition=True, engine=engine, **args)
+        results[engine] = iterator.process_temporal_graph(snapshots, measure_time=False)
+    assert results["csr"] == results["networkx"]
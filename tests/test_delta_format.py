@@ -0,0 +1,81 @@
+import shutil
+
+import pytest
+
+from benchmarks.incremental import churn_snapshots
+from benchmarks.primitives import COMMUNITY_SIZE
+from evaluation.delta_format import convert_to_delta, load_delta_data
+from evaluation.metrics import compute_metrics
+from louvain_variant import louvain_variant
+from louvain_variant.community_status import CoreCentralityCache, Status
+from tests.conftest import SMALL_DATASET
+
+@pytest.fixture(scope="module")
+def data_path(tmp_path_factory):
+    """A copy of the smallest dataset with its delta files, so that nothing is written next to the bundled one"""
+    path = tmp_path_factory.mktemp("delta") / "dataset"
+    shutil.copytree(SMALL_DATASET, path)
+    convert_to_delta(str(path))
+    return str(path)
+
+def _content(graph):
+    communities = {node: (datas.get("community_id"), frozenset(datas.get("community", ())))
+                   for node, datas in graph.nodes(data=True)}
+    return set(graph.nodes()), {frozenset(edge) for edge in graph.edges()}, communities
+
+def test_replay_matches_full_load(data_path, snapshots):
+    replayed = load_delta_data(data_path)
+    assert len(replayed) == len(snapshots)
+    # the snapshots are checked after all were replayed, later steps must not change earlier snapshots
+    for graph, expected in zip(replayed, snapshots):
+        assert _content(graph) == _content(expected)
+    for graph, previous in zip(replayed[1:], replayed):
+        assert graph.graph["delta_from"] == previous.graph["time_step"]
+
+def test_live_stream_matches_full_load(data_path, snapshots):
+    stream = load_delta_data(data_path, lazy=True)
+    graphs = []
+    for graph, expected in zip(stream, snapshots):
+        assert _content(graph) == _content(expected)
+        graphs.append(graph)
+    assert len(graphs) == len(snapshots)
+    assert all(graph is graphs[0] for graph in graphs)
+
+def test_stream_slices(data_path, snapshots):
+    stream = load_delta_data(data_path, lazy=True)
+    sliced = stream[1:3]
+    assert len(sliced) == 2
+    assert [_content(graph) for graph in sliced] == [_content(graph) for graph in snapshots[1:3]]
+    assert len(stream[:]) == len(snapshots)
+    with pytest.raises(ValueError):
+        stream[::2]
+
+def test_metrics_on_live_stream(data_path, snapshots):
+    partitions = [louvain_variant.best_partition(graph, random_state=42) for graph in snapshots]
+    expected = compute_metrics(snapshots, partitions)
+    assert compute_metrics(load_delta_data(data_path, lazy=True), partitions) == pytest.approx(expected)
+
+def test_core_cache_on_live_stream(data_path):
+    cache = CoreCentralityCache()
+    partition = None
+    for graph in load_delta_data(data_path, lazy=True):
+        if partition is not None:
+            partition = {node: partition.get(node, -1 - i) for i, node in enumerate(graph)}
+        status = Status()
+        status.init(graph, "weight", partition, cache=cache)
+        expected = Status()
+        expected.init(graph, "weight", partition)
+        assert status.core_centrality == pytest.approx(expected.core_centrality)
+        partition = louvain_variant.best_partition(graph, random_state=42)
+
+def test_core_cache_reads_delta():
+    cache = CoreCentralityCache()
+    for step, graph in enumerate(churn_snapshots(2000, 3, 0.01, seed=5)):
+        partition = {node: node // COMMUNITY_SIZE for node in graph}
+        if step:
+            assert len(cache.dirty_nodes(graph, partition)) < len(graph) / 2
+        status = Status()
+        status.init(graph, "weight", partition, cache=cache)
+        expected = Status()
+        expected.init(graph, "weight", partition)
+        assert status.core_centrality == pytest.approx(expected.core_centrality)
@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+import pytest
+
+from data_generation.dyn_graph_generator import EVENTS, generate
+from evaluation.delta_format import convert_to_delta, load_delta_data
+from evaluation.load_graphs import load_dyn_data
+
+# the parameters of the smallest bundled dataset, 5_250_10_20_02_01, written by the C++ bench_switch
+PARAMETERS = {"num_nodes": 250, "steps": 5, "average_k": 10, "max_degree": 20, "muw": 0.2}
+EVENT_PARAMETERS = {"p": 0.1, "birth": 1, "death": 1, "expand": 1, "contract": 1, "r": 0.1, "merge": 1, "split": 1}
+
+def _statistics(graphs):
+    """Mean degree, fraction of edges between communities and fraction of nodes that switch community per step"""
+    community = [{node: datas["community_id"] for node, datas in graph.nodes(data=True)} for graph in graphs]
+    degree = np.mean([2 * graph.number_of_edges() / len(graph) for graph in graphs])
+    mixing = np.mean([np.mean([labels[u] != labels[v] for u, v in graph.edges()]) for graph, labels in zip(graphs, community)])
+    switched = np.mean([np.mean([before[node] != after[node] for node in before if node in after])
+                        for before, after in zip(community, community[1:])])
+    return degree, mixing, switched
+
+def _files(path):
+    contents = {}
+    for name in sorted(os.listdir(path)):
+        if name.startswith("switch."):
+            with open(os.path.join(path, name), "r") as file:
+                contents[name] = file.read()
+    return contents
+
+def test_switch_close_to_bundled(tmp_path, snapshots):
+    path = generate(str(tmp_path), "switch", workers=1, **PARAMETERS, **EVENT_PARAMETERS)
+    graphs = load_dyn_data(path, cache=False)
+    assert len(graphs) == len(snapshots)
+    degree, mixing, switched = _statistics(graphs)
+    expected_degree, expected_mixing, expected_switched = _statistics(snapshots)
+    # small communities cannot hold all of the internal degree, see generate
+    assert degree == pytest.approx(expected_degree, rel=0.2)
+    assert mixing == pytest.approx(expected_mixing, abs=0.05)
+    assert switched == pytest.approx(expected_switched, abs=0.05)
+
+def test_output_does_not_depend_on_workers(tmp_path):
+    serial = generate(str(tmp_path / "serial"), "switch", workers=1, **PARAMETERS, **EVENT_PARAMETERS)
+    parallel = generate(str(tmp_path / "parallel"), "switch", workers=2, **PARAMETERS, **EVENT_PARAMETERS)
+    assert _files(serial) == _files(parallel)
+
+@pytest.mark.parametrize("event", EVENTS)
+def test_events_load_and_replay(tmp_path, event):
+    path = generate(str(tmp_path), event, workers=1, **PARAMETERS, **EVENT_PARAMETERS)
+    graphs = load_dyn_data(path, cache=False)
+    assert len(graphs) == PARAMETERS["steps"]
+    for graph in graphs:
+        # every node has an edge and a community
+        assert min(degree for _, degree in graph.degree()) > 0
+        assert all("community_id" in datas for _, datas in graph.nodes(data=True))
+    convert_to_delta(path)
+    replayed = load_delta_data(path)
+    for graph, expected in zip(replayed, graphs):
+        assert {frozenset(edge) for edge in graph.edges()} == {frozenset(edge) for edge in expected.edges()}
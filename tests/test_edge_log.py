@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from itertools import islice
+from evaluation.edge_log import EdgeLog
+
+def _dict_graph(seed, num_edges=500, duration=120):
+    """Random temporal edges as {timestamp: [(src, dst), ...]}, with the timestamps in order as in load_graph"""
+    rng = np.random.default_rng(seed)
+    dict_graph = {}
+    for ts in sorted(rng.integers(0, duration, num_edges).tolist()):
+        dict_graph.setdefault(ts, []).append((int(rng.integers(50)), int(rng.integers(50))))
+    return dict_graph
+
+def _edges(dict_graph):
+    return [(src, dst, ts) for ts, node_pairs in dict_graph.items() for src, dst in node_pairs]
+
+def _log_edges(log):
+    return list(zip(log.src.tolist(), log.dst.tolist(), log.ts.tolist()))
+
+@pytest.mark.parametrize("seed", range(3))
+def test_reads_as_dict(seed):
+    dict_graph = _dict_graph(seed)
+    log = EdgeLog.from_dict(dict_graph)
+
+    assert len(log) == len(dict_graph)
+    assert list(log) == log.keys() == list(dict_graph.keys())
+    assert list(log.items()) == list(dict_graph.items())
+    assert list(log.values()) == list(dict_graph.values())
+    assert log.to_dict() == dict_graph
+    assert log.num_edges == sum(len(node_pairs) for node_pairs in dict_graph.values())
+    assert log.nodes().tolist() == sorted({node for pair in _edges(dict_graph) for node in pair[:2]})
+
+def test_from_columns_sorts_stably():
+    rng = np.random.default_rng(0)
+    src, dst, ts = rng.integers(0, 50, 300), rng.integers(0, 50, 300), rng.integers(0, 40, 300)
+    log = EdgeLog.from_columns({"src": src, "dst": dst, "ts": ts})
+
+    expected = sorted(zip(src.tolist(), dst.tolist(), ts.tolist()), key=lambda edge: edge[2])
+    assert _log_edges(log) == expected
+
+def test_from_columns_keeps_sorted_arrays():
+    columns = {"src": np.arange(5), "dst": np.arange(5) + 1, "ts": np.array([1, 1, 2, 4, 4])}
+    log = EdgeLog.from_columns(columns)
+    assert log.src is columns["src"] and log.ts is columns["ts"]
+
+@pytest.mark.parametrize("seed", range(3))
+def test_steps_match_islice(seed):
+    dict_graph = _dict_graph(seed)
+    log = EdgeLog.from_dict(dict_graph)
+    num_steps = len(dict_graph)
+    for start, stop in [(0, 10), (5, 17), (0, num_steps), (num_steps - 3, num_steps + 5), (20, 10), (None, 7), (8, None)]:
+        expected = dict(islice(dict_graph.items(), start, stop))
+        assert log.steps(start, stop).to_dict() == expected
+
+@pytest.mark.parametrize("seed", range(3))
+def test_between_matches_filter(seed):
+    dict_graph = _dict_graph(seed)
+    log = EdgeLog.from_dict(dict_graph)
+    for start_time, stop_time in [(10, 50), (-5, 3), (0, 200), (60, 60), (70, 40), (None, 30), (90, None)]:
+        expected = {ts: node_pairs for ts, node_pairs in dict_graph.items()
+                    if (start_time is None or ts >= start_time) and (stop_time is None or ts < stop_time)}
+        assert log.between(start_time, stop_time).to_dict() == expected
+
+@pytest.mark.parametrize("size", [1, 7, 64, 1000])
+def test_batches_by_size(size):
+    dict_graph = _dict_graph(1)
+    edges = _edges(dict_graph)
+    batches = list(EdgeLog.from_dict(dict_graph).batches(size=size))
+
+    assert [_log_edges(batch) for batch in batches] == [edges[start:start + size] for start in range(0, len(edges), size)]
+
+@pytest.mark.parametrize("duration", [1, 9, 50, 500])
+def test_batches_by_duration(duration):
+    dict_graph = _dict_graph(2)
+    first = min(dict_graph)
+    num_batches = (max(dict_graph) - first) // duration + 1
+    batches = list(EdgeLog.from_dict(dict_graph).batches(duration=duration))
+
+    assert len(batches) == num_batches
+    for i, batch in enumerate(batches):
+        expected = {ts: node_pairs for ts, node_pairs in dict_graph.items() if (ts - first) // duration == i}
+        assert batch.to_dict() == expected
+
+def test_empty_log():
+    log = EdgeLog.from_dict({})
+    assert len(log) == 0 and log.keys() == [] and log.to_dict() == {}
+    assert list(log.batches(duration=5)) == [] and list(log.batches(size=5)) == []
+    assert log.steps(0, 3).num_edges == 0 and log.between(0, 10).num_edges == 0
+
+def test_invalid_batches():
+    log = EdgeLog.from_dict(_dict_graph(0))
+    for kwargs in [{}, {"size": 3, "duration": 3}, {"size": 0}, {"duration": -1}]:
+        with pytest.raises(ValueError):
+            next(log.batches(**kwargs))
+    with pytest.raises(ValueError):
+        EdgeLog(np.arange(3), np.arange(2), np.arange(3))
@@ -0,0 +1,76 @@
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from evaluation.graph_functions import community_adjacency, count_edges_between_communities, \
+    count_edges_within_community, merge_weak_communities
+
+def _merge_weak_communities(G, partition, threshold, seed=None):
+    """merge_weak_communities as it was before the community adjacency index, rescanning the pairs per weak community"""
+    if seed is not None:
+        random.seed(seed)
+    within_counts = count_edges_within_community(G, partition)
+    between_counts = count_edges_between_communities(G, partition)
+    community_nodes = {}
+    for node, comm in partition.items():
+        community_nodes.setdefault(comm, set()).add(node)
+    to_merge = [comm for comm, count in within_counts.items() if count < threshold]
+    new_partition = partition.copy()
+    for comm in to_merge:
+        neighbors = {}
+        for (c1, c2), edge_count in between_counts.items():
+            if comm == c1:
+                neighbors[c2] = edge_count
+            elif comm == c2:
+                neighbors[c1] = edge_count
+        if not neighbors:
+            continue
+        max_edges = max(neighbors.values())
+        target_comm = random.choice([c for c, e in neighbors.items() if e == max_edges])
+        for node in community_nodes[comm]:
+            new_partition[node] = target_comm
+    for comm in to_merge:
+        for node, comm2 in new_partition.items():
+            if comm2 == comm:
+                new_partition[node] = 0
+    return {k: v for k, v in new_partition.items() if v not in to_merge}
+
+def _random_case(seed):
+    rng = np.random.default_rng(seed)
+    num_nodes = int(rng.integers(10, 80))
+    graph = nx.gnm_random_graph(num_nodes, int(rng.integers(5, 3 * num_nodes)), seed=seed)
+    labels = rng.choice(50, int(rng.integers(1, 15)), replace=False)
+    partition = {node: int(rng.choice(labels)) for node in rng.permutation(num_nodes).tolist()}
+    return graph, partition
+
+@pytest.mark.parametrize("seed", range(50))
+def test_community_adjacency_matches_counts(seed):
+    graph, partition = _random_case(seed)
+    labels, node_com, within, within_first, between = community_adjacency(graph, partition)
+    assert [labels[com] for com in node_com] == list(partition.values())
+    assert {labels[com]: count for com, count in enumerate(within.tolist()) if count} == count_edges_within_community(graph, partition)
+
+    pairs = count_edges_between_communities(graph, partition)
+    neighbours = {}
+    for (c1, c2), count in pairs.items():
+        neighbours.setdefault(c1, {})[c2] = count
+        neighbours.setdefault(c2, {})[c1] = count
+    for com, label in enumerate(labels.tolist()):
+        row = between.getrow(com)
+        expected = neighbours.get(label, {})
+        # same counts, neighbours in the order they are first met
+        assert list(zip(labels[between.indices[between.indptr[com]:between.indptr[com + 1]]].tolist(),
+                        between.data[between.indptr[com]:between.indptr[com + 1]].tolist())) == list(expected.items())
+        assert row.sum() == sum(expected.values())
+
+@pytest.mark.parametrize("seed", range(50))
+def test_merge_weak_communities_matches_rescan(seed):
+    graph, partition = _random_case(seed)
+    threshold = int(np.random.default_rng(seed).integers(1, 6))
+    merged = merge_weak_communities(graph, partition, threshold, seed=seed)
+    state = random.getstate()
+    expected = _merge_weak_communities(graph, partition, threshold, seed=seed)
+    assert list(merged.items()) == list(expected.items())
+    assert random.getstate() == state
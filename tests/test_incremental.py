@@ -0,0 +1,88 @@
+import pytest
+
+from benchmarks.incremental import churn_snapshots
+from evaluation.temporal_wrapper import TemporalLouvainIterator
+from louvain_variant import louvain_variant, louvain_variant_leiden_addition
+from louvain_variant.community_status import Status
+from louvain_variant.utils import modularity, snapshot_delta
+
+def _members(status):
+    """The communities of a status by their members, the ids of new arrivals differ between the paths"""
+    return {frozenset(members): (status.degrees[com], status.internals[com])
+            for com, members in status.com_members.items() if members}
+
+def _assert_same_status(status, expected):
+    assert status.total_weight == pytest.approx(expected.total_weight)
+    assert status.gdegrees == pytest.approx(expected.gdegrees)
+    assert status.core_centrality == pytest.approx(expected.core_centrality)
+    members = _members(status)
+    expected_members = _members(expected)
+    assert members.keys() == expected_members.keys()
+    for com, aggregates in expected_members.items():
+        assert members[com] == pytest.approx(aggregates)
+    assert status.modularity_internals == pytest.approx(expected.modularity_internals)
+    assert status.modularity_degrees == pytest.approx(expected.modularity_degrees)
+
+def test_apply_delta_matches_init(snapshots):
+    prev_graph, graph = snapshots[0], snapshots[1]
+    partition = louvain_variant.best_partition(prev_graph, random_state=42)
+    status = Status()
+    status.init(prev_graph, "weight", dict(partition))
+    status.apply_delta(graph, *snapshot_delta(prev_graph, graph))
+    expected = Status()
+    expected.init(graph, "weight", dict(partition))
+
+    _assert_same_status(status, expected)
+    assert status.soft_nodes_set == expected.soft_nodes_set
+
+def test_reassign_matches_init(snapshots):
+    graph = snapshots[0]
+    status = Status()
+    status.init(graph, "weight", louvain_variant.best_partition(graph, random_state=1))
+    partition = louvain_variant.best_partition(graph, random_state=2)
+    status.reassign(graph, partition)
+    expected = Status()
+    expected.init(graph, "weight", partition)
+
+    _assert_same_status(status, expected)
+
+@pytest.mark.parametrize("method", [louvain_variant.best_partition, louvain_variant_leiden_addition.best_partition])
+def test_status_rolled_back_after_levels(snapshots, method):
+    prev_graph, graph = snapshots[0], snapshots[1]
+    status = Status()
+    status.init(graph, "weight", louvain_variant.best_partition(prev_graph, random_state=42)) # with new arrivals to refine
+    before = status.copy()
+    expected = method(graph, partition=dict(status.node2com), status=status.copy(), random_state=7)
+    assert method(graph, partition=dict(status.node2com), status=status, random_state=7) == expected
+
+    assert status.node2com == before.node2com
+    assert status.degrees == pytest.approx(before.degrees)
+    assert status.internals == pytest.approx(before.internals)
+    assert {com: members for com, members in status.com_members.items() if members} == \
+           {com: members for com, members in before.com_members.items() if members}
+    assert status.modularity_internals == pytest.approx(before.modularity_internals)
+    assert status.journal is None
+
+@pytest.mark.parametrize("method", [louvain_variant.best_partition, louvain_variant_leiden_addition.best_partition])
+def test_incremental_close_to_init(snapshots, method):
+    """Incremental mode diffs the bundled snapshots, which carry no delta, and continues from other community ids"""
+    results = {}
+    for incremental in (False, True):
+        iterator = TemporalLouvainIterator(method, prev_partition=True, incremental=incremental, random_state=42)
+        partitions = iterator.process_temporal_graph(snapshots, measure_time=False)
+        results[incremental] = [modularity(partition, graph) for partition, graph in zip(partitions, snapshots)]
+    assert results[True] == pytest.approx(results[False], abs=0.02)
+
+def test_incremental_uses_attached_delta(monkeypatch):
+    graphs = churn_snapshots(2000, 3, 0.05, seed=3)
+    diffs = []
+    monkeypatch.setattr("evaluation.temporal_wrapper.snapshot_delta",
+                        lambda *args: diffs.append(args) or snapshot_delta(*args))
+    iterator = TemporalLouvainIterator(louvain_variant.best_partition, prev_partition=True, incremental=True, random_state=42)
+    partitions = iterator.process_temporal_graph(graphs, measure_time=False)
+    assert not diffs
+
+    expected = TemporalLouvainIterator(louvain_variant.best_partition, prev_partition=True, random_state=42) \
+        .process_temporal_graph(graphs, measure_time=False)
+    for partition, expected_partition, graph in zip(partitions, expected, graphs):
+        assert modularity(partition, graph) == pytest.approx(modularity(expected_partition, graph), abs=0.02)
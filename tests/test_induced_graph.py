@@ -0,0 +1,81 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from louvain_variant import louvain_variant
+from louvain_variant.csr_graph import _sum_edge_pairs
+from louvain_variant.utils import engine_graph, induced_graph
+
+def _induced_graph_edge_by_edge(partition, graph, weight="weight"):
+    """The aggregation induced_graph replaced, one edge at a time"""
+    ret = nx.Graph()
+    ret.add_nodes_from(partition.values())
+    for node1, node2, datas in graph.edges(data=True):
+        edge_weight = datas.get(weight, 1)
+        com1 = partition[node1]
+        com2 = partition[node2]
+        w_prec = ret.get_edge_data(com1, com2, {weight: 0}).get(weight, 1)
+        ret.add_edge(com1, com2, **{weight: w_prec + edge_weight})
+    return ret
+
+def _with_loops(graph, seed):
+    """A copy of graph with weighted self-loops on some of its nodes"""
+    rng = np.random.default_rng(seed)
+    graph = graph.copy()
+    for node in list(graph.nodes()):
+        if rng.random() < 0.2:
+            graph.add_edge(node, node, weight=float(rng.integers(1, 5)))
+    return graph
+
+def _assert_same_graph(induced, expected):
+    assert list(induced.nodes()) == list(expected.nodes())
+    for node in expected:
+        assert list(induced[node]) == list(expected[node]) # neighbours in the same order
+        for neighbor, datas in expected[node].items():
+            assert induced[node][neighbor]["weight"] == pytest.approx(datas["weight"])
+
+@pytest.mark.parametrize("seed", range(3))
+def test_matches_edge_by_edge(snapshots, seed):
+    graph = _with_loops(snapshots[seed], seed)
+    partition = louvain_variant.best_partition(graph, random_state=seed)
+    induced = induced_graph(partition, graph)
+    _assert_same_graph(induced, _induced_graph_edge_by_edge(partition, graph))
+    # one level up, every node has the self-loop of the edges inside its community
+    merged = {node: node % 3 for node in induced}
+    _assert_same_graph(induced_graph(merged, induced), _induced_graph_edge_by_edge(merged, induced))
+
+@pytest.mark.parametrize("seed", range(3))
+def test_csr_matches_edge_by_edge(snapshots, seed):
+    graph = _with_loops(snapshots[seed], seed)
+    partition = louvain_variant.best_partition(graph, random_state=seed)
+    csr_graph, csr_partition = engine_graph(graph, partition, engine="csr")
+    induced = induced_graph(csr_partition, csr_graph)
+    expected = _induced_graph_edge_by_edge(partition, graph)
+    assert induced.labels == list(expected.nodes())
+    for position, node in enumerate(induced.labels):
+        row = slice(induced.indptr[position], induced.indptr[position + 1])
+        assert [induced.labels[neighbor] for neighbor in induced.indices[row]] == list(expected[node])
+        assert induced.weights[row].tolist() == pytest.approx([datas["weight"] for datas in expected[node].values()])
+
+def test_loops_and_internal_edges():
+    graph = nx.Graph()
+    graph.add_weighted_edges_from([(0, 0, 3.), (0, 1, 2.), (1, 2, 1.), (2, 2, 4.), (2, 3, 5.), (3, 0, 1.5)])
+    partition = {0: 0, 1: 0, 2: 1, 3: 1}
+    induced = induced_graph(partition, graph)
+    # the loop of a community is its internal edges plus the loops of its nodes, each counted once
+    assert induced[0][0]["weight"] == 5.
+    assert induced[1][1]["weight"] == 9.
+    assert induced[0][1]["weight"] == 2.5
+    _assert_same_graph(induced, _induced_graph_edge_by_edge(partition, graph))
+
+def test_sum_edge_pairs_matches_dict():
+    rng = np.random.default_rng(0)
+    src, dst = rng.integers(0, 30, 400), rng.integers(0, 30, 400)
+    weights = rng.random(400)
+    expected = {}
+    for node1, node2, edge_weight in zip(src.tolist(), dst.tolist(), weights.tolist()):
+        key = (min(node1, node2), max(node1, node2))
+        expected[key] = expected.get(key, 0.) + edge_weight
+    low, high, summed = _sum_edge_pairs(src, dst, weights)
+    assert list(zip(low.tolist(), high.tolist())) == list(expected) # in order of first appearance
+    assert summed.tolist() == pytest.approx(list(expected.values()))
@@ -0,0 +1,90 @@
+import os
+import shutil
+import time
+
+import networkx as nx
+import pytest
+
+from evaluation.load_graphs import CACHE_DIR, DynGraphStream, load_dyn_data
+from tests.conftest import SMALL_DATASET
+
+def _reference_load(data_path):
+    """load_dyn_data as it read the files line by line into networkx before the cache"""
+    temporal_ids = sorted(int(name.removesuffix(".comm").removeprefix("switch.")[1:]) for name in os.listdir(data_path) if "comm" in name)
+    temporal_graph = []
+    for time_step in temporal_ids:
+        prefix = f"switch.t{time_step}" if time_step >= 10 else f"switch.t0{time_step}"
+        graph = nx.Graph()
+        with open(os.path.join(data_path, prefix + ".edges"), "r") as file:
+            for edge in file:
+                graph.add_edge(*edge.strip().split(" "))
+        with open(os.path.join(data_path, prefix + ".comm"), "r") as file:
+            for community_id, community in enumerate(file):
+                community = community.strip().split(" ")
+                for member in community:
+                    graph.nodes[member]["community_id"] = community_id
+                    graph.nodes[member]["community"] = community
+        temporal_graph += [graph]
+    return temporal_graph
+
+def _content(graph):
+    """Everything the methods can see of a snapshot, the order of nodes and neighbours included"""
+    return list(graph.nodes(data=True)), [(node, list(graph[node])) for node in graph]
+
+@pytest.fixture(scope="module")
+def data_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("load") / "dataset"
+    shutil.copytree(SMALL_DATASET, path)
+    return str(path)
+
+@pytest.fixture(scope="module")
+def expected(data_path):
+    return [_content(graph) for graph in _reference_load(data_path)]
+
+def test_parse_matches_reference(snapshots, expected):
+    assert [_content(graph) for graph in snapshots] == expected
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_cache_matches_reference(data_path, expected, workers):
+    shutil.rmtree(os.path.join(data_path, CACHE_DIR), ignore_errors=True)
+    assert [_content(graph) for graph in load_dyn_data(data_path, workers=workers)] == expected # written
+    assert os.path.exists(os.path.join(data_path, CACHE_DIR, "manifest.json"))
+    assert [_content(graph) for graph in load_dyn_data(data_path)] == expected # read back
+
+def test_changed_file_is_parsed_again(data_path, expected):
+    load_dyn_data(data_path)
+    edge_file = os.path.join(data_path, "switch.t02.edges")
+    with open(edge_file, "r") as file:
+        lines = file.readlines()
+    try:
+        with open(edge_file, "w") as file:
+            file.writelines(lines[:-1])
+        graphs = load_dyn_data(data_path)
+        assert [_content(graph) for graph in _reference_load(data_path)] == [_content(graph) for graph in graphs]
+        assert _content(graphs[1]) != expected[1]
+    finally:
+        with open(edge_file, "w") as file:
+            file.writelines(lines)
+    assert [_content(graph) for graph in load_dyn_data(data_path)] == expected
+
+@pytest.mark.parametrize("prefetch", [0, 1, 3])
+def test_lazy_stream_matches_reference(data_path, expected, prefetch):
+    stream = load_dyn_data(data_path, lazy=True, prefetch=prefetch)
+    assert len(stream) == len(expected)
+    for _ in range(2): # every iteration starts from the first snapshot
+        assert [_content(graph) for graph in stream] == expected
+    assert _content(stream[2]) == expected[2]
+    assert [_content(graph) for graph in stream[1:4]] == expected[1:4]
+
+@pytest.mark.parametrize("prefetch", [0, 1, 3])
+def test_lazy_stream_reads_prefetch_ahead(data_path, monkeypatch, prefetch):
+    stream = load_dyn_data(data_path, lazy=True, prefetch=prefetch)
+    built = []
+    build = DynGraphStream._build
+    monkeypatch.setattr(DynGraphStream, "_build", lambda self, time_step: built.append(time_step) or build(self, time_step))
+    for i, _ in enumerate(stream):
+        ahead = min(i + prefetch + 1, len(stream))
+        deadline = time.monotonic() + 5
+        while len(built) < ahead and time.monotonic() < deadline: # the read-ahead is built in a background thread
+            time.sleep(0.01)
+        assert built == stream.temporal_ids[:ahead]
@@ -0,0 +1,34 @@
+import networkx as nx
+import pytest
+
+from louvain_variant import louvain_variant
+from louvain_variant.community_status import Status
+from louvain_variant.utils import check_random_state, modularity
+
+@pytest.mark.parametrize("local_moving", ["queue", "core_queue"])
+def test_queue_modes_close_to_passes(snapshots, local_moving):
+    partition = louvain_variant.best_partition(snapshots[0], random_state=42)
+    for graph in snapshots[1:]:
+        expected = louvain_variant.best_partition(graph, partition, random_state=42)
+        result = louvain_variant.best_partition(graph, partition, random_state=42, local_moving=local_moving)
+        assert set(result) == set(graph)
+        assert modularity(result, graph) == pytest.approx(modularity(expected, graph), abs=0.02)
+
+@pytest.mark.parametrize("by_core_centrality", [False, True])
+def test_queue_stops_when_moves_do_not_gain(monkeypatch, by_core_centrality):
+    """Moves that do not change the modularity, but keep queueing the neighbours again, end after one pass"""
+    graph = nx.karate_club_graph()
+    status = Status()
+    status.init(graph, "weight")
+    visits = []
+
+    def move_without_gain(node, graph, status, weight_key, resolution, random_state):
+        visits.append(node)
+        if len(visits) > 100 * len(graph):
+            raise RuntimeError("the queue does not stop")
+        return status.node2com[node], -1 # reported as a move to a community no node is in
+
+    monkeypatch.setattr(louvain_variant, "__move_node", move_without_gain)
+    one_level_queue = getattr(louvain_variant, "__one_level_queue")
+    one_level_queue(graph, status, "weight", 1., check_random_state(42), by_core_centrality=by_core_centrality)
+    assert len(visits) == len(graph)
@@ -0,0 +1,36 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from evaluation.metrics import modularity, nmi, partition_labels, snapshot_arrays
+from louvain_variant import louvain_variant
+from sklearn.metrics import normalized_mutual_info_score
+
+@pytest.mark.parametrize("labels_true, labels_pred", [
+    ([0, 0, 1, 1], [1, 1, 0, 0]),
+    ([0, 0, 0, 0], [0, 0, 0, 0]),
+    ([0, 0, 0, 0], [0, 1, 2, 3]),
+    ([0, 1, 2, 3], [0, 0, 0, 0]),
+    ([5, 5, 7, 7, 9], [1, 2, 1, 2, 3]),
+])
+def test_nmi_special_cases(labels_true, labels_pred):
+    assert nmi(np.array(labels_true), np.array(labels_pred)) == pytest.approx(normalized_mutual_info_score(labels_true, labels_pred))
+
+def test_nmi_matches_sklearn(snapshots):
+    for graph in snapshots:
+        _, labels_true = snapshot_arrays(graph)
+        labels_pred = partition_labels(graph, louvain_variant.best_partition(graph, random_state=42))
+        assert nmi(labels_true, labels_pred) == pytest.approx(normalized_mutual_info_score(labels_true, labels_pred))
+
+def test_modularity_matches_networkx(snapshots):
+    graph = snapshots[0]
+    csr, _ = snapshot_arrays(graph)
+    runs = [louvain_variant.best_partition(graph, random_state=seed) for seed in range(3)]
+    expected = [nx.community.modularity(graph, _communities(partition)) for partition in runs]
+    assert [modularity(csr, partition_labels(graph, partition)) for partition in runs] == pytest.approx(expected)
+
+def _communities(partition):
+    communities = {}
+    for node, com in partition.items():
+        communities.setdefault(com, set()).add(node)
+    return list(communities.values())
@@ -0,0 +1,9 @@
+import pytest
+
+from benchmarks.primitives import generate_graph, primitives
+
+@pytest.mark.parametrize("engine", ["networkx", "csr"])
+def test_running_modularity_matches_full(engine):
+    graph, partition = generate_graph(2000)
+    calls = primitives(graph, partition, engine)
+    assert calls["__modularity"]() == pytest.approx(calls["__full_modularity"]())
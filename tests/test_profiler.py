@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+import run_eval
+from evaluation.results_store import ResultsStore
+from evaluation.temporal_wrapper import TemporalLouvainIterator
+from louvain_variant import louvain_variant, louvain_variant_leiden_addition
+from louvain_variant.profiler import NULL_PROFILER, NullProfiler, PhaseProfiler
+
+VARIANTS = [louvain_variant, louvain_variant_leiden_addition]
+
+def test_add_sums_per_phase_and_level():
+    profiler = PhaseProfiler()
+    profiler.add("init", 0, 5)
+    profiler.add("init", 0, 7)
+    profiler.level = 2
+    with profiler.phase("local_moving"):
+        pass
+    profiler.add("local_moving", 2, 3)
+    timings = profiler.pop()
+    assert timings["init"] == {0: 12}
+    assert list(timings["local_moving"]) == [2] and timings["local_moving"][2] >= 3
+    assert profiler.pop() == {}
+
+@pytest.mark.parametrize("engine", ["networkx", "csr"])
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_phases_per_level(snapshots, variant, engine):
+    previous = variant.best_partition(snapshots[0], random_state=4)
+    for partition in (None, previous):
+        profiler = PhaseProfiler()
+        dendrogram = variant.generate_dendrogram(snapshots[1], partition, random_state=4, engine=engine, profiler=profiler)
+        timings = profiler.pop()
+        assert profiler.pop() == {} # popping starts again from zero
+
+        levels = list(range(len(dendrogram)))
+        assert sorted(timings["copy"]) == [0]
+        assert sorted(timings["local_moving"]) == levels + [len(dendrogram)] # the last level moves nothing
+        assert sorted(timings["renumber"]) == sorted(timings["induced_graph"]) == levels
+        assert min(timings["init"]) == 0
+        if partition is not None:
+            assert 0 in timings["core_centrality"]
+        if partition is not None and variant is louvain_variant_leiden_addition:
+            assert 0 in timings["refinement"]
+        assert all(elapsed > 0 for levels in timings.values() for elapsed in levels.values())
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_null_profiler_changes_nothing(snapshots, variant):
+    previous = variant.best_partition(snapshots[0], random_state=4)
+    assert variant.best_partition(snapshots[1], previous, random_state=4, profiler=PhaseProfiler()) == \
+           variant.best_partition(snapshots[1], previous, random_state=4, profiler=NULL_PROFILER)
+    profiler = NullProfiler()
+    with profiler.phase("init"):
+        profiler.add("init", 0, 5)
+    assert profiler.pop() == {}
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_iterator_keeps_timings_per_snapshot(snapshots, variant):
+    iterator = TemporalLouvainIterator(variant.best_partition, prev_partition=True, random_state=4, profile=True)
+    partitions, _ = iterator.process_temporal_graph(snapshots, measure_time=True)
+    assert len(iterator.phase_timings) == len(partitions)
+    assert all("local_moving" in timings and "init" in timings for timings in iterator.phase_timings)
+    assert all("core_centrality" in timings for timings in iterator.phase_timings[1:])
+
+    unprofiled = TemporalLouvainIterator(variant.best_partition, prev_partition=True, random_state=4)
+    assert unprofiled.process_temporal_graph(snapshots, measure_time=True)[0] == partitions
+    assert unprofiled.phase_timings == []
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_sweep_split_adds_up(snapshots, variant):
+    thresholds = [0.0, 0.25, 0.5, 0.75, 1.0]
+    iterator = TemporalLouvainIterator(variant.best_partition_sweep, prev_partition=True, random_state=4, profile=True)
+    popped = []
+    pop = iterator.profiler.pop
+    iterator.profiler.pop = lambda: popped.append(pop()) or popped[-1]
+    sweep = iterator.process_temporal_graph_sweep(snapshots, thresholds)
+
+    totals = {}
+    for timings in popped:
+        for phase, levels in timings.items():
+            for level, elapsed in levels.items():
+                totals[(phase, level)] = totals.get((phase, level), 0) + elapsed
+    split = {}
+    for core_threshold in thresholds:
+        assert len(sweep[core_threshold][2]) == len(snapshots)
+        for timings in sweep[core_threshold][2]:
+            for phase, levels in timings.items():
+                for level, elapsed in levels.items():
+                    split[(phase, level)] = split.get((phase, level), 0) + elapsed
+    assert split.keys() == totals.keys()
+    for key, total in totals.items():
+        # every call is split evenly over the thresholds of its group, rounded down to whole nanoseconds
+        assert total - len(thresholds) * len(snapshots) < split[key] <= total
+
+def test_phase_summary_of_eval_method(snapshots, tmp_path):
+    name = "Louvain-Variant"
+    result = run_eval.eval_method(snapshots, name, louvain_variant.best_partition, 0.5, None, 4, "networkx", profile=True)
+    original = run_eval.eval_method(snapshots, "Louvain", run_eval.METHOD_MAPPING_ORIGINAL["Louvain"], None, None, 4, "networkx",
+                                    profile=True)
+    assert "phases" not in original # only the variants are profiled
+    store = ResultsStore.write(str(tmp_path), "dataset", [("Louvain", None, 4, original), (name, 0.5, 4, result)])
+
+    summary = store.phase_summary()
+    assert list(summary) == [0.5] and list(summary[0.5]) == [name]
+    for phase, mean in summary[0.5][name].items():
+        expected = np.mean([sum(timings.get(phase, {}).values()) for timings in result["phases"]]) / 1e9
+        assert mean == pytest.approx(expected)
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from evaluation.results_store import ResultsStore, load_unit, save_unit, unit_file
+
+def _result(num_timesteps, seed, phases=False, memory=False):
+    rng = np.random.default_rng(seed)
+    result = {
+        "partitions": [{f"n{node}": int(rng.integers(3)) for node in range(5 + timestep)} for timestep in range(num_timesteps)],
+        "time": rng.random(num_timesteps).tolist(),
+        "nmi": rng.random(num_timesteps).tolist(),
+        "modularity": rng.random(num_timesteps).tolist(),
+    }
+    if phases:
+        result["phases"] = [{"local_moving": {0: 1000 * (timestep + 1), 1: 500}} for timestep in range(num_timesteps)]
+    if memory:
+        result["memory"] = [{"peak_rss": 100. + timestep, "traced_peak": 50., "allocators": {"top": [["a.py:1", 10]], "peak_phase": "init@0"}}
+                            for timestep in range(num_timesteps)]
+    return result
+
+def test_unit_file_keys_the_modes(tmp_path):
+    files = {unit_file(str(tmp_path), "Louvain variant", 0.5, 1, "networkx", sweep, profile, memory)
+             for sweep in (False, True) for profile in (False, True) for memory in (False, True)}
+    assert len(files) == 8
+    assert unit_file(str(tmp_path), "Louvain variant", 0.5, 1, "csr") != unit_file(str(tmp_path), "Louvain variant", 0.5, 1, "networkx")
+    # units stored before the modes were part of the key are still found by a run without them
+    assert unit_file(str(tmp_path), "Louvain variant", 0.5, 1, "networkx").endswith("Louvain_variant_0.5_networkx_1.npz")
+    # the original methods are neither swept nor profiled
+    original = unit_file(str(tmp_path), "Louvain", None, 1, "networkx")
+    assert unit_file(str(tmp_path), "Louvain", None, 1, "networkx", sweep=True, profile=True) == original
+    assert unit_file(str(tmp_path), "Louvain", None, 1, "networkx", memory=True) != original
+
+@pytest.mark.parametrize("phases, memory", [(False, False), (True, True)])
+def test_unit_round_trip(tmp_path, phases, memory):
+    result = _result(3, seed=1, phases=phases, memory=memory)
+    path = str(tmp_path / "unit.npz")
+    save_unit(path, result)
+    assert load_unit(path) == result
+
+def test_store_round_trip(tmp_path):
+    runs = [("Louvain", None, seed, _result(3, seed)) for seed in (1, 2)] + \
+           [("Louvain variant", 0.5, seed, _result(3, seed + 10, phases=True, memory=True)) for seed in (1, 2)]
+    store = ResultsStore.write(str(tmp_path), "dataset", runs)
+
+    rows = store.rows("Louvain variant", 0.5, seed=2)
+    assert [store.partition(row) for row in rows] == runs[3][3]["partitions"]
+    assert np.asarray(store.column("nmi"))[rows].tolist() == runs[3][3]["nmi"]
+    assert np.isnan(np.asarray(store.column("phase_local_moving"))[store.rows("Louvain")]).all()
+    assert store.allocators(rows[0]) == runs[3][3]["memory"][0]["allocators"]
+
+    summary = store.summary()
+    mean, std = summary["original"]["Louvain"]["modularity"]
+    table = np.array([result["modularity"] for _, _, _, result in runs[:2]])
+    assert mean == pytest.approx(table.mean(axis=0))
+    assert std == pytest.approx(table.std(axis=0))
+    # (1500 + 2500 + 3500) / 3 nanoseconds summed over the levels
+    assert store.phase_summary() == {0.5: {"Louvain variant": {"local_moving": pytest.approx(2500e-9)}}}
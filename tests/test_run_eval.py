@@ -0,0 +1,68 @@
+import matplotlib
+import matplotlib.pyplot as plt
+import os
+import shutil
+import tracemalloc
+
+import numpy as np
+import pytest
+
+import run_eval
+from tests.conftest import SMALL_DATASET
+from evaluation.results_store import ResultsStore
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    """A copy of the smallest bundled dataset, evaluated for one seed and threshold into a results folder under tmp_path"""
+    data_path = str(tmp_path / os.path.basename(SMALL_DATASET))
+    shutil.copytree(SMALL_DATASET, data_path, ignore=shutil.ignore_patterns(".cache"))
+    monkeypatch.setattr(run_eval, "SEEDS", [35161])
+    monkeypatch.setattr(run_eval, "CC_THRESHOLDS", [0.5])
+    return data_path
+
+def _run(data_path, tmp_path, monkeypatch, **kwargs):
+    monkeypatch.setattr(run_eval, "RESULTS_PATH", str(tmp_path / f"results_{kwargs.get('workers', 1)}"))
+    run_eval.run_eval(data_path, 3, **kwargs)
+    return ResultsStore(run_eval.results_path(data_path, 3))
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_workers_match_serial(dataset, tmp_path, monkeypatch, lazy):
+    serial = _run(dataset, tmp_path, monkeypatch, lazy=lazy)
+    parallel = _run(dataset, tmp_path, monkeypatch, workers=2, lazy=lazy)
+
+    for name in ("method", "threshold", "seed", "timestep", "nmi", "modularity"):
+        np.testing.assert_array_equal(parallel.column(name), serial.column(name))
+    for row in range(len(serial.column("timestep"))):
+        assert parallel.partition(row) == serial.partition(row)
+
+def test_memory_is_stored_and_plotted(dataset, tmp_path, monkeypatch, capsys):
+    store = _run(dataset, tmp_path, monkeypatch, memory=True)
+    assert not tracemalloc.is_tracing() # stopped again once the runs are done
+    assert store.memory_columns() == ["peak_rss", "traced_peak"]
+    for name in store.memory_columns():
+        assert (np.asarray(store.column(name)) > 0).all()
+
+    methods = np.asarray(store.column("method"))
+    for row, method in enumerate(methods.tolist()):
+        allocators = store.allocators(row)
+        if method in run_eval.METHOD_MAPPING_ORIGINAL:
+            assert allocators is None # only the variants report their allocators
+            continue
+        assert allocators["top"]
+        for location, size in allocators["top"]:
+            path, line = location.rsplit(":", 1)
+            assert path.endswith(".py") and int(line) > 0 and size > 0
+        phase, level = allocators["peak_phase"].split("@")
+        assert phase and int(level) >= 0
+
+    run_eval.print_allocators(store)
+    assert "MB traced at" in capsys.readouterr().out
+
+    matplotlib.use("Agg")
+    summary = store.summary()
+    assert all("peak_rss" in metrics for methods in summary.values() for metrics in methods.values())
+    file_name = str(tmp_path / "plot")
+    run_eval.plot_all(summary, file_name)
+    assert os.path.exists(file_name + "_plot.pdf")
+    assert plt.gcf().axes[3].get_title() == "Memory (MB)" # the 4th column of the first row
+    plt.close("all")
@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pytest
+
+from evaluation.save_load_stackoverflow import convert_edge_file, load_edge_columns, load_graph, save_dict
+
+LINES = ["1 2 100", "2 3 100", "bad line", "3 4", "4 5 6 7", "x 5 101", "", "5 6 99", "# 1 2 3", "6 7 102", "7 8 101"]
+
+def _reference(lines):
+    """{timestamp: [(src, dst)]} as the original line by line import read it, skipping what is not three integers"""
+    edges = {}
+    for line in lines:
+        parts = line.split()
+        if len(parts) == 3 and all(part.lstrip("-").isdigit() for part in parts):
+            src, dst, timestamp = map(int, parts)
+            edges.setdefault(timestamp, []).append((src, dst))
+    return edges
+
+def _write(path, lines, final_newline=True):
+    with open(path, "w") as file:
+        file.write("\n".join(lines) + ("\n" if final_newline else ""))
+
+@pytest.mark.parametrize("chunk_bytes", [1 << 26, 7])
+@pytest.mark.parametrize("final_newline", [True, False])
+def test_malformed_lines_are_skipped(tmp_path, chunk_bytes, final_newline):
+    path = str(tmp_path / "edges.txt")
+    _write(path, LINES, final_newline)
+    convert_edge_file(path, chunk_bytes)
+    columns = load_edge_columns(path)
+    rows = [(src, dst, timestamp) for timestamp, pairs in _reference(LINES).items() for src, dst in pairs]
+    assert sorted(zip(columns["src"].tolist(), columns["dst"].tolist(), columns["ts"].tolist())) == sorted(rows)
+    assert columns["src"].dtype == np.int32 and columns["ts"].dtype == np.int64
+
+def test_load_graph_matches_line_by_line(tmp_path):
+    rng = np.random.default_rng(0)
+    lines = [f"{src} {dst} {timestamp}" for src, dst, timestamp in
+             zip(rng.integers(0, 50, 500), rng.integers(0, 50, 500), np.sort(rng.integers(0, 100, 500)))]
+    lines.insert(17, "3 4")
+    path = str(tmp_path / "edges.txt")
+    _write(path, lines)
+    edge_log = load_graph(str(tmp_path / "graph"), path)
+    assert edge_log.to_dict() == _reference(lines)
+    assert list(edge_log) == list(_reference(lines))
+
+def test_changed_file_is_converted_again(tmp_path):
+    path = str(tmp_path / "edges.txt")
+    _write(path, LINES[:2])
+    assert load_edge_columns(path)["src"].tolist() == [1, 2]
+    _write(path, LINES[:2] + ["9 9 200"])
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10**9))
+    assert load_edge_columns(path)["src"].tolist() == [1, 2, 9]
+
+def test_json_fallback(tmp_path):
+    path = str(tmp_path / "edges.txt")
+    _write(path, LINES)
+    edge_log = load_graph(str(tmp_path / "graph"), path)
+    save_dict(edge_log, str(tmp_path / "graph"))
+    os.remove(path)
+    assert load_graph(str(tmp_path / "graph"), path).to_dict() == edge_log.to_dict()
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from evaluation.edge_log import EdgeLog
+from evaluation.sliding_window import SlidingWindowGraph
+from louvain_variant import louvain_variant
+from louvain_variant.community_status import Status
+
+def _interactions(seed, num_nodes=40, num_edges=600, duration=200):
+    rng = np.random.default_rng(seed)
+    ts = np.sort(rng.integers(0, duration, num_edges))
+    return EdgeLog(rng.integers(0, num_nodes, num_edges), rng.integers(0, num_nodes, num_edges), ts)
+
+def _expected(log, now, window):
+    """The graph of the window at now rebuilt from scratch, as {(node, node): weight}"""
+    weights = {}
+    for src, dst, ts in zip(log.src.tolist(), log.dst.tolist(), log.ts.tolist()):
+        if now - window < ts <= now and src != dst:
+            key = (min(src, dst), max(src, dst))
+            weights[key] = weights.get(key, 0.) + 1.
+    return weights
+
+def _decayed(log, boundaries, half_life, min_weight):
+    """
+    The decayed graph at every boundary, as {(node, node): weight}. An edge is dropped, and its remaining weight
+    forgotten, at the first boundary where it decayed to min_weight
+    """
+    interactions = {}
+    position = 0
+    for now in boundaries:
+        while position < log.num_edges and log.ts[position] <= now:
+            src, dst, ts = int(log.src[position]), int(log.dst[position]), int(log.ts[position])
+            if src != dst:
+                interactions.setdefault((min(src, dst), max(src, dst)), []).append(ts)
+            position += 1
+        weights = {key: sum(2. ** (-(now - ts) / half_life) for ts in times) for key, times in interactions.items()}
+        interactions = {key: interactions[key] for key, weight in weights.items() if weight > min_weight}
+        yield {key: weights[key] for key in interactions}
+
+def _edges(graph, scale=1.):
+    return {(min(u, v), max(u, v)): weight * scale for u, v, weight in graph.edges(data="weight")}
+
+@pytest.mark.parametrize("seed", range(5))
+def test_window_matches_rebuild(seed):
+    log = _interactions(seed)
+    sliding = SlidingWindowGraph(window=30)
+    for batch in log.batches(duration=17):
+        sliding.advance(batch)
+        expected = _expected(log, sliding.now, 30)
+        assert _edges(sliding.graph) == expected
+        assert set(sliding.graph.nodes()) == {node for edge in expected for node in edge}
+
+@pytest.mark.parametrize("seed", range(5))
+def test_decay_matches_rebuild(seed):
+    log = _interactions(seed, duration=2000) # long enough for the weights to be rebased
+    sliding = SlidingWindowGraph(half_life=20, min_weight=0.3)
+    batches = list(log.batches(duration=25))
+    boundaries = [int(batch.ts[-1]) if batch.num_edges else None for batch in batches]
+    expected_graphs = _decayed(log, [now for now in boundaries if now is not None], 20, 0.3)
+    for batch in batches:
+        if not batch.num_edges:
+            continue
+        sliding.advance(batch)
+        expected = next(expected_graphs)
+        # the weights are kept relative to the origin
+        edges = _edges(sliding.graph, 2. ** (-(sliding.now - sliding.origin) / 20))
+        assert edges.keys() == expected.keys()
+        assert edges == pytest.approx(expected)
+    assert sliding.origin > 20 * 64 # rebased at least once
+
+@pytest.mark.parametrize("window, half_life", [(30, None), (None, 20)])
+def test_deltas_update_status(window, half_life):
+    log = _interactions(7, duration=1500)
+    snapshots = SlidingWindowGraph(window=window, half_life=half_life).snapshots(log.batches(duration=40))
+    status = None
+    previous = None
+    for graph in snapshots:
+        if status is not None and len(graph) and len(previous):
+            status.rescale(graph.graph["rescale"])
+            status.apply_delta(graph, *graph.graph["delta"])
+            expected = Status()
+            expected.init(graph, "weight", dict(status.node2com))
+            assert status.total_weight == pytest.approx(expected.total_weight)
+            assert status.gdegrees == pytest.approx(expected.gdegrees)
+            assert status.modularity_degrees == pytest.approx(expected.modularity_degrees)
+            assert status.modularity_internals == pytest.approx(expected.modularity_internals)
+        if graph.number_of_edges():
+            status = Status()
+            status.init(graph, "weight", louvain_variant.best_partition(graph, random_state=42))
+        previous = graph
+
+def test_dict_and_edge_log_agree():
+    log = _interactions(3)
+    from_log = SlidingWindowGraph(window=25)
+    from_dict = SlidingWindowGraph(window=25)
+    for batch in log.batches(duration=13):
+        assert from_log.advance(batch) == from_dict.advance(batch.to_dict())
+    assert _edges(from_log.graph) == _edges(from_dict.graph)
+
+@pytest.mark.parametrize("window, half_life", [(30, None), (None, 20)])
+def test_snapshots_stay_valid(window, half_life):
+    log = _interactions(5, duration=2000) # with the half_life, long enough for the weights to be rebased
+    sliding = SlidingWindowGraph(window=window, half_life=half_life, min_weight=0.3)
+    snapshots = []
+    expected = []
+    for graph in sliding.snapshots(log.batches(duration=25)):
+        snapshots += [graph]
+        expected += [(_edges(sliding.graph), list(sliding.graph.nodes()))]
+        assert graph is not sliding.graph
+    for graph, (edges, nodes) in zip(snapshots, expected):
+        assert _edges(graph) == edges
+        assert set(graph.nodes()) == set(nodes)
+        assert all(graph[node1][node2] is graph[node2][node1] for node1, node2 in graph.edges())
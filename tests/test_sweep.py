@@ -0,0 +1,44 @@
+import pytest
+
+from evaluation.temporal_wrapper import TemporalLouvainIterator
+from louvain_variant import louvain_variant, louvain_variant_leiden_addition
+from louvain_variant.community_status import CoreCentralityCache
+
+VARIANTS = [
+    (louvain_variant.best_partition, louvain_variant.best_partition_sweep),
+    (louvain_variant_leiden_addition.best_partition, louvain_variant_leiden_addition.best_partition_sweep),
+]
+THRESHOLDS = [0.0, 0.25, 0.5, 0.75, 1.0]
+
+@pytest.fixture(scope="module")
+def arriving(snapshots):
+    """The snapshots with nodes that join and leave between them"""
+    return [graph.subgraph(list(graph)[25 * i:150 + 20 * i]).copy() for i, graph in enumerate(snapshots)]
+
+@pytest.mark.parametrize("engine", ["networkx", "csr"])
+@pytest.mark.parametrize("method, sweep_method", VARIANTS)
+def test_sweep_matches_separate_runs(arriving, method, sweep_method, engine):
+    previous = method(arriving[0], random_state=3)
+    for partition in (None, previous):
+        given = None if partition is None else dict(partition)
+        partitions = sweep_method(arriving[1], THRESHOLDS, partition=given, random_state=3, engine=engine)
+        assert given == partition # the partition it started from is left as it is
+        for core_threshold in THRESHOLDS:
+            assert partitions[core_threshold] == method(arriving[1], partition, core_threshold=core_threshold,
+                                                        random_state=3, engine=engine)
+
+@pytest.mark.parametrize("engine", ["networkx", "csr"])
+@pytest.mark.parametrize("method, sweep_method", VARIANTS)
+def test_temporal_sweep_matches_separate_runs(arriving, method, sweep_method, engine):
+    cache = {"core_cache": CoreCentralityCache()} if engine == "networkx" else {}
+    iterator = TemporalLouvainIterator(sweep_method, prev_partition=True, random_state=7, engine=engine, **cache)
+    sweep = iterator.process_temporal_graph_sweep(arriving, THRESHOLDS)
+    for core_threshold in THRESHOLDS:
+        cache = {"core_cache": CoreCentralityCache()} if engine == "networkx" else {}
+        separate = TemporalLouvainIterator(method, prev_partition=True, random_state=7, engine=engine,
+                                           core_threshold=core_threshold, **cache)
+        partitions, time_list = separate.process_temporal_graph(arriving, measure_time=True)
+        assert sweep[core_threshold][0] == partitions
+        assert len(sweep[core_threshold][1]) == len(time_list)
+        # every stored partition covers its own snapshot only, no later step added nodes to it
+        assert [set(partition) for partition in partitions] == [set(graph) for graph in arriving]